@@ -0,0 +1,94 @@
+"""Decoding of the compact geometry encodings accepted by the profiles
+
+Besides GeoJSON, the profile geometries can be given as an encoded polyline, as WKB or as a raw
+array of little-endian float64 (x, y) pairs. All of them are decoded straight into a (number of
+points, 2) float64 array of (x, y) coordinates, a ValueError is raised for malformed inputs.
+"""
+import struct
+
+import numpy as np
+
+POLYLINE_DEFAULT_PRECISION = 5
+POLYLINE_MAX_PRECISION = 10
+# a value is encoded in chunks of 5 bits, 12 chunks (60 bits) are enough for any coordinate
+POLYLINE_MAX_CHUNKS = 12
+
+WKB_POINT = 1
+WKB_LINESTRING = 2
+WKB_GEOMETRY_TYPES = {WKB_POINT: 'Point', WKB_LINESTRING: 'LineString'}
+# EWKB flags (PostGIS) on top of the geometry type, ISO WKB adds 1000 for Z instead
+EWKB_Z = 0x80000000
+EWKB_M = 0x40000000
+EWKB_SRID = 0x20000000
+
+
+def decode_polyline(encoded, precision=POLYLINE_DEFAULT_PRECISION):
+    """Returns the coordinates of an encoded polyline
+
+    The format is the Google encoded polyline with 10^precision as factor: the points are (y, x)
+    pairs (latitude, longitude), each value is the difference with the previous point.
+    """
+    try:
+        data = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError as error:
+        raise ValueError('An encoded polyline has only ASCII characters') from error
+    chunks = data.astype(np.int64) - 63
+    if chunks.size == 0 or ((chunks < 0) | (chunks > 63)).any():
+        raise ValueError('An encoded polyline has only characters between "?" and "~"')
+    # the chunks without continuation bit end a value
+    ends = np.flatnonzero(chunks < 0x20)
+    if ends.size == 0 or ends[-1] != chunks.size - 1 or ends.size % 2 != 0:
+        raise ValueError('The encoded polyline is truncated')
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    lengths = ends - starts + 1
+    if lengths.max() > POLYLINE_MAX_CHUNKS:
+        raise ValueError('The encoded polyline has values out of range')
+    shifts = 5 * (np.arange(chunks.size) - np.repeat(starts, lengths))
+    values = np.add.reduceat((chunks & 0x1f) << shifts, starts)
+    # the sign is in the lowest bit
+    values = np.where(values & 1, ~(values >> 1), values >> 1)
+    points = np.cumsum(values.reshape(-1, 2), axis=0)
+    return np.ascontiguousarray(points[:, ::-1] / 10.0**precision)
+
+
+def decode_wkb(data):
+    """Returns the geometry type ('Point' or 'LineString') and the coordinates of a WKB geometry
+
+    2D and 3D (ISO or EWKB) geometries are accepted, the third dimension is dropped. An empty Point
+    has NaN coordinates.
+    """
+    if len(data) < 5 or data[0] not in (0, 1):
+        raise ValueError('A WKB geometry starts with its byte order, 0 or 1')
+    byte_order = '<' if data[0] == 1 else '>'
+    wkb_type = struct.unpack_from(f'{byte_order}I', data, 1)[0]
+    if wkb_type & (EWKB_M | EWKB_SRID):
+        raise ValueError('The WKB geometries with M values or an SRID are not supported')
+    nb_dims = 2
+    if wkb_type & EWKB_Z:
+        nb_dims = 3
+        wkb_type &= ~EWKB_Z
+    elif 1000 < wkb_type < 2000:
+        nb_dims = 3
+        wkb_type -= 1000
+    if wkb_type not in WKB_GEOMETRY_TYPES:
+        raise ValueError(f'The WKB geometry must be a {"/".join(WKB_GEOMETRY_TYPES.values())}')
+    offset = 5
+    nb_points = 1
+    if wkb_type == WKB_LINESTRING:
+        if len(data) < 9:
+            raise ValueError('The WKB LineString is truncated')
+        nb_points = struct.unpack_from(f'{byte_order}I', data, 5)[0]
+        offset = 9
+    if len(data) != offset + nb_points * nb_dims * 8:
+        raise ValueError('The size of the WKB geometry does not match its number of points')
+    coordinates = np.frombuffer(
+        data, dtype=f'{byte_order}f8', count=nb_points * nb_dims, offset=offset
+    ).reshape(nb_points, nb_dims)
+    return WKB_GEOMETRY_TYPES[wkb_type], np.ascontiguousarray(coordinates[:, :2], dtype=np.float64)
+
+
+def decode_float64_pairs(data):
+    """Returns the coordinates of a raw array of little-endian float64 (x, y) pairs"""
+    if len(data) % 16 != 0:
+        raise ValueError('The size of the array is not a multiple of 16 bytes (x, y pairs)')
+    return np.frombuffer(data, dtype='<f8').astype(np.float64).reshape(-1, 2)
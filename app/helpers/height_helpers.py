@@ -1,9 +1,15 @@
 from app.helpers.helpers import filter_altitude
+from app.helpers.wgs84 import WGS84_SRID
+from app.helpers.wgs84 import wgs84_to_lv95
 
 
 def get_height(spatial_reference, easting, northing, georaster_utils):
+    if spatial_reference == WGS84_SRID:
+        # WGS84 points are sampled on the LV95 model
+        (easting,), (northing,) = wgs84_to_lv95([easting], [northing])
+        spatial_reference = 2056
     raster = georaster_utils.get_raster(spatial_reference)
     if raster is None:
         return None
-    altitude = raster.get_height_for_coordinate(easting, northing)
+    altitude = raster.get_heights([easting], [northing])[0]
     return filter_altitude(altitude)
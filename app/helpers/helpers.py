@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 
 # float('NaN') does not raise an Exception. This function does.
 def float_raise_nan(val):
@@ -9,6 +11,26 @@ def float_raise_nan(val):
     return ret
 
 
+def round_like_builtin(values, ndigits):
+    """Returns the value (or array of values) rounded like round(value, ndigits)
+
+    np.round multiplies the values by 10**ndigits before rounding them to an integer, the product
+    can be rounded onto (or off) a tie, which round() decides on the exact value of the double. The
+    values close to a tie are rounded one by one with round().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    flat_values = values.reshape(-1)
+    rounded = np.round(flat_values, ndigits)
+    scaled = flat_values * 10.0**ndigits
+    with np.errstate(invalid='ignore'):
+        ties = np.flatnonzero(
+            np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+        )
+    for i in ties.tolist():
+        rounded[i] = round(float(flat_values[i]), ndigits)
+    return rounded.reshape(values.shape)[()]
+
+
 def filter_altitude(altitude):
     """Returns the altitude given in parameter, rounded one decimal place"""
     if altitude is not None and altitude > 0.0:
@@ -17,16 +39,33 @@ def filter_altitude(altitude):
     return None
 
 
+def filter_altitudes(altitudes):
+    """Same as filter_altitude for an array of altitudes, the altitudes filtered out are NaN"""
+    altitudes = np.asarray(altitudes, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        return np.where(altitudes > 0.0, round_like_builtin(altitudes, 1), np.nan)
+
+
 def filter_distance(distance):
-    """Returns the distance given in parameter rounded one decimal place"""
+    """Returns the distance (or array of distances) given in parameter rounded one decimal place"""
     # 10cm accuracy is enough for distances
-    return round(distance, 1)
+    return round_like_builtin(distance, 1)
 
 
 def filter_coordinate(coordinate):
-    """Returns the coordinate given in parameter, rounder three decimal places"""
+    """Returns the coordinate (or array of coordinates) given in parameter, rounded three decimal
+    places
+    """
     # 1mm accuracy is enough for coordinates
-    return round(coordinate, 3)
+    return round_like_builtin(coordinate, 3)
+
+
+def filter_wgs84_coordinate(coordinate):
+    """Returns the WGS84 coordinate (or array of coordinates) given in parameter, rounded seven
+    decimal places
+    """
+    # 1cm accuracy is enough for coordinates
+    return round_like_builtin(coordinate, 7)
 
 
 def strtobool(value) -> bool:
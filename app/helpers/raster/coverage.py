@@ -0,0 +1,111 @@
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# the bitmap cells are a quarter of the typical tile size
+CELLS_PER_TILE_SIDE = 4
+# the cell size is increased until there are at most that many cells per tile
+MAX_CELLS_PER_TILE = 64
+
+
+class CoverageBitmap(object):
+    """Bitmap of the areas covered by the tiles of a mosaic
+
+    The plane is cut in square cells (a fraction of the typical tile size) and a bit is set for
+    every cell overlapped by a tile. A point in a cell without bit is outside the mosaic, which is
+    known without looking up the tiles, e.g. for the points in the border areas or in the gaps of
+    the mosaic. A point in a cell with a bit can still fall outside the tiles, the tile lookup
+    decides.
+
+    The bits are packed (a few hundreds of kilobytes for the whole Switzerland), so that a bitmap
+    per spatial reference is cheap to keep.
+    """
+
+    def __init__(self, bounds, cell_size=None):
+        """bounds is a (number of tiles, 4) array (or list) of (min_x, min_y, max_x, max_y)"""
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        self.origin_x = 0.0
+        self.origin_y = 0.0
+        self.cell_size = 1.0
+        self.nb_cells_x = 0
+        self.nb_cells_y = 0
+        self.bits = np.zeros(0, dtype=np.uint8)
+        if len(bounds) == 0:
+            return
+        min_x, min_y, max_x, max_y = bounds.T
+        self.origin_x = float(min_x.min())
+        self.origin_y = float(min_y.min())
+        if cell_size is None:
+            cell_size = float(np.median(np.maximum(max_x - min_x, max_y - min_y))) / \
+                CELLS_PER_TILE_SIDE
+        if cell_size > 0:
+            self.cell_size = float(cell_size)
+        extent_x = float(max_x.max()) - self.origin_x
+        extent_y = float(max_y.max()) - self.origin_y
+        while (math.floor(extent_x / self.cell_size) + 1) * \
+                (math.floor(extent_y / self.cell_size) + 1) > MAX_CELLS_PER_TILE * len(bounds):
+            self.cell_size *= 2
+        # the cell of max_x is marked even if the tile ends on its edge: the lookups divide the
+        # coordinates the same way, so a point rounded into that cell is still found covered
+        first_x, first_y, last_x, last_y = (
+            np.floor((coordinates - origin) / self.cell_size).astype(np.int64)
+            for coordinates, origin in (
+                (min_x, self.origin_x),
+                (min_y, self.origin_y),
+                (max_x, self.origin_x),
+                (max_y, self.origin_y),
+            )
+        )
+        self.nb_cells_x = int(last_x.max()) + 1
+        self.nb_cells_y = int(last_y.max()) + 1
+        # the tile rectangles are summed on a 2D difference array
+        counts = np.zeros((self.nb_cells_x + 1, self.nb_cells_y + 1), dtype=np.int64)
+        np.add.at(counts, (first_x, first_y), 1)
+        np.add.at(counts, (last_x + 1, first_y), -1)
+        np.add.at(counts, (first_x, last_y + 1), -1)
+        np.add.at(counts, (last_x + 1, last_y + 1), 1)
+        covered = np.cumsum(np.cumsum(counts, axis=0), axis=1)[:-1, :-1] > 0
+        self.bits = np.packbits(covered.ravel())
+        logger.debug(
+            'Coverage bitmap built: %d of %dx%d cells of %sm covered (%d bytes)',
+            np.count_nonzero(covered),
+            self.nb_cells_x,
+            self.nb_cells_y,
+            self.cell_size,
+            self.bits.nbytes
+        )
+
+    def covers(self, x, y):
+        """Returns False if (x, y) is outside the tiles, True if it may be inside a tile"""
+        try:
+            i = math.floor((x - self.origin_x) / self.cell_size)
+            j = math.floor((y - self.origin_y) / self.cell_size)
+        except (ValueError, OverflowError):
+            # NaN or infinite coordinates
+            return False
+        if not (0 <= i < self.nb_cells_x and 0 <= j < self.nb_cells_y):
+            return False
+        cell = i * self.nb_cells_y + j
+        return bool((self.bits.item(cell >> 3) >> (7 - (cell & 7))) & 1)
+
+    def covers_all(self, xs, ys):
+        """Same as covers, for arrays of coordinates"""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        covered = np.zeros(xs.shape, dtype=bool)
+        if self.bits.size == 0 or xs.size == 0:
+            return covered
+        with np.errstate(invalid='ignore', over='ignore'):
+            cells_x = np.floor((xs - self.origin_x) / self.cell_size)
+            cells_y = np.floor((ys - self.origin_y) / self.cell_size)
+        points = np.flatnonzero(
+            (cells_x >= 0) & (cells_x < self.nb_cells_x) & (cells_y >= 0) &
+            (cells_y < self.nb_cells_y)
+        )
+        cells = cells_x[points].astype(np.int64) * self.nb_cells_y + \
+            cells_y[points].astype(np.int64)
+        covered[points] = ((self.bits[cells >> 3] >> (7 - (cells & 7))) & 1).astype(bool)
+        return covered
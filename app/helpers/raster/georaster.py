@@ -1,11 +1,50 @@
 import logging
+import math
+import mmap
+import os
+import sys
+from functools import lru_cache
 from os.path import dirname
 from pathlib import Path
 from struct import unpack
 
-from app.helpers.raster.shputils import SHPUtils
+import numpy as np
+
+from app.helpers.raster.coverage import CoverageBitmap
+from app.helpers.raster.geotiff import COMPRESSION_NONE
+from app.helpers.raster.geotiff import PREDICTOR_NONE
+from app.helpers.raster.geotiff import decode_tiff_block
+from app.helpers.raster.geotiff import read_tiff_directory
+from app.helpers.raster.index_cache import load_index_cache
+from app.helpers.raster.index_cache import write_index_cache
+from app.helpers.raster.io_planner import read_cells
+from app.helpers.raster.lru_cache import LruCache
+from app.helpers.raster.lv03 import LV03Raster
+from app.helpers.raster.lv03 import ShiftGrid
+from app.helpers.raster.read_threads import ReadThreadPool
+from app.helpers.raster.shapefile import get_column
+from app.helpers.raster.shapefile import read_index
+from app.helpers.raster.tile_index import create_tile_index
+from app.helpers.raster.tile_registry import BT_HEADER_SIZE
+from app.helpers.raster.tile_registry import TILE_FORMAT_BT
+from app.helpers.raster.tile_registry import TILE_FORMAT_GEOTIFF
+from app.helpers.raster.tile_registry import TileRegistry
+from app.helpers.raster.tile_registry import get_data_format
+from app.helpers.raster.tile_registry import get_tile_format
 from app.settings import DTM_BASE_PATH
 from app.settings import PRELOAD_RASTER_FILES
+from app.settings import RASTER_BLOCK_CACHE_SIZE
+from app.settings import RASTER_BLOCK_SIZE
+from app.settings import RASTER_INDEX_CACHE
+from app.settings import RASTER_INDEX_CACHE_DIR
+from app.settings import RASTER_LV03_FROM_LV95
+from app.settings import RASTER_LV03_SHIFT_GRID
+from app.settings import RASTER_MAX_OPEN_FILES
+from app.settings import RASTER_MMAP
+from app.settings import RASTER_MMAP_MAX_TILES
+from app.settings import RASTER_PARALLEL_MIN_TILES
+from app.settings import RASTER_READ_MAX_GAP
+from app.settings import RASTER_READ_THREADS
 
 logger = logging.getLogger(__name__)
 
@@ -20,26 +59,52 @@ if not DTM_BASE_PATH.exists() and not DTM_BASE_PATH.is_dir():
 class GeoRasterUtils(object):
 
     def __init__(self):
-        self.shp_utils = SHPUtils()
         self.raster = {}
         self.raster_files = {}
         self.init_raster_files(DTM_BASE_PATH, [2056, 21781])
 
     def get_raster(self, sr):
         result = self.raster.get(sr, None)
+        if result is None and sr == 21781 and RASTER_LV03_FROM_LV95:
+            result = self.raster[sr] = self.create_lv03_raster()
         if result is None:
             index_file = self.raster_files[sr]
-            result = GeoRaster(index_file, self.shp_utils.load_shape_file(index_file))
+            registry = None
+            if RASTER_INDEX_CACHE:
+                registry = load_index_cache(index_file, RASTER_INDEX_CACHE_DIR)
+            if registry is not None:
+                result = GeoRaster(index_file, registry=registry)
+            else:
+                index = read_index(index_file)
+                result = GeoRaster(
+                    index_file,
+                    registry=GeoRaster.create_registry_from_columns(
+                        index_file, index.bounds, get_column(index, 'location')
+                    )
+                )
+                if RASTER_INDEX_CACHE:
+                    write_index_cache(index_file, result.registry, RASTER_INDEX_CACHE_DIR)
             self.raster[sr] = result
             logger.debug("GeoRaster for %s has been added in the cache", repr(sr))
         return result
 
+    def create_lv03_raster(self):
+        """Returns an LV03 view of the LV95 raster, translated or shifted with the shift grid"""
+        shift_grid = None
+        if RASTER_LV03_SHIFT_GRID:
+            shift_grid = ShiftGrid.from_file(RASTER_LV03_SHIFT_GRID)
+        logger.debug("LV03 requests are served from the LV95 GeoRaster")
+        return LV03Raster(self.get_raster(2056), shift_grid)
+
     def init_raster_files(self, data_path, supported_spatial_references):
         self.raster_files = {
             21781: str((data_path / 'swissalti3d/kombo_2m_regio/index.shp').resolve()),  # LV03
             2056: str((data_path / 'swissalti3d/kombo_2m_regio_lv95/index.shp').resolve()),  # LV95
             # for other projections, results are re-projected from LV95 model
         }
+        if RASTER_LV03_FROM_LV95:
+            # LV03 is sampled from the LV95 model
+            del self.raster_files[21781]
         if PRELOAD_RASTER_FILES:
             try:
                 # this is currently the same as doing it for all raster_files, but if we support
@@ -66,80 +131,454 @@ class GeoRasterUtils(object):
         return True
 
 
-class BinaryTerrainTile(object):
-    # pylint: disable=too-many-instance-attributes
+class MappedTileCache(LruCache):
+    """Keeps a bounded number of .bt tiles memory mapped
+
+    Each tile is mapped once and its cells are exposed through a zero-copy memoryview, so that a
+    height lookup is a memory access instead of an open/seek/read. When more than max_tiles are
+    mapped, the least recently used tile is unmapped.
+    """
+
+    def __init__(self, max_tiles):
+        super().__init__()
+        self.max_tiles = max(max_tiles, 1)
+
+    def get_cells(self, tile):
+        with self._lock:
+            entry = self._get(tile.filename)
+            if entry is None:
+                entry = self._map(tile)
+                self._put(tile.filename, entry)
+            return entry[2]
+
+    @staticmethod
+    def _map(tile):
+        with open(tile.filename, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # .bt files are little-endian, like all the platforms we run on, so the cells can be cast
+        # to the native types without copying them
+        view = memoryview(mapped)
+        end = BT_HEADER_SIZE + tile.cols * tile.rows * tile.data_size
+        return mapped, view, view[BT_HEADER_SIZE:end].cast(tile.data_format[1:])
+
+    def _is_full(self):
+        return len(self._entries) > self.max_tiles
+
+    def _evict(self, key, entry):
+        mapped, view, cells = entry
+        # all exported buffers must be released before the mapping can be closed
+        cells.release()
+        view.release()
+        mapped.close()
+
+
+class TileFilePool(LruCache):
+    """Keeps a bounded number of .bt tiles open
+
+    Cells are read with os.pread, which doesn't use (nor move) the file position, so the same
+    descriptor can be shared by concurrent requests without locking around the reads. When more than
+    max_files are open, the least recently used file is closed, as soon as no read is using it.
+    """
+
+    def __init__(self, max_files):
+        super().__init__()
+        self.max_files = max(max_files, 1)
+
+    def stats(self):
+        return {'open_files': len(self._entries), **super().stats()}
+
+    def pread(self, filename, size, offset):
+        entry = self._acquire(filename)
+        try:
+            return os.pread(entry[0], size, offset)
+        finally:
+            self._release(entry)
+
+    def _acquire(self, filename):
+        with self._lock:
+            entry = self._get(filename)
+            if entry is None:
+                # [file descriptor, number of running reads, evicted]
+                entry = [os.open(filename, os.O_RDONLY), 0, False]
+                self._put(filename, entry)
+            entry[1] += 1
+            return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry[1] -= 1
+            if entry[2] and entry[1] == 0:
+                os.close(entry[0])
+
+    def _is_full(self):
+        return len(self._entries) > self.max_files
+
+    def _evict(self, key, entry):
+        entry[2] = True
+        if entry[1] == 0:
+            os.close(entry[0])
 
-    def __init__(self, min_x, min_y, max_x, max_y, filename):
-        self.min_x = min_x
-        self.min_y = min_y
-        self.max_x = max_x
-        self.max_y = max_y
 
-        self.filename = filename
-        self.first_reading = True
+class BlockCache(LruCache):
+    """Keeps the decoded cells of recently used blocks of tiles in memory
 
-        self.cols = None
-        self.rows = None
-        self.data_size = None
-        self.floating_point = None
-        self.resolution_x = None
-        self.resolution_y = None
+    Tiles are cut in blocks of block_size x block_size cells (smaller on the right and top edges of
+    the tiles), a block is read at once the first time one of its cells is needed and is then
+    served from memory. When the cached blocks take more than max_bytes, the least recently used
+    blocks are dropped.
+    """
+
+    def __init__(self, max_bytes, block_size):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.block_size = max(block_size, 1)
+        self.nbytes = 0
+
+    def stats(self):
+        return {'blocks': len(self._entries), 'bytes': self.nbytes, **super().stats()}
+
+    def get_block(self, tile, block_x, block_y):
+        """Returns the cells of a block as a (columns, rows) array"""
+        key = (tile.filename, block_x, block_y)
+        with self._lock:
+            block = self._get(key)
+            if block is not None:
+                return block
+        # blocks are read without holding the lock
+        block = self._read_block(tile, block_x, block_y)
+        with self._lock:
+            if key not in self._entries:
+                self.nbytes += block.nbytes
+                self._put(key, block)
+        return block
+
+    def _read_block(self, tile, block_x, block_y):
+        first_x = block_x * self.block_size
+        first_y = block_y * self.block_size
+        return tile.read_window(
+            first_x,
+            first_y,
+            min(self.block_size, tile.cols - first_x),
+            min(self.block_size, tile.rows - first_y)
+        )
+
+    def _is_full(self):
+        return self.nbytes > self.max_bytes and len(self._entries) > 1
+
+    def _evict(self, key, entry):
+        self.nbytes -= entry.nbytes
+
+
+# per process pool of open tiles, used when the tiles are not memory mapped
+open_tiles = TileFilePool(RASTER_MAX_OPEN_FILES)
+
+# per process cache of decoded blocks, used when the tiles are not memory mapped
+block_cache = None
+if RASTER_BLOCK_CACHE_SIZE > 0:
+    block_cache = BlockCache(RASTER_BLOCK_CACHE_SIZE, RASTER_BLOCK_SIZE)
+
+# per process cache of memory mapped tiles, only used when RASTER_MMAP is enabled
+mapped_tiles = None
+if RASTER_MMAP:
+    if sys.byteorder == 'little':
+        mapped_tiles = MappedTileCache(RASTER_MMAP_MAX_TILES)
+    else:
+        logger.warning('RASTER_MMAP is only supported on little-endian platforms, ignoring it')
+
+# per process pool of threads reading the tiles of a request in parallel, not used with RASTER_MMAP
+# (memory mapped reads don't release the GIL)
+read_threads = None
+if RASTER_READ_THREADS > 0:
+    read_threads = ReadThreadPool(RASTER_READ_THREADS)
+
+
+def group_by_block(blocks):
+    """Yields each of the given blocks once, with the mask of its positions in blocks"""
+    unique_blocks, inverse = np.unique(blocks, return_inverse=True)
+    inverse = inverse.ravel()
+    for i, block in enumerate(unique_blocks.tolist()):
+        yield block, inverse == i
+
+
+class RasterTile(object):
+    # pylint: disable=too-many-instance-attributes
+    """Light view on one tile of a TileRegistry, created on demand
+
+    The tile metadata is copied from its registry row, the header has already been parsed when the
+    registry was created. This is the interface of the tile formats, a format only has to implement
+    read_positions (reading a batch of cells) and can override the other reads when it has a
+    faster way to do them.
+    """
+
+    def __init__(self, registry, tile_id):
+        self.registry = registry
+        self.tile_id = tile_id
+        row = registry.tiles[tile_id]
+        self.min_x = float(row['min_x'])
+        self.min_y = float(row['min_y'])
+        self.max_x = float(row['max_x'])
+        self.max_y = float(row['max_y'])
+        self.cols = int(row['cols'])
+        self.rows = int(row['rows'])
+        self.data_size = int(row['data_size'])
+        self.floating_point = int(row['floating_point'])
+        self.resolution_x = float(row['resolution_x'])
+        self.resolution_y = float(row['resolution_y'])
+        self.scale = float(row['scale'])
+        self.offset = float(row['offset'])
+        self.nodata = float(row['nodata'])
 
     def __str__(self):
         return f"{self.min_x}, {self.min_y}, {self.max_x}, {self.max_y}: {self.filename}"
 
+    @property
+    def filename(self):
+        return self.registry.get_filename(self.tile_id)
+
     def contains(self, x, y):
         return self.min_x <= x < self.max_x and self.min_y <= y < self.max_y
 
+    @property
+    def data_format(self):
+        return get_data_format(self.data_size, self.floating_point)
+
+    def get_cell_position(self, x, y):
+        """Returns the column (from west) and the row (from south) of the cell containing (x, y)"""
+        # the division can round the coordinates just before the east and north edges up to the
+        # column and row past the last ones
+        return (
+            min(int((x - self.min_x) / self.resolution_x), self.cols - 1),
+            min(int((y - self.min_y) / self.resolution_y), self.rows - 1)
+        )
+
+    def get_cell_positions(self, xs, ys):
+        # same as get_cell_position, for arrays of coordinates
+        positions_x = ((xs - self.min_x) / self.resolution_x).astype(np.int64)
+        positions_y = ((ys - self.min_y) / self.resolution_y).astype(np.int64)
+        return np.minimum(positions_x, self.cols - 1), np.minimum(positions_y, self.rows - 1)
+
+    @property
+    def quantized(self):
+        """True when the cells must be converted to get the heights, see dequantize"""
+        return self.scale != 1.0 or self.offset != 0.0 or not math.isnan(self.nodata)
+
+    def dequantize(self, cells):
+        """Returns the heights in meters of the given cells, NaN for the nodata cells"""
+        heights = np.asarray(cells, dtype=np.float64)
+        units = 1 / self.scale
+        offset = self.offset * units
+        if units == round(units) and offset == round(offset):
+            # integer cells in fractions of meters (e.g. decimeters): dividing the exact integer
+            # gives the double closest to the decimal height, the same value round() would give
+            heights = (heights + offset) / units
+        else:
+            heights = heights * self.scale + self.offset
+        if not math.isnan(self.nodata):
+            heights[np.asarray(cells) == self.nodata] = np.nan
+        return heights
+
+    def get_heights(self, xs, ys):
+        """Returns the heights of the points (xs, ys), which must all be inside this tile"""
+        if block_cache is not None:
+            cells = self.get_cached_heights(xs, ys)
+        else:
+            cells = self.read_positions(*self.get_cell_positions(xs, ys))
+        return self.dequantize(cells) if self.quantized else cells
+
+    def get_cached_heights(self, xs, ys):
+        positions_x, positions_y = self.get_cell_positions(xs, ys)
+        block_size = block_cache.block_size
+        nb_blocks_y = -(-self.rows // block_size)
+        heights = np.empty(positions_x.shape, dtype=self.data_format)
+        # each block is fetched once, for all its points
+        for block, mask in group_by_block(
+            (positions_x // block_size) * nb_blocks_y + positions_y // block_size
+        ):
+            block_x, block_y = divmod(block, nb_blocks_y)
+            cells = block_cache.get_block(self, block_x, block_y)
+            heights[mask] = cells[positions_x[mask] - block_x * block_size,
+                                  positions_y[mask] - block_y * block_size]
+        return heights
+
     def get_height_for_coordinate(self, x, y):
-        with open(self.filename, 'rb') as file:
-            # Reading file metadata if it's the first time reading it
-            if self.first_reading:
-                file.seek(10)
-                (self.cols, self.rows, self.data_size,
-                 self.floating_point) = unpack('<LLhh', file.read(12))
-                self.resolution_x = (self.max_x - self.min_x) / self.cols
-                self.resolution_y = (self.max_y - self.min_y) / self.rows
-                self.first_reading = False
-            position_x = int((x - self.min_x) / self.resolution_x)
-            position_y = int((y - self.min_y) / self.resolution_y)
-            file.seek(256 + (position_y + position_x * self.rows) * self.data_size)
-            if self.floating_point == 1:
-                format_to_unpack = "<f"
-            else:
-                if self.data_size == 2:
-                    format_to_unpack = "<h"
-                else:
-                    format_to_unpack = "<l"
-            return unpack(format_to_unpack, file.read(self.data_size))[0]
+        position_x, position_y = self.get_cell_position(x, y)
+        if block_cache is not None:
+            block_x, position_x = divmod(position_x, block_cache.block_size)
+            block_y, position_y = divmod(position_y, block_cache.block_size)
+            cells = block_cache.get_block(self, block_x, block_y)[position_x,
+                                                                  position_y,
+                                                                  np.newaxis]
+        else:
+            cells = self.read_positions(np.array([position_x]), np.array([position_y]))
+        return (self.dequantize(cells) if self.quantized else cells)[0].item()
+
+    def read_window(self, first_x, first_y, nb_x, nb_y):
+        """Returns the cells of a window of the tile as a (nb_x columns, nb_y rows) array"""
+        positions_x = np.repeat(np.arange(first_x, first_x + nb_x), nb_y)
+        positions_y = np.tile(np.arange(first_y, first_y + nb_y), nb_x)
+        return self.read_positions(positions_x, positions_y).reshape(nb_x, nb_y)
+
+    def read_positions(self, positions_x, positions_y):
+        """Returns the values of the cells at the given columns (from west) and rows (from south)"""
+        raise NotImplementedError()
+
+
+class BinaryTerrainTile(RasterTile):
+    """Tile stored as an uncompressed .bt file
+
+    See http://vterrain.org/Implementation/Formats/BT.html
+    """
+
+    def get_cell_index(self, x, y):
+        # cells are stored column by column (column-major)
+        position_x, position_y = self.get_cell_position(x, y)
+        return position_y + position_x * self.rows
+
+    def get_cell_indices(self, xs, ys):
+        # same as get_cell_index, for arrays of coordinates
+        positions_x, positions_y = self.get_cell_positions(xs, ys)
+        return positions_y + positions_x * self.rows
+
+    def get_heights(self, xs, ys):
+        if mapped_tiles is not None:
+            cells = mapped_tiles.get_cells(self)
+            return np.asarray(cells)[self.get_cell_indices(xs, ys)]
+        return super().get_heights(xs, ys)
+
+    def read_positions(self, positions_x, positions_y):
+        return read_cells(
+            self.read_cells,
+            positions_y + positions_x * self.rows,
+            self.data_format,
+            RASTER_READ_MAX_GAP // self.data_size
+        )
+
+    def read_cells(self, first_cell, nb_cells):
+        return open_tiles.pread(
+            self.filename, nb_cells * self.data_size, BT_HEADER_SIZE + first_cell * self.data_size
+        )
+
+    def get_height_for_coordinate(self, x, y):
+        if mapped_tiles is not None:
+            cells = mapped_tiles.get_cells(self)
+            return cells[self.get_cell_index(x, y)]
+        if block_cache is not None:
+            return super().get_height_for_coordinate(x, y)
+        data = open_tiles.pread(
+            self.filename,
+            self.data_size,
+            BT_HEADER_SIZE + self.get_cell_index(x, y) * self.data_size
+        )
+        return unpack(self.data_format, data)[0]
+
+
+@lru_cache(maxsize=RASTER_MAX_OPEN_FILES)
+def get_tiff_directory(filename):
+    # the directories of the recently used GeoTIFF tiles are kept, like their open files
+    return read_tiff_directory(lambda offset, size: open_tiles.pread(filename, size, offset))
+
+
+class GeoTiffTile(RasterTile):
+    """Tile stored as a tiled (or stripped) and compressed GeoTIFF file
+
+    The file is made of independently compressed blocks, each block of the requested cells is read
+    and decoded once.
+    """
+
+    def read_positions(self, positions_x, positions_y):
+        directory = get_tiff_directory(self.filename)
+        # the rows of a TIFF image go from north to south
+        rows = self.rows - 1 - positions_y
+        blocks_x = positions_x // directory.block_width
+        blocks_y = rows // directory.block_length
+        nb_blocks_x = -(-directory.cols // directory.block_width)
+        heights = np.empty(positions_x.shape, dtype=self.data_format)
+        for block, mask in group_by_block(blocks_y * nb_blocks_x + blocks_x):
+            block_y, block_x = divmod(block, nb_blocks_x)
+            heights[mask] = self.read_block_positions(
+                directory,
+                block,
+                rows[mask] - block_y * directory.block_length,
+                positions_x[mask] - block_x * directory.block_width
+            )
+        return heights
+
+    def read_block_positions(self, directory, block, rows, cols):
+        """Returns the values of the cells at the given rows and columns of one block"""
+        if directory.compression == COMPRESSION_NONE and \
+                directory.predictor == PREDICTOR_NONE and directory.byte_counts[block] > 0:
+            # the cells of uncompressed blocks can be read directly, like the .bt cells
+            return self.read_block_cells(directory, block, rows * directory.block_width + cols)
+        return self.read_block(directory, block)[rows, cols]
+
+    def read_block_cells(self, directory, block, cells):
+        itemsize = directory.dtype.itemsize
+        offset = int(directory.offsets[block])
+
+        def read(first_cell, nb_cells):
+            return open_tiles.pread(
+                self.filename, nb_cells * itemsize, offset + first_cell * itemsize
+            )
+
+        return read_cells(read, cells, directory.dtype, RASTER_READ_MAX_GAP // itemsize)
+
+    def read_block(self, directory, block):
+        byte_count = int(directory.byte_counts[block])
+        if byte_count == 0:
+            # sparse file, the block has never been written
+            return np.zeros((directory.block_length, directory.block_width), dtype=directory.dtype)
+        data = open_tiles.pread(self.filename, byte_count, int(directory.offsets[block]))
+        return decode_tiff_block(directory, data)
+
+
+TILE_CLASSES = {TILE_FORMAT_BT: BinaryTerrainTile, TILE_FORMAT_GEOTIFF: GeoTiffTile}
 
 
 class GeoRaster:
 
-    def __init__(self, index_file, shape_files):
-        self.tiles = []
+    def __init__(self, index_file, shape_files=None, registry=None):
+        """The tiles are either read from the index shape files or given as an already built
+        registry (e.g. from a compiled index)
+        """
+        if registry is None:
+            registry = self.create_registry(index_file, shape_files)
+        self.registry = registry
+        self.tile_index = create_tile_index(self.registry.bounds)
+        self.coverage = CoverageBitmap(self.registry.bounds)
+
+    @staticmethod
+    def create_registry(index_file, shape_files):
+        bounds = [
+            (
+                shape['shp_data']['xmin'],
+                shape['shp_data']['ymin'],
+                shape['shp_data']['xmax'],
+                shape['shp_data']['ymax']
+            ) for shape in shape_files
+        ]
+        locations = [shape['dbf_data']['location'] for shape in shape_files]
+        return GeoRaster.create_registry_from_columns(index_file, bounds, locations)
+
+    @staticmethod
+    def create_registry_from_columns(index_file, bounds, locations):
+        filenames = []
         directory_name = dirname(index_file)
         if directory_name == "":
             directory_name = "."
-        for shape in shape_files:
-            filename = shape['dbf_data']['location'].rstrip().decode()
+        for location in locations:
+            filename = location.rstrip().decode()
             if not filename.startswith("/"):
                 filename = directory_name + '/' + filename
-            if filename.endswith(".bt"):
-                geo = shape['shp_data']
-                self.tiles.append(
-                    BinaryTerrainTile(
-                        min_x=geo['xmin'],
-                        max_x=geo['xmax'],
-                        min_y=geo['ymin'],
-                        max_y=geo['ymax'],
-                        filename=filename
-                    )
-                )
+            if get_tile_format(filename) is not None:
+                filenames.append(filename)
             else:
-                message = f"{filename} file referenced in index file {repr(index_file)} not found"
+                message = (
+                    f"{filename} file referenced in index file {repr(index_file)} has an "
+                    "unsupported format"
+                )
                 logger.error(message)
                 raise ValueError(message)
+        return TileRegistry(bounds, filenames)
 
     def get_height_for_coordinate(self, x, y):
         tile = self.get_tile(x, y)
@@ -147,8 +586,48 @@ class GeoRaster:
             return tile.get_height_for_coordinate(x, y)
         return None
 
+    def get_heights(self, xs, ys):
+        """Returns the heights of the points (xs, ys) as a float array, NaN where there is no tile
+
+        Points are assigned to their tile in bulk and each tile reads all its points at once. When
+        the points span at least RASTER_PARALLEL_MIN_TILES tiles, the tiles are read in parallel.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        heights = np.full(xs.shape, np.nan)
+        # the points outside the coverage don't need a tile lookup
+        covered = self.coverage.covers_all(xs, ys)
+        if covered.all():
+            tile_ids = self.tile_index.find_all(xs, ys)
+        else:
+            tile_ids = np.full(xs.shape, -1, dtype=np.int64)
+            tile_ids[covered] = self.tile_index.find_all(xs[covered], ys[covered])
+        tiles = [
+            (tile_id, tile_ids == tile_id)
+            for tile_id in np.unique(tile_ids[tile_ids >= 0]).tolist()
+        ]
+
+        def get_tile_heights(tile):
+            tile_id, mask = tile
+            return self.get_tile_by_id(tile_id).get_heights(xs[mask], ys[mask])
+
+        if read_threads is not None and mapped_tiles is None and \
+                len(tiles) >= max(RASTER_PARALLEL_MIN_TILES, 2):
+            tile_heights = read_threads.map(get_tile_heights, tiles)
+        else:
+            tile_heights = map(get_tile_heights, tiles)
+        for (_, mask), values in zip(tiles, tile_heights):
+            heights[mask] = values
+        return heights
+
     def get_tile(self, x, y):
-        for tile in self.tiles:
-            if tile.contains(x, y):
-                return tile
-        return None
+        if not self.coverage.covers(x, y):
+            return None
+        tile_id = self.tile_index.find(x, y)
+        if tile_id is None:
+            return None
+        return self.get_tile_by_id(tile_id)
+
+    def get_tile_by_id(self, tile_id):
+        tile_class = TILE_CLASSES[int(self.registry.tiles['format'][tile_id])]
+        return tile_class(self.registry, tile_id)
@@ -0,0 +1,403 @@
+"""Reader and writer for the internally tiled (or stripped), compressed GeoTIFF tiles of the raster
+mosaics
+
+Only what is needed to read single band elevation models is supported: classic (not Big) TIFF,
+16 and 32 bits integer or 32 bits float samples, no compression or deflate compression, with or
+without horizontal or floating point predictor, and the scale, offset and nodata value of GDAL.
+Such files are written for example by
+
+    gdal_translate -co TILED=YES -co COMPRESS=DEFLATE -co PREDICTOR=3 tile.bt tile.tif
+"""
+import logging
+import math
+import struct
+import zlib
+from collections import namedtuple
+from xml.etree import ElementTree
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIFF_HEADER_SIZE = 8
+TIFF_ENTRY_SIZE = 12
+
+# TIFF tags
+IMAGE_WIDTH = 256
+IMAGE_LENGTH = 257
+BITS_PER_SAMPLE = 258
+COMPRESSION = 259
+STRIP_OFFSETS = 273
+SAMPLES_PER_PIXEL = 277
+ROWS_PER_STRIP = 278
+STRIP_BYTE_COUNTS = 279
+PREDICTOR = 317
+TILE_WIDTH = 322
+TILE_LENGTH = 323
+TILE_OFFSETS = 324
+TILE_BYTE_COUNTS = 325
+SAMPLE_FORMAT = 339
+MODEL_PIXEL_SCALE = 33550
+MODEL_TIEPOINT = 33922
+GEO_KEY_DIRECTORY = 34735
+GDAL_METADATA = 42112
+GDAL_NODATA = 42113
+
+# TIFF field types and the struct format of their values
+TIFF_TYPES = {1: 'B', 2: 's', 3: 'H', 4: 'I', 6: 'b', 8: 'h', 9: 'i', 11: 'f', 12: 'd'}
+
+COMPRESSION_NONE = 1
+COMPRESSION_DEFLATE = (8, 32946)
+PREDICTOR_NONE = 1
+PREDICTOR_HORIZONTAL = 2
+PREDICTOR_FLOATING_POINT = 3
+SAMPLE_FORMAT_INT = 2
+SAMPLE_FORMAT_FLOAT = 3
+
+# same fields as the .bt header, so that both can be stored in the tile registry
+TIFF_HEADER_DTYPE = np.dtype(
+    [
+        ('cols', np.uint32),
+        ('rows', np.uint32),
+        ('data_size', np.int16),
+        ('floating_point', np.int16),
+        ('scale', np.float64),
+        ('offset', np.float64),
+        ('nodata', np.float64),
+    ]
+)
+
+# the image is made of blocks (tiles or strips) of block_width x block_length cells, stored row by
+# row from the north-west corner, blocks on the right and bottom edges are padded. The heights are
+# cell * scale + offset, nodata is NaN when the file has no nodata value.
+TiffDirectory = namedtuple(
+    'TiffDirectory',
+    [
+        'cols',
+        'rows',
+        'block_width',
+        'block_length',
+        'offsets',
+        'byte_counts',
+        'compression',
+        'predictor',
+        'dtype',
+        'scale',
+        'offset',
+        'nodata',
+    ]
+)
+
+
+def read_tiff_directory(read):
+    """Reads the first image directory of a TIFF file
+
+    read(offset, size) must return size bytes of the file starting at offset. Raises ValueError for
+    the files that are not supported.
+    """
+    byte_order, tags = read_tiff_tags(read)
+    if get_tag(tags, SAMPLES_PER_PIXEL, (1,))[0] != 1:
+        raise ValueError('Only single band TIFF files are supported')
+    compression = get_tag(tags, COMPRESSION, (COMPRESSION_NONE,))[0]
+    if compression != COMPRESSION_NONE and compression not in COMPRESSION_DEFLATE:
+        raise ValueError(f'Unsupported TIFF compression {compression}')
+    predictor = get_tag(tags, PREDICTOR, (PREDICTOR_NONE,))[0]
+    if predictor not in (PREDICTOR_NONE, PREDICTOR_HORIZONTAL, PREDICTOR_FLOATING_POINT):
+        raise ValueError(f'Unsupported TIFF predictor {predictor}')
+    cols, rows, block_width, block_length, offsets, byte_counts = get_block_layout(tags)
+    scale, offset = get_gdal_scale_offset(get_tag(tags, GDAL_METADATA, (b'',))[0])
+    nodata = get_tag(tags, GDAL_NODATA, (b'',))[0].rstrip(b'\0').strip()
+    return TiffDirectory(
+        cols,
+        rows,
+        block_width,
+        block_length,
+        offsets,
+        byte_counts,
+        compression,
+        predictor,
+        get_sample_dtype(tags, byte_order),
+        scale,
+        offset,
+        float(nodata) if nodata else math.nan
+    )
+
+
+def read_tiff_tags(read):
+    """Returns the byte order ('<' or '>') of a TIFF file and the values of the tags of its first
+    image directory, the tags of unknown types are left out
+    """
+    header = read(0, TIFF_HEADER_SIZE)
+    byte_order = {b'II': '<', b'MM': '>'}.get(header[:2])
+    if byte_order is None:
+        raise ValueError('Not a TIFF file')
+    magic, ifd_offset = struct.unpack(byte_order + 'HI', header[2:])
+    if magic != 42:
+        raise ValueError(f'Unsupported TIFF version {magic} (BigTIFF is not supported)')
+    nb_entries = struct.unpack(byte_order + 'H', read(ifd_offset, 2))[0]
+    entries = read(ifd_offset + 2, nb_entries * TIFF_ENTRY_SIZE)
+    tags = {}
+    for i in range(nb_entries):
+        tag, field_type, count, value = struct.unpack_from(
+            byte_order + 'HHI4s', entries, i * TIFF_ENTRY_SIZE
+        )
+        if field_type not in TIFF_TYPES:
+            continue
+        value_format = f'{byte_order}{count}{TIFF_TYPES[field_type]}'
+        size = struct.calcsize(value_format)
+        if size > 4:
+            # the values that don't fit in the entry are stored elsewhere
+            value = read(struct.unpack(byte_order + 'I', value)[0], size)
+        tags[tag] = struct.unpack_from(value_format, value)
+    return byte_order, tags
+
+
+def get_tag(tags, tag, default=None):
+    """Returns the values of a tag, default when the tag is missing or ValueError without default"""
+    if tag not in tags:
+        if default is None:
+            raise ValueError(f'Missing TIFF tag {tag}')
+        return default
+    return tags[tag]
+
+
+def get_sample_dtype(tags, byte_order):
+    bits_per_sample = get_tag(tags, BITS_PER_SAMPLE, (1,))[0]
+    sample_format = get_tag(tags, SAMPLE_FORMAT, (1,))[0]
+    if sample_format == SAMPLE_FORMAT_FLOAT and bits_per_sample == 32:
+        return np.dtype(byte_order + 'f4')
+    if sample_format == SAMPLE_FORMAT_INT and bits_per_sample in (16, 32):
+        return np.dtype(f'{byte_order}i{bits_per_sample // 8}')
+    raise ValueError(
+        f'Unsupported TIFF samples of {bits_per_sample} bits (sample format {sample_format})'
+    )
+
+
+def get_block_layout(tags):
+    """Returns the size of the image, the size of its blocks and their offsets and byte counts"""
+    cols = get_tag(tags, IMAGE_WIDTH)[0]
+    rows = get_tag(tags, IMAGE_LENGTH)[0]
+    if TILE_OFFSETS in tags:
+        block_width = get_tag(tags, TILE_WIDTH)[0]
+        block_length = get_tag(tags, TILE_LENGTH)[0]
+        offsets = get_tag(tags, TILE_OFFSETS)
+        byte_counts = get_tag(tags, TILE_BYTE_COUNTS)
+    else:
+        # a strip is a block as wide as the image
+        block_width = cols
+        block_length = min(get_tag(tags, ROWS_PER_STRIP, (rows,))[0], rows)
+        offsets = get_tag(tags, STRIP_OFFSETS)
+        byte_counts = get_tag(tags, STRIP_BYTE_COUNTS)
+    return (
+        cols,
+        rows,
+        block_width,
+        block_length,
+        np.asarray(offsets, dtype=np.int64),
+        np.asarray(byte_counts, dtype=np.int64)
+    )
+
+
+def get_gdal_scale_offset(metadata):
+    """Returns the scale and offset of the first band from the GDAL_METADATA XML"""
+    scale, offset = 1.0, 0.0
+    metadata = metadata.rstrip(b'\0')
+    if not metadata:
+        return scale, offset
+    try:
+        items = ElementTree.fromstring(metadata).iter('Item')
+    except ElementTree.ParseError as e:
+        raise ValueError(f'Invalid GDAL metadata: {e}') from e
+    for item in items:
+        if item.get('sample', '0') != '0':
+            continue
+        role = item.get('role') or item.get('name', '').lower()
+        if role == 'scale':
+            scale = float(item.text)
+        elif role == 'offset':
+            offset = float(item.text)
+    return scale, offset
+
+
+def decode_tiff_block(directory, data):
+    """Returns the cells of a block as a (block_length, block_width) array, north row first"""
+    if directory.compression != COMPRESSION_NONE:
+        data = zlib.decompress(data)
+    dtype = directory.dtype
+    # the last strip of an image can be shorter than the others
+    length = len(data) // (directory.block_width * dtype.itemsize)
+    if directory.predictor == PREDICTOR_FLOATING_POINT:
+        # each row holds the most significant bytes of all its cells, then the next bytes, etc.,
+        # and each byte is stored as the difference with the previous one
+        size = length * directory.block_width * dtype.itemsize
+        rows = np.frombuffer(data, dtype=np.uint8, count=size).reshape(length, -1)
+        rows = np.cumsum(rows, axis=1, dtype=np.uint8)
+        rows = rows.reshape(length, dtype.itemsize, directory.block_width).transpose(0, 2, 1)
+        return np.ascontiguousarray(rows).view(dtype.newbyteorder('>')).reshape(length, -1)
+    cells = np.frombuffer(data, dtype=dtype, count=length * directory.block_width)
+    cells = cells.reshape(length, -1)
+    if directory.predictor == PREDICTOR_HORIZONTAL:
+        # each cell is stored as the difference with the previous cell of its row
+        cells = np.cumsum(cells, axis=1, dtype=dtype)
+    return cells
+
+
+def read_tiff_file_directory(filename):
+    with open(filename, 'rb') as file:
+
+        def read(offset, size):
+            file.seek(offset)
+            return file.read(size)
+
+        return read_tiff_directory(read)
+
+
+def read_tiff_headers(filenames):
+    """Reads the directories of all the given GeoTIFF files and returns their grid size and cell
+    type as a TIFF_HEADER_DTYPE array
+    """
+    headers = np.zeros(len(filenames), dtype=TIFF_HEADER_DTYPE)
+    for i, filename in enumerate(filenames):
+        directory = read_tiff_file_directory(filename)
+        headers[i] = (
+            directory.cols,
+            directory.rows,
+            directory.dtype.itemsize,
+            1 if directory.dtype.kind == 'f' else 0,
+            directory.scale,
+            directory.offset,
+            directory.nodata
+        )
+    return headers
+
+
+def write_tiff(
+    filename,
+    image,
+    block_size=256,
+    compress=False,
+    scale=1.0,
+    offset=0.0,
+    nodata=None,
+    geo_tags=None
+):
+    """Writes a single band, little-endian TIFF file of square blocks (like the quantized tiles)
+
+    image is a (rows, cols) array of 16 or 32 bits integers, north row first. The compressed blocks
+    are deflated with the horizontal predictor. geo_tags are additional (tag, TIFF type, values)
+    entries, e.g. the georeferencing.
+    """
+    image = np.asarray(image)
+    image = np.ascontiguousarray(image, dtype=image.dtype.newbyteorder('<'))
+    predictor = PREDICTOR_HORIZONTAL if compress else PREDICTOR_NONE
+    blocks = [
+        encode_predictor(block, predictor) for block in cut_blocks(image, block_size, block_size)
+    ]
+    if compress:
+        blocks = [zlib.compress(block) for block in blocks]
+    tags = [
+        (TILE_WIDTH, 4, [block_size]),
+        (TILE_LENGTH, 4, [block_size]),
+        (TILE_OFFSETS, 4, get_block_offsets(blocks)),
+        (TILE_BYTE_COUNTS, 4, [len(block) for block in blocks]),
+    ]
+    tags += get_image_tags(image, compress, predictor)
+    tags += get_gdal_tags(scale, offset, nodata) + (geo_tags or [])
+    write_tiff_file(filename, blocks, tags)
+
+
+def write_tiff_file(filename, blocks, tags, byte_order='<'):
+    """Writes the TIFF header, the encoded blocks one after the other and the image directory of
+    the (tag, type, values) tags
+    """
+    ifd_offset = TIFF_HEADER_SIZE + sum(len(block) for block in blocks)
+    with open(filename, 'wb') as file:
+        file.write(
+            (b'II' if byte_order == '<' else b'MM') +
+            struct.pack(byte_order + 'HI', 42, ifd_offset)
+        )
+        file.write(b''.join(blocks))
+        file.write(pack_tiff_directory(sorted(tags), ifd_offset, byte_order))
+
+
+def cut_blocks(image, block_width, block_length):
+    """Returns the blocks of the image row by row, the blocks on the right and bottom edges are
+    padded
+    """
+    rows, cols = image.shape
+    blocks = []
+    for y in range(0, rows, block_length):
+        for x in range(0, cols, block_width):
+            block = np.zeros((block_length, block_width), dtype=image.dtype)
+            part = image[y:y + block_length, x:x + block_width]
+            block[:part.shape[0], :part.shape[1]] = part
+            blocks.append(block)
+    return blocks
+
+
+def get_block_offsets(blocks):
+    """Returns the offsets of the blocks written one after the other after the TIFF header"""
+    return np.cumsum([TIFF_HEADER_SIZE] + [len(block) for block in blocks[:-1]]).tolist()
+
+
+def get_image_tags(image, compress, predictor):
+    """Returns the tags describing the image and its samples"""
+    return [
+        (IMAGE_WIDTH, 4, [image.shape[1]]),
+        (IMAGE_LENGTH, 4, [image.shape[0]]),
+        (BITS_PER_SAMPLE, 3, [image.dtype.itemsize * 8]),
+        (COMPRESSION, 3, [COMPRESSION_DEFLATE[0] if compress else COMPRESSION_NONE]),
+        # black is zero
+        (262, 3, [1]),
+        (SAMPLES_PER_PIXEL, 3, [1]),
+        (PREDICTOR, 3, [predictor]),
+        (SAMPLE_FORMAT, 3, [SAMPLE_FORMAT_FLOAT if image.dtype.kind == 'f' else SAMPLE_FORMAT_INT]),
+    ]
+
+
+def get_gdal_tags(scale, offset, nodata):
+    """Returns the GDAL tags of the scale, offset and nodata value, when they are set"""
+    tags = []
+    if scale != 1.0 or offset != 0.0:
+        metadata = (
+            '<GDALMetadata>'
+            f'<Item name="OFFSET" sample="0" role="offset">{offset!r}</Item>'
+            f'<Item name="SCALE" sample="0" role="scale">{scale!r}</Item>'
+            '</GDALMetadata>'
+        )
+        tags.append((GDAL_METADATA, 2, [metadata.encode() + b'\0']))
+    if nodata is not None:
+        tags.append((GDAL_NODATA, 2, [f'{nodata!r}'.encode() + b'\0']))
+    return tags
+
+
+def encode_predictor(block, predictor):
+    if predictor == PREDICTOR_HORIZONTAL:
+        # inverse of decode_tiff_block
+        block = block.copy()
+        block[:, 1:] = block[:, 1:] - block[:, :-1]
+    return np.ascontiguousarray(block).tobytes()
+
+
+def pack_tiff_directory(tags, ifd_offset, byte_order='<'):
+    """Returns the image directory of the (tag, type, values) tags written at ifd_offset, followed
+    by the values that don't fit in the entries
+    """
+    entries = b''
+    values_data = b''
+    values_offset = ifd_offset + 2 + len(tags) * TIFF_ENTRY_SIZE + 4
+    for tag, field_type, values in tags:
+        if field_type == 2:
+            value = values[0]
+            count = len(value)
+        else:
+            value = struct.pack(f'{byte_order}{len(values)}{TIFF_TYPES[field_type]}', *values)
+            count = len(values)
+        if len(value) > 4:
+            pointer = struct.pack(byte_order + 'I', values_offset + len(values_data))
+            # values are aligned on words
+            values_data += value + b'\0' * (len(value) % 2)
+            value = pointer
+        entries += struct.pack(byte_order + 'HHI', tag, field_type, count) + value.ljust(4, b'\0')
+    return struct.pack(byte_order + 'H', len(tags)) + entries + struct.pack(byte_order + 'I', 0) + \
+        values_data
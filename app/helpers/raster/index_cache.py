@@ -0,0 +1,135 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from app.helpers.raster.tile_registry import TILE_DTYPE
+from app.helpers.raster.tile_registry import TileRegistry
+
+logger = logging.getLogger(__name__)
+
+INDEX_CACHE_MAGIC = b'ALTIIDX1'
+# magic, key length, number of tiles, file names length
+INDEX_CACHE_HEADER = struct.Struct('<8sIII')
+
+
+def get_index_cache_file(index_file, cache_dir=None):
+    """Returns the path of the compiled index of the given index.shp
+
+    By default the compiled index is written next to the index file, when a cache directory is
+    given the path of the index file is hashed in the name, so that the indexes of the different
+    spatial references don't collide.
+    """
+    index_file = Path(index_file)
+    if not cache_dir:
+        return index_file.with_suffix('.tileindex')
+    digest = hashlib.sha1(str(index_file).encode()).hexdigest()[:16]
+    return Path(cache_dir) / f'{index_file.stem}-{digest}.tileindex'
+
+
+def get_index_cache_key(index_file):
+    """Identifies the source of a compiled index, it must be rebuilt as soon as the key changes
+
+    The key changes with the content, size or modification time of index.shp and index.dbf. The
+    tiles themselves are not checked: a tile replaced in place under an unchanged index keeps its
+    compiled header until the index files are touched or the compiled index is deleted.
+    """
+    sources = {}
+    for source in (Path(index_file), Path(index_file).with_suffix('.dbf')):
+        stat = source.stat()
+        sources[source.suffix] = [stat.st_size, stat.st_mtime_ns, hash_file(source)]
+    return json.dumps(
+        {
+            'index_file': str(index_file), 'sources': sources, 'dtype': str(TILE_DTYPE.descr)
+        },
+        sort_keys=True
+    ).encode()
+
+
+def hash_file(filename):
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_index_cache(index_file, registry, cache_dir=None):
+    """Writes the tile registry of index_file as a compiled index, returns True on success
+
+    The mosaic data is often mounted read-only, in which case the compiled index is just not
+    written.
+    """
+    cache_file = get_index_cache_file(index_file, cache_dir)
+    try:
+        key = get_index_cache_key(index_file)
+        filenames = registry.filename_data
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # write in a temporary file first, so that other workers never read a partial index
+        with tempfile.NamedTemporaryFile(dir=cache_file.parent, delete=False) as file:
+            temp_file = file.name
+            try:
+                file.write(
+                    INDEX_CACHE_HEADER.pack(
+                        INDEX_CACHE_MAGIC, len(key), len(registry), len(filenames)
+                    )
+                )
+                file.write(key)
+                file.write(registry.tiles.tobytes())
+                file.write(filenames)
+                file.close()
+                # temporary files are only readable by their owner, the workers may run as
+                # another user than the one who wrote the compiled index
+                os.chmod(temp_file, 0o644)
+                os.replace(temp_file, cache_file)
+            except Exception:
+                # no stray temporary file is left in the index directory
+                with contextlib.suppress(OSError):
+                    os.unlink(temp_file)
+                raise
+    except OSError as e:
+        logger.warning('Could not write the compiled index %s: %s', cache_file, e)
+        return False
+    logger.info('Compiled index %s written with %d tiles', cache_file, len(registry))
+    return True
+
+
+def load_index_cache(index_file, cache_dir=None):
+    """Returns the tile registry of index_file from its compiled index
+
+    Returns None when there is no compiled index or when it is outdated or invalid.
+    """
+    cache_file = get_index_cache_file(index_file, cache_dir)
+    try:
+        key = get_index_cache_key(index_file)
+        data = cache_file.read_bytes()
+    except OSError as e:
+        logger.debug('No compiled index %s: %s', cache_file, e)
+        return None
+    try:
+        magic, key_length, nb_tiles, filenames_length = INDEX_CACHE_HEADER.unpack_from(data)
+        offset = INDEX_CACHE_HEADER.size
+        tiles_length = nb_tiles * TILE_DTYPE.itemsize
+        if magic != INDEX_CACHE_MAGIC or \
+                len(data) != offset + key_length + tiles_length + filenames_length:
+            raise ValueError('invalid size or magic number')
+        if data[offset:offset + key_length] != key:
+            logger.info('Compiled index %s is outdated', cache_file)
+            return None
+        offset += key_length
+        tiles = np.frombuffer(data, dtype=TILE_DTYPE, count=nb_tiles, offset=offset).copy()
+        offset += tiles_length
+        registry = TileRegistry.from_tiles(tiles, data[offset:])
+        if len(registry.filename_offsets) - 1 != max(nb_tiles, 1):
+            raise ValueError('invalid file names table')
+    except (struct.error, ValueError) as e:
+        logger.warning('Invalid compiled index %s: %s', cache_file, e)
+        return None
+    logger.info('Compiled index %s loaded with %d tiles', cache_file, nb_tiles)
+    return registry
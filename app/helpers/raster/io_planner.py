@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def plan_reads(cells, max_gap):
+    """Groups the cells to read in contiguous ranges
+
+    Returns the sorted unique cells, the position in them of each requested cell and the list of
+    (start, end) slices of the unique cells that are read together. Consecutive cells of a slice are
+    at most max_gap cells apart, the cells in between are read and thrown away.
+    """
+    unique_cells, inverse = np.unique(cells, return_inverse=True)
+    inverse = inverse.ravel()
+    if unique_cells.size == 0:
+        return unique_cells, inverse, []
+    breaks = np.flatnonzero(np.diff(unique_cells) > max_gap + 1) + 1
+    starts = np.concatenate(([0], breaks)).tolist()
+    ends = np.concatenate((breaks, [unique_cells.size])).tolist()
+    return unique_cells, inverse, list(zip(starts, ends))
+
+
+def read_cells(read, cells, dtype, max_gap=0):
+    """Reads the given cells with as few reads as possible
+
+    Cells hit more than once are only read once, and nearby cells are merged in one range read.
+    read(first_cell, nb_cells) must return the bytes of nb_cells consecutive cells, the values are
+    returned in the order of cells.
+    """
+    dtype = np.dtype(dtype)
+    unique_cells, inverse, ranges = plan_reads(cells, max_gap)
+    values = np.empty(unique_cells.size, dtype=dtype)
+    for start, end in ranges:
+        first_cell = int(unique_cells[start])
+        nb_cells = int(unique_cells[end - 1]) - first_cell + 1
+        block = np.frombuffer(read(first_cell, nb_cells), dtype=dtype)
+        values[start:end] = block[unique_cells[start:end] - first_cell]
+    return values[inverse]
@@ -0,0 +1,68 @@
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class LruCache(object):
+    """Bookkeeping of the per process pools and caches of the rasters
+
+    The entries are kept from the least to the most recently used, with the hits, misses and
+    evictions counted. A subclass tells when it is full (_is_full) and releases what an evicted
+    entry holds (_evict). _get and _put must be called with the lock held.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        # only protects the bookkeeping, the subclasses decide what is done while holding it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate
+        }
+
+    def _get(self, key):
+        """Returns the entry of key, which becomes the most recently used, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key, entry):
+        """Adds the entry of key, then evicts the least recently used entries while full"""
+        self._entries[key] = entry
+        while self._is_full():
+            self.evictions += 1
+            evicted_key, evicted_entry = self._entries.popitem(last=False)
+            self._evict(evicted_key, evicted_entry)
+            logger.debug('%s evicted, %s stats: %s', evicted_key, type(self).__name__, self.stats())
+
+    def _is_full(self):
+        raise NotImplementedError()
+
+    def _evict(self, key, entry):
+        pass
+
+    def clear(self):
+        with self._lock:
+            while self._entries:
+                self._evict(*self._entries.popitem(last=False))
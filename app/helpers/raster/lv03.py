@@ -0,0 +1,114 @@
+"""Sampling of the LV95 raster with LV03 (EPSG:21781) coordinates
+
+LV95 coordinates are LV03 coordinates shifted by 2'000'000m east and 1'000'000m north, up to the
+local distortions of LV03 (less than 2m, about a cell of the DTM). The translation alone is the fast
+path. The accurate path adds these distortions, interpolated in a grid of shifts, e.g. sampled from
+the FINELTRA transformation of swisstopo.
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LV95_OFFSET_X = 2000000.0
+LV95_OFFSET_Y = 1000000.0
+
+
+def lv03_to_lv95(xs, ys):
+    """Returns the LV95 coordinates of the LV03 points (xs, ys), translated only"""
+    return (
+        np.asarray(xs, dtype=np.float64) + LV95_OFFSET_X,
+        np.asarray(ys, dtype=np.float64) + LV95_OFFSET_Y
+    )
+
+
+class ShiftGrid(object):
+    """Regular grid of the LV03 to LV95 shifts, on top of the translation
+
+    The grid is read from a .npz file with origin_x, origin_y (LV03 coordinates of the first node),
+    spacing (in meters) and shift_x, shift_y ((columns, rows) arrays in meters, the LV95 coordinates
+    minus the translated LV03 coordinates). The shifts are interpolated bilinearly, the points
+    outside the grid get the shifts of the closest edge.
+    """
+
+    def __init__(self, origin_x, origin_y, spacing, shift_x, shift_y):
+        self.origin_x = float(origin_x)
+        self.origin_y = float(origin_y)
+        self.spacing = float(spacing)
+        self.shift_x = np.asarray(shift_x, dtype=np.float64)
+        self.shift_y = np.asarray(shift_y, dtype=np.float64)
+        if self.shift_x.ndim != 2 or self.shift_x.shape != self.shift_y.shape or \
+                min(self.shift_x.shape) < 2 or self.spacing <= 0 or not np.isfinite(self.spacing):
+            raise ValueError('The shift grid must have at least 2x2 nodes and a positive spacing')
+
+    @classmethod
+    def from_file(cls, filename):
+        with np.load(filename) as grid:
+            result = cls(
+                grid['origin_x'],
+                grid['origin_y'],
+                grid['spacing'],
+                grid['shift_x'],
+                grid['shift_y']
+            )
+        logger.info(
+            'LV03 shift grid %s loaded: %dx%d nodes every %sm',
+            filename,
+            *result.shift_x.shape,
+            result.spacing
+        )
+        return result
+
+    def interpolate(self, xs, ys):
+        """Returns the shifts (x and y) at the LV03 points (xs, ys)"""
+        nb_cols, nb_rows = self.shift_x.shape
+        # NaN coordinates stay NaN once shifted, whatever their shift
+        positions_x = np.clip(
+            np.nan_to_num((np.asarray(xs) - self.origin_x) / self.spacing), 0, nb_cols - 1
+        )
+        positions_y = np.clip(
+            np.nan_to_num((np.asarray(ys) - self.origin_y) / self.spacing), 0, nb_rows - 1
+        )
+        # the last node is interpolated from the cell before it
+        cols = np.minimum(np.floor(positions_x).astype(np.int64), nb_cols - 2)
+        rows = np.minimum(np.floor(positions_y).astype(np.int64), nb_rows - 2)
+        weights_x = positions_x - cols
+        weights_y = positions_y - rows
+
+        def interpolate(shifts):
+            south = shifts[cols, rows] * (1 - weights_x) + shifts[cols + 1, rows] * weights_x
+            north = shifts[cols, rows + 1] * (1 - weights_x) + \
+                shifts[cols + 1, rows + 1] * weights_x
+            return south * (1 - weights_y) + north * weights_y
+
+        return interpolate(self.shift_x), interpolate(self.shift_y)
+
+    def lv03_to_lv95(self, xs, ys):
+        """Returns the LV95 coordinates of the LV03 points (xs, ys)"""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        shifts_x, shifts_y = self.interpolate(xs, ys)
+        return xs + LV95_OFFSET_X + shifts_x, ys + LV95_OFFSET_Y + shifts_y
+
+
+class LV03Raster(object):
+    """LV03 view of an LV95 GeoRaster
+
+    The points are converted to LV95 before being sampled, the callers keep their LV03 coordinates.
+    """
+
+    def __init__(self, raster, shift_grid=None):
+        self.raster = raster
+        self.transform = shift_grid.lv03_to_lv95 if shift_grid is not None else lv03_to_lv95
+
+    @property
+    def registry(self):
+        return self.raster.registry
+
+    def get_heights(self, xs, ys):
+        return self.raster.get_heights(*self.transform(xs, ys))
+
+    def get_height_for_coordinate(self, x, y):
+        xs, ys = self.transform([x], [y])
+        return self.raster.get_height_for_coordinate(xs.item(), ys.item())
@@ -0,0 +1,123 @@
+"""Conversion of a raster mosaic to a quantized mosaic
+
+The heights are stored as int16 decimeters relative to an offset chosen per tile (Swiss altitudes
+span less than the 6553m an int16 can hold), in tiled GeoTIFF files carrying the scale, offset and
+nodata value of GDAL, with a new index.shp listing them. The altitudes returned by the service are
+rounded to the decimeter (see filter_altitude), so they are the same with the quantized mosaic,
+which is half the size of a float mosaic. Usage:
+
+    DTM_BASE_PATH=. python -m app.helpers.raster.quantize <index.shp> <output directory>
+"""
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from app.helpers.raster.georaster import GeoRaster
+from app.helpers.raster.geotiff import MODEL_PIXEL_SCALE
+from app.helpers.raster.geotiff import MODEL_TIEPOINT
+from app.helpers.raster.geotiff import write_tiff
+from app.helpers.raster.shapefile import get_column
+from app.helpers.raster.shapefile import read_index
+from app.helpers.raster.shapefile import write_index
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_NODATA = -32768
+QUANTIZED_SCALE = 0.1
+DECIMETERS_PER_METER = 10
+QUANTIZED_MAX = 32767
+
+
+def round_decimeters(heights):
+    """Returns the heights in whole decimeters, rounded like round(height, 1)
+
+    round() rounds the exact value of the double, height * 10 can be rounded up to a tie that
+    doesn't exist, so the heights close to a tie are rounded one by one.
+    """
+    tenths = np.asarray(heights, dtype=np.float64) * DECIMETERS_PER_METER
+    decimeters = np.round(tenths)
+    ties = np.flatnonzero(np.abs(tenths - np.floor(tenths) - 0.5) < 1e-6)
+    for i in ties.tolist():
+        decimeters[i] = round(round(float(heights[i]), 1) * DECIMETERS_PER_METER)
+    return decimeters.astype(np.int64)
+
+
+def quantize_heights(heights):
+    """Returns the int16 cells and the offset (in meters) of the heights, NaN heights are nodata"""
+    heights = np.asarray(heights, dtype=np.float64)
+    valid = np.isfinite(heights)
+    cells = np.full(heights.shape, QUANTIZED_NODATA, dtype=np.int16)
+    if not valid.any():
+        return cells, 0.0
+    decimeters = round_decimeters(heights[valid])
+    low = int(decimeters.min())
+    high = int(decimeters.max())
+    # a whole number of meters in the middle of the range of the tile
+    offset = round((low + high) / 2 / DECIMETERS_PER_METER) * DECIMETERS_PER_METER
+    if high - offset > QUANTIZED_MAX or low - offset < -QUANTIZED_MAX:
+        raise ValueError(
+            f'The heights from {low / DECIMETERS_PER_METER}m to {high / DECIMETERS_PER_METER}m '
+            'cannot be stored in int16 decimeters'
+        )
+    cells[valid] = decimeters - offset
+    return cells, offset / DECIMETERS_PER_METER
+
+
+def convert_mosaic(index_file, output_dir, compress=False, block_size=256):
+    """Writes the quantized tiles of the mosaic of index_file and their index.shp in output_dir"""
+    index = read_index(index_file)
+    raster = GeoRaster(
+        index_file,
+        registry=GeoRaster.create_registry_from_columns(
+            index_file, index.bounds, get_column(index, 'location')
+        )
+    )
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    locations = []
+    written = set()
+    for tile_id in range(len(raster.registry)):
+        tile = raster.get_tile_by_id(tile_id)
+        location = Path(tile.filename).stem + '.tif'
+        if location in written:
+            raise ValueError(f'Two tiles would be written in {location}')
+        # read_window doesn't go through the block cache
+        cells = tile.read_window(0, 0, tile.cols, tile.rows)
+        heights = tile.dequantize(cells) if tile.quantized else cells
+        cells, offset = quantize_heights(heights)
+        write_tiff(
+            output_dir / location,
+            # GeoTIFF rows go from north to south
+            cells.T[::-1],
+            block_size=block_size,
+            compress=compress,
+            scale=QUANTIZED_SCALE,
+            offset=offset,
+            nodata=QUANTIZED_NODATA,
+            geo_tags=[
+                (MODEL_PIXEL_SCALE, 12, [tile.resolution_x, tile.resolution_y, 0.0]),
+                (MODEL_TIEPOINT, 12, [0.0, 0.0, 0.0, tile.min_x, tile.max_y, 0.0]),
+            ]
+        )
+        locations.append(location)
+        written.add(location)
+        logger.debug('Tile %s quantized in %s (offset %sm)', tile.filename, location, offset)
+    write_index(output_dir / 'index.shp', index.bounds, locations)
+    logger.info('%d tiles of %s quantized in %s', len(locations), index_file, output_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Converts a raster mosaic to int16 decimeters')
+    parser.add_argument('index_file', help='index.shp of the mosaic to convert')
+    parser.add_argument('output_dir', help='directory of the quantized tiles and their index.shp')
+    parser.add_argument('--compress', action='store_true', help='deflate compress the tiles')
+    parser.add_argument('--block-size', type=int, default=256, help='size of the GeoTIFF blocks')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    convert_mosaic(args.index_file, args.output_dir, args.compress, args.block_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import logging
+import os
+from concurrent import futures
+
+from gevent import monkey
+from gevent import threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class ReadThreadPool(object):
+    """Bounded pool of threads running tile reads in parallel
+
+    The reads are positional reads, which release the GIL, so the reads of different tiles can
+    overlap. Under the gevent workers (threading monkey patched) the pool is made of native threads
+    of gevent, waiting for their results only blocks the current greenlet.
+
+    The threads are started on first use, in the worker process: a pool started before forking
+    would have no threads in the workers.
+    """
+
+    def __init__(self, max_threads):
+        self.max_threads = max(max_threads, 1)
+        self._executor = None
+        self._pid = None
+
+    def map(self, function, items):
+        """Returns [function(item) for item in items], calling function from the pool threads"""
+        return list(self._get_executor().map(function, items))
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            if monkey.is_module_patched('threading'):
+                self._executor = threadpool.ThreadPoolExecutor(self.max_threads)
+            else:
+                self._executor = futures.ThreadPoolExecutor(self.max_threads)
+            self._pid = os.getpid()
+            logger.debug('Read thread pool started with %d threads', self.max_threads)
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown()
+        self._executor = None
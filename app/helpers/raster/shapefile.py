@@ -0,0 +1,211 @@
+"""Bulk reader for the index shapefiles of the raster mosaics
+
+Unlike shputils/dbfutils, which read the files field by field, the whole .shp and .dbf files are
+read at once and their fixed-width records are decoded with NumPy structured dtypes.
+"""
+import logging
+import struct
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SHP_FILE_CODE = 9994
+SHP_HEADER_SIZE = 100
+SHP_RECORD_HEADER_SIZE = 8
+# shape types having a bounding box right after the shape type (polyline, polygon, multipoint)
+SHP_TYPES_WITH_BOUNDS = (3, 5, 8)
+
+DBF_HEADER_SIZE = 32
+DBF_FIELD_SIZE = 32
+
+# record_numbers and bounds have one row per shape, columns maps each dbf field name to the array of
+# its raw values, with one row per non deleted dbf record (row record_number - 1 for each shape)
+ShapeIndex = namedtuple('ShapeIndex', ['record_numbers', 'bounds', 'columns'])
+
+
+def get_shp_record_dtype(record_size):
+    return np.dtype(
+        {
+            'names': ['record_number', 'content_length', 'shape_type', 'bounds'],
+            'formats': ['>i4', '>i4', '<i4', ('<f8', 4)],
+            'offsets': [0, 4, 8, 12],
+            'itemsize': record_size
+        }
+    )
+
+
+def read_shp_bounds(file_name):
+    """Returns the record numbers and the (xmin, ymin, xmax, ymax) bounds of a .shp file
+
+    When all the records have the same length (e.g. an index of rectangular tiles), they are all
+    decoded at once, otherwise the record headers are walked through to find them. Records without
+    bounds (null shapes, points) are skipped.
+    """
+    data = Path(file_name).read_bytes()
+    if len(data) < SHP_HEADER_SIZE or struct.unpack_from('>i', data)[0] != SHP_FILE_CODE:
+        raise ValueError(f'{file_name} is not a shapefile')
+    records = None
+    if len(data) >= SHP_HEADER_SIZE + SHP_RECORD_HEADER_SIZE:
+        content_length = struct.unpack_from('>i', data, SHP_HEADER_SIZE + 4)[0]
+        record_size = SHP_RECORD_HEADER_SIZE + content_length * 2
+        nb_records, remainder = divmod(len(data) - SHP_HEADER_SIZE, record_size)
+        # every record must be long enough to hold the shape type and the bounds
+        if remainder == 0 and record_size >= SHP_RECORD_HEADER_SIZE + 36:
+            records = np.frombuffer(
+                data,
+                dtype=get_shp_record_dtype(record_size),
+                count=nb_records,
+                offset=SHP_HEADER_SIZE,
+            )
+            if not np.all(records['content_length'] == content_length):
+                records = None
+    if records is not None:
+        record_numbers = records['record_number'].astype(np.int64)
+        shape_types = records['shape_type']
+        bounds = records['bounds'].astype(np.float64)
+    else:
+        record_numbers, shape_types, bounds = _walk_shp_records(data)
+    with_bounds = np.isin(shape_types, SHP_TYPES_WITH_BOUNDS)
+    if not np.all(with_bounds):
+        logger.warning(
+            'Skipping %d records without bounds in %s', np.count_nonzero(~with_bounds), file_name
+        )
+    return record_numbers[with_bounds], bounds[with_bounds]
+
+
+def _walk_shp_records(data):
+    record_numbers = []
+    shape_types = []
+    bounds = []
+    offset = SHP_HEADER_SIZE
+    while offset + SHP_RECORD_HEADER_SIZE + 4 <= len(data):
+        record_number, content_length = struct.unpack_from('>ii', data, offset)
+        shape_type = struct.unpack_from('<i', data, offset + SHP_RECORD_HEADER_SIZE)[0]
+        record_numbers.append(record_number)
+        if shape_type in SHP_TYPES_WITH_BOUNDS:
+            bounds.append(struct.unpack_from('<4d', data, offset + SHP_RECORD_HEADER_SIZE + 4))
+        else:
+            bounds.append((np.nan,) * 4)
+        shape_types.append(shape_type)
+        offset += SHP_RECORD_HEADER_SIZE + content_length * 2
+    return (
+        np.asarray(record_numbers, dtype=np.int64),
+        np.asarray(shape_types, dtype=np.int32),
+        np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+    )
+
+
+def read_dbf_columns(file_name):
+    """Returns the raw values of each field of a .dbf file, without the deleted records"""
+    data = Path(file_name).read_bytes()
+    nb_records, header_size, record_size = struct.unpack_from('<4xLHH', data)
+    nb_fields = (header_size - DBF_HEADER_SIZE - 1) // DBF_FIELD_SIZE
+    names = []
+    formats = []
+    offsets = []
+    # each record starts with the deletion flag
+    offset = 1
+    for i in range(nb_fields):
+        name, size = struct.unpack_from('<11s5xB15x', data, DBF_HEADER_SIZE + i * DBF_FIELD_SIZE)
+        names.append(name.replace(b'\0', b'').decode())
+        formats.append(f'S{size}')
+        offsets.append(offset)
+        offset += size
+    terminator = data[DBF_HEADER_SIZE + nb_fields * DBF_FIELD_SIZE:][:1]
+    if terminator != b'\r':
+        logger.error('Invalid DBF terminator: %s', terminator)
+        raise ValueError(f'Invalid DBF terminator {terminator}')
+    records = np.frombuffer(
+        data,
+        dtype=np.dtype(
+            {
+                'names': ['deletion_flag'] + names,
+                'formats': ['S1'] + formats,
+                'offsets': [0] + offsets,
+                'itemsize': record_size
+            }
+        ),
+        count=nb_records,
+        offset=header_size
+    )
+    records = records[records['deletion_flag'] == b' ']
+    return {name: records[name] for name in names}
+
+
+def read_index(file_name):
+    """Reads an index shapefile (.shp and its .dbf) and returns it as a ShapeIndex"""
+    logger.debug('Read index %s', file_name)
+    record_numbers, bounds = read_shp_bounds(file_name)
+    columns = read_dbf_columns(str(file_name)[0:-4] + '.dbf')
+    logger.debug('Index %s read: %d shapes', file_name, len(record_numbers))
+    return ShapeIndex(record_numbers, bounds, columns)
+
+
+def get_column(index, name):
+    """Returns the values of the dbf field name of each shape of the index"""
+    return index.columns[name][index.record_numbers - 1]
+
+
+def write_index(file_name, bounds, locations):
+    """Writes an index shapefile (.shp, .shx and .dbf) with one rectangle per tile
+
+    bounds are the (xmin, ymin, xmax, ymax) of each tile and locations their file names, stored in
+    the location field like gdaltindex does.
+    """
+    bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+    records = [
+        pack_rectangle(record_number, *tile_bounds)
+        for record_number, tile_bounds in enumerate(bounds.tolist(), start=1)
+    ]
+    if len(bounds):
+        extent = (*bounds[:, :2].min(axis=0).tolist(), *bounds[:, 2:].max(axis=0).tolist())
+    else:
+        extent = (0.0, 0.0, 0.0, 0.0)
+
+    def pack_header(length):
+        # lengths are in 16 bits words, the shape type is polygon
+        return struct.pack('>i20xi', SHP_FILE_CODE, length // 2) + \
+            struct.pack('<ii4d32x', 1000, 5, *extent)
+
+    base_name = str(file_name)[0:-4]
+    with open(base_name + '.shp', 'wb') as file:
+        file.write(pack_header(SHP_HEADER_SIZE + sum(len(record) for record in records)))
+        file.write(b''.join(records))
+    with open(base_name + '.shx', 'wb') as file:
+        file.write(pack_header(SHP_HEADER_SIZE + len(records) * 8))
+        offset = SHP_HEADER_SIZE
+        for record in records:
+            file.write(struct.pack('>ii', offset // 2, (len(record) - SHP_RECORD_HEADER_SIZE) // 2))
+            offset += len(record)
+    write_dbf(base_name + '.dbf', locations)
+
+
+def pack_rectangle(record_number, xmin, ymin, xmax, ymax):
+    """Returns the .shp record of a rectangle, a polygon of one part starting at point 0"""
+    ring = [(xmin, ymin), (xmin, ymax), (xmax, ymax), (xmax, ymin), (xmin, ymin)]
+    content = struct.pack('<i4dii', 5, xmin, ymin, xmax, ymax, 1, len(ring)) + \
+        struct.pack('<i', 0) + b''.join(struct.pack('<2d', x, y) for x, y in ring)
+    return struct.pack('>ii', record_number, len(content) // 2) + content
+
+
+def write_dbf(file_name, locations):
+    """Writes the .dbf file of an index, with the locations in its only field"""
+    locations = [location.encode() for location in locations]
+    size = max(max((len(location) for location in locations), default=1), 1)
+    if size > 254:
+        raise ValueError(f'Location too long for a dbf field: {max(locations, key=len)}')
+    with open(file_name, 'wb') as file:
+        # dBASE III without date, one character field
+        file.write(
+            struct.pack(
+                '<B3xLHH20x', 3, len(locations), DBF_HEADER_SIZE + DBF_FIELD_SIZE + 1, 1 + size
+            )
+        )
+        file.write(struct.pack('<11sc4xBB14x', b'location', b'C', size, 0))
+        file.write(b'\r')
+        for location in locations:
+            file.write(b' ' + location.ljust(size))
+        file.write(b'\x1a')
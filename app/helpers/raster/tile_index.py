@@ -0,0 +1,286 @@
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# the bucket size is increased until there are at most that many buckets per tile
+MAX_BUCKETS_PER_TILE = 16
+
+
+class TileGridIndex(object):
+    # pylint: disable=too-many-instance-attributes
+    """Uniform grid bucket index over tile bounds
+
+    The plane is cut in square buckets (by default the size of a typical tile) and each tile is
+    registered in every bucket its bounds overlap. A lookup only has to check the few tiles of the
+    bucket containing the point, so its cost does not depend on the number of tiles.
+
+    Tiles are registered in their original order, so that when tiles overlap the same tile as with
+    a linear scan over the tile list is returned.
+
+    The buckets are kept in flat arrays: the tiles of bucket b are
+    bucket_tiles[bucket_offsets[b]:bucket_offsets[b + 1]].
+    """
+
+    def __init__(self, bounds, bucket_size=None):
+        """bounds is a (number of tiles, 4) array (or list) of (min_x, min_y, max_x, max_y)"""
+        self.bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        self.origin_x = 0.0
+        self.origin_y = 0.0
+        self.bucket_size = 1.0
+        self.nb_buckets_x = 0
+        self.nb_buckets_y = 0
+        self.bucket_offsets = np.zeros(1, dtype=np.int64)
+        self.bucket_tiles = np.empty(0, dtype=np.int64)
+        if len(self.bounds) == 0:
+            return
+        min_x, min_y, max_x, max_y = self.bounds.T
+        self.origin_x = float(min_x.min())
+        self.origin_y = float(min_y.min())
+        if bucket_size is None:
+            bucket_size = float(np.median(np.maximum(max_x - min_x, max_y - min_y)))
+        if bucket_size > 0:
+            self.bucket_size = float(bucket_size)
+        extent_x = float(max_x.max()) - self.origin_x
+        extent_y = float(max_y.max()) - self.origin_y
+        # a few tiles far away from the others must not create a huge, empty grid
+        while math.ceil(extent_x / self.bucket_size) * math.ceil(extent_y / self.bucket_size) > \
+                MAX_BUCKETS_PER_TILE * len(self.bounds):
+            self.bucket_size *= 2
+        self.nb_buckets_x = max(math.ceil(extent_x / self.bucket_size), 1)
+        self.nb_buckets_y = max(math.ceil(extent_y / self.bucket_size), 1)
+        self.bucket_tiles, self.bucket_offsets = self._fill_buckets()
+        logger.debug(
+            'Tile index built: %d tiles in %dx%d buckets of %sm',
+            len(self.bounds),
+            self.nb_buckets_x,
+            self.nb_buckets_y,
+            self.bucket_size
+        )
+
+    def _fill_buckets(self):
+        """Returns the tiles of the buckets and the offsets of the buckets in them"""
+        min_x, min_y, max_x, max_y = self.bounds.T
+        first_x = np.floor((min_x - self.origin_x) / self.bucket_size).astype(np.int64)
+        first_y = np.floor((min_y - self.origin_y) / self.bucket_size).astype(np.int64)
+        # tile bounds are half open, a tile ending on a bucket edge doesn't reach the next bucket
+        counts_x = np.ceil((max_x - self.origin_x) / self.bucket_size).astype(np.int64) - first_x
+        counts_y = np.ceil((max_y - self.origin_y) / self.bucket_size).astype(np.int64) - first_y
+        counts = np.maximum(counts_x, 0) * np.maximum(counts_y, 0)
+        # one entry per (tile, bucket) pair, in tile order
+        tile_ids = np.repeat(np.arange(len(self.bounds)), counts)
+        positions = np.arange(len(tile_ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+        buckets = (first_x[tile_ids] + positions // counts_y[tile_ids]) * self.nb_buckets_y + \
+            first_y[tile_ids] + positions % counts_y[tile_ids]
+        # a stable sort keeps the tiles of each bucket in their original order
+        return tile_ids[np.argsort(buckets, kind='stable')], np.concatenate(
+            ([0], np.cumsum(np.bincount(buckets, minlength=self.nb_buckets_x * self.nb_buckets_y)))
+        )
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def find(self, x, y):
+        """Returns the position of the first tile containing (x, y) or None"""
+        try:
+            i = math.floor((x - self.origin_x) / self.bucket_size)
+            j = math.floor((y - self.origin_y) / self.bucket_size)
+        except (ValueError, OverflowError):
+            # NaN or infinite coordinates
+            return None
+        if not (0 <= i < self.nb_buckets_x and 0 <= j < self.nb_buckets_y):
+            return None
+        bucket = i * self.nb_buckets_y + j
+        start, end = self.bucket_offsets[bucket:bucket + 2].tolist()
+        for tile_id in self.bucket_tiles[start:end].tolist():
+            min_x, min_y, max_x, max_y = self.bounds[tile_id].tolist()
+            if min_x <= x < max_x and min_y <= y < max_y:
+                return tile_id
+        return None
+
+    def find_all(self, xs, ys):
+        """Returns for each point the position of the first tile containing it, -1 if none
+
+        All the points are checked at once against the first tile of their bucket, then the points
+        still without tile against the second tile of their bucket, and so on.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        tile_ids = np.full(xs.shape, -1, dtype=np.int64)
+        if len(self.bounds) == 0 or xs.size == 0:
+            return tile_ids
+        points, starts, counts = self._find_buckets(xs, ys)
+        for k in range(int(counts.max(initial=0))):
+            candidates = np.flatnonzero((counts > k) & (tile_ids[points] < 0))
+            if candidates.size == 0:
+                break
+            candidate_points = points[candidates]
+            candidate_tiles = self.bucket_tiles[starts[candidates] + k]
+            inside = self._contains(candidate_tiles, xs[candidate_points], ys[candidate_points])
+            tile_ids[candidate_points[inside]] = candidate_tiles[inside]
+        return tile_ids
+
+    def _contains(self, tile_ids, xs, ys):
+        """Returns whether each tile contains its point"""
+        min_x, min_y, max_x, max_y = self.bounds[tile_ids].T
+        return (min_x <= xs) & (xs < max_x) & (min_y <= ys) & (ys < max_y)
+
+    def _find_buckets(self, xs, ys):
+        """Returns the positions of the points inside the grid, the offset of their bucket in
+        bucket_tiles and its number of tiles
+        """
+        with np.errstate(invalid='ignore', over='ignore'):
+            buckets_x = np.floor((xs - self.origin_x) / self.bucket_size)
+            buckets_y = np.floor((ys - self.origin_y) / self.bucket_size)
+        points = np.flatnonzero(
+            (buckets_x >= 0) & (buckets_x < self.nb_buckets_x) & (buckets_y >= 0) &
+            (buckets_y < self.nb_buckets_y)
+        )
+        buckets = buckets_x[points].astype(np.int64) * self.nb_buckets_y + \
+            buckets_y[points].astype(np.int64)
+        starts = self.bucket_offsets[buckets]
+        return points, starts, self.bucket_offsets[buckets + 1] - starts
+
+
+class TileMosaicIndex(object):
+    # pylint: disable=too-many-instance-attributes
+    """Virtual mosaic over the tiles of a regular tiling
+
+    When all the tiles have the same size and are aligned on a grid (like the 1km swissALTI3D
+    tiles), the column and row of the tile containing a point are computed from its coordinates and
+    a dense (columns, rows) table gives the tile at that place, -1 for the holes of the mosaic. A
+    lookup costs the same whatever the number of tiles and the lookups of a batch of points are a
+    few array operations.
+
+    The grid edges are the tile bounds themselves, so a point on (or rounded next to) an edge gets
+    the same tile as when checking the bounds of the tiles.
+    """
+
+    def __init__(self, origin_x, origin_y, tile_width, tile_height, tile_ids):
+        """tile_ids is a (columns, rows) array of the tile at each place of the mosaic
+
+        The places without a tile are -1.
+        """
+        self.origin_x = float(origin_x)
+        self.origin_y = float(origin_y)
+        self.tile_width = float(tile_width)
+        self.tile_height = float(tile_height)
+        self.tile_ids = np.asarray(tile_ids, dtype=np.int64)
+        self.nb_cols, self.nb_rows = self.tile_ids.shape
+        self.edges_x = self.origin_x + np.arange(self.nb_cols + 1) * self.tile_width
+        self.edges_y = self.origin_y + np.arange(self.nb_rows + 1) * self.tile_height
+        # single lookups are faster on lists than on numpy scalars
+        self.edges_x_list = self.edges_x.tolist()
+        self.edges_y_list = self.edges_y.tolist()
+        self.nb_tiles = int(np.count_nonzero(self.tile_ids >= 0))
+        logger.debug(
+            'Tile mosaic index built: %d tiles in %dx%d places of %sx%sm',
+            self.nb_tiles,
+            self.nb_cols,
+            self.nb_rows,
+            self.tile_width,
+            self.tile_height
+        )
+
+    @classmethod
+    def from_bounds(cls, bounds):
+        """Returns the virtual mosaic of the tiles or None if they don't form a regular tiling
+
+        The tiles must have the same size, start on the edges of a grid of that size, not overlap
+        and fill at least 1 / MAX_BUCKETS_PER_TILE of their extent.
+        """
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        if len(bounds) == 0:
+            return None
+        max_places = MAX_BUCKETS_PER_TILE * len(bounds)
+        grid_x = cls._get_grid_positions(bounds[:, 0], bounds[:, 2], max_places)
+        grid_y = cls._get_grid_positions(bounds[:, 1], bounds[:, 3], max_places)
+        if grid_x is None or grid_y is None:
+            return None
+        origin_x, tile_width, cols, nb_cols = grid_x
+        origin_y, tile_height, rows, nb_rows = grid_y
+        if nb_cols * nb_rows > max_places:
+            return None
+        places = cols * nb_rows + rows
+        if len(np.unique(places)) != len(places):
+            # overlapping tiles
+            return None
+        tile_ids = np.full(nb_cols * nb_rows, -1, dtype=np.int64)
+        tile_ids[places] = np.arange(len(bounds))
+        return cls(origin_x, origin_y, tile_width, tile_height, tile_ids.reshape(nb_cols, nb_rows))
+
+    @staticmethod
+    def _get_grid_positions(mins, maxs, max_places):
+        """Returns the origin, size, tile positions and number of places of the grid along one axis
+
+        Returns None if the tiles don't have the same size along the axis, don't start on the grid
+        edges or need more than max_places places.
+        """
+        size = float(maxs[0] - mins[0])
+        # the sizes can differ by a rounding error, the edges are checked exactly below
+        if not (size > 0 and np.allclose(maxs - mins, size, rtol=1e-9, atol=0)):
+            return None
+        origin = float(mins.min())
+        positions = np.round((mins - origin) / size).astype(np.int64)
+        nb_places = int(positions.max()) + 1
+        if nb_places > max_places:
+            return None
+        # the bounds must be the grid edges exactly, for the lookups to match the bounds checks
+        edges = origin + np.arange(nb_places + 1) * size
+        if not (
+            np.array_equal(mins, edges[positions]) and np.array_equal(maxs, edges[positions + 1])
+        ):
+            return None
+        return origin, size, positions, nb_places
+
+    def __len__(self):
+        return self.nb_tiles
+
+    def find(self, x, y):
+        """Returns the position of the tile containing (x, y) or None"""
+        try:
+            i = math.floor((x - self.origin_x) / self.tile_width)
+            j = math.floor((y - self.origin_y) / self.tile_height)
+        except (ValueError, OverflowError):
+            # NaN or infinite coordinates
+            return None
+        # the division can be rounded over an edge
+        i = min(max(i, 0), self.nb_cols - 1)
+        j = min(max(j, 0), self.nb_rows - 1)
+        i += int(x >= self.edges_x_list[i + 1]) - int(x < self.edges_x_list[i])
+        j += int(y >= self.edges_y_list[j + 1]) - int(y < self.edges_y_list[j])
+        if not (0 <= i < self.nb_cols and 0 <= j < self.nb_rows):
+            return None
+        tile_id = self.tile_ids.item(i, j)
+        return tile_id if tile_id >= 0 else None
+
+    def find_all(self, xs, ys):
+        """Returns for each point the position of the tile containing it, -1 if none"""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        tile_ids = np.full(xs.shape, -1, dtype=np.int64)
+        if xs.size == 0:
+            return tile_ids
+        with np.errstate(invalid='ignore', over='ignore'):
+            cols = np.floor((xs - self.origin_x) / self.tile_width)
+            rows = np.floor((ys - self.origin_y) / self.tile_height)
+        points = np.flatnonzero(np.isfinite(cols) & np.isfinite(rows))
+        cols = np.clip(cols[points], 0, self.nb_cols - 1).astype(np.int64)
+        rows = np.clip(rows[points], 0, self.nb_rows - 1).astype(np.int64)
+        x = xs[points]
+        y = ys[points]
+        cols += (x >= self.edges_x[cols + 1]).astype(np.int64) - (x < self.edges_x[cols])
+        rows += (y >= self.edges_y[rows + 1]).astype(np.int64) - (y < self.edges_y[rows])
+        inside = (cols >= 0) & (cols < self.nb_cols) & (rows >= 0) & (rows < self.nb_rows)
+        tile_ids[points[inside]] = self.tile_ids[cols[inside], rows[inside]]
+        return tile_ids
+
+
+def create_tile_index(bounds):
+    """Returns the virtual mosaic of the tiles when they form a regular tiling, else a grid index"""
+    index = TileMosaicIndex.from_bounds(bounds)
+    if index is None:
+        index = TileGridIndex(bounds)
+    return index
@@ -0,0 +1,165 @@
+import logging
+
+import numpy as np
+
+from app.helpers.raster.geotiff import read_tiff_headers
+
+logger = logging.getLogger(__name__)
+
+# the .bt header is 256 bytes long, cells are stored right after it
+BT_HEADER_SIZE = 256
+
+# the part of the .bt header we need, see http://vterrain.org/Implementation/Formats/BT.html
+BT_HEADER_DTYPE = np.dtype(
+    {
+        'names': ['cols', 'rows', 'data_size', 'floating_point'],
+        'formats': ['<u4', '<u4', '<i2', '<i2'],
+        'offsets': [10, 14, 18, 20],
+        'itemsize': BT_HEADER_SIZE
+    }
+)
+
+TILE_DTYPE = np.dtype(
+    [
+        ('min_x', np.float64),
+        ('min_y', np.float64),
+        ('max_x', np.float64),
+        ('max_y', np.float64),
+        ('resolution_x', np.float64),
+        ('resolution_y', np.float64),
+        ('cols', np.uint32),
+        ('rows', np.uint32),
+        ('data_size', np.uint8),
+        ('floating_point', np.uint8),
+        ('filename', np.uint32),
+        ('format', np.uint8),
+        # the heights are cell * scale + offset, nodata is NaN when the tile has no nodata value
+        ('scale', np.float64),
+        ('offset', np.float64),
+        ('nodata', np.float64),
+    ]
+)
+
+# the header fields of the tiles of all the formats, the .bt tiles have no scale, offset nor nodata
+TILE_HEADER_FIELDS = ('cols', 'rows', 'data_size', 'floating_point', 'scale', 'offset', 'nodata')
+
+# formats of the tile files
+TILE_FORMAT_BT = 0
+TILE_FORMAT_GEOTIFF = 1
+TILE_FORMATS = {'.bt': TILE_FORMAT_BT, '.tif': TILE_FORMAT_GEOTIFF, '.tiff': TILE_FORMAT_GEOTIFF}
+
+
+def get_data_format(data_size, floating_point):
+    if floating_point == 1:
+        return "<f"
+    if data_size == 2:
+        return "<h"
+    return "<i"
+
+
+def get_tile_format(filename):
+    """Returns the format of a tile file from its extension, None if not supported"""
+    return TILE_FORMATS.get(filename[filename.rfind('.'):].lower())
+
+
+def read_bt_headers(filenames):
+    """Reads the headers of all the given .bt files and returns them as a BT_HEADER_DTYPE array"""
+    headers = bytearray(len(filenames) * BT_HEADER_SIZE)
+    view = memoryview(headers)
+    for i, filename in enumerate(filenames):
+        with open(filename, 'rb') as file:
+            file.readinto(view[i * BT_HEADER_SIZE:(i + 1) * BT_HEADER_SIZE])
+    return np.frombuffer(headers, dtype=BT_HEADER_DTYPE)
+
+
+def read_headers(filenames, formats):
+    """Reads the headers of tiles of any format, returns them as a TILE_DTYPE array of which only
+    the TILE_HEADER_FIELDS are set
+    """
+    headers = np.zeros(len(filenames), dtype=TILE_DTYPE)
+    headers['scale'] = 1.0
+    headers['nodata'] = np.nan
+    formats = np.asarray(formats, dtype=np.uint8)
+    for tile_format, read in ((TILE_FORMAT_BT, read_bt_headers),
+                              (TILE_FORMAT_GEOTIFF, read_tiff_headers)):
+        positions = np.flatnonzero(formats == tile_format)
+        if positions.size:
+            tile_headers = read([filenames[i] for i in positions.tolist()])
+            for name in TILE_HEADER_FIELDS:
+                if name in tile_headers.dtype.names:
+                    headers[name][positions] = tile_headers[name]
+    return headers
+
+
+class TileRegistry(object):
+    """Columnar registry of all the tiles of a mosaic
+
+    Bounds, grid sizes, resolutions, cell types and formats of the tiles are kept in one structured
+    array (one row per tile) and the file names in one NUL separated byte string, instead of one
+    Python object per tile. The tile headers are all read when the registry is created, so nothing
+    has to be parsed on the request path.
+    """
+
+    def __init__(self, bounds, filenames, headers=None):
+        """bounds is a list of (min_x, min_y, max_x, max_y) tuples, one per file name
+
+        When headers is not given, they are read from the tile files. The format of each tile is
+        given by the extension of its file name, see TILE_FORMATS.
+        """
+        formats = [get_tile_format(filename) for filename in filenames]
+        if None in formats:
+            raise ValueError(f'Unsupported tile format: {filenames[formats.index(None)]}')
+        if headers is None:
+            headers = read_headers(filenames, formats)
+        self.tiles = np.zeros(len(filenames), dtype=TILE_DTYPE)
+        self._set_filename_data('\0'.join(filenames).encode())
+        if len(filenames) == 0:
+            return
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        for i, name in enumerate(('min_x', 'min_y', 'max_x', 'max_y')):
+            self.tiles[name] = bounds[:, i]
+        self.tiles['scale'] = 1.0
+        self.tiles['nodata'] = np.nan
+        for name in TILE_HEADER_FIELDS:
+            if name in headers.dtype.names:
+                self.tiles[name] = headers[name]
+        self.tiles['resolution_x'] = (self.tiles['max_x'] - self.tiles['min_x']) / headers['cols']
+        self.tiles['resolution_y'] = (self.tiles['max_y'] - self.tiles['min_y']) / headers['rows']
+        self.tiles['filename'] = np.arange(len(filenames))
+        self.tiles['format'] = formats
+        logger.debug('Tile registry created with %d tiles', len(filenames))
+
+    @classmethod
+    def from_tiles(cls, tiles, filename_data):
+        """Creates a registry from an already built TILE_DTYPE array and its NUL separated file
+        names
+        """
+        registry = cls.__new__(cls)
+        registry.tiles = tiles
+        registry._set_filename_data(filename_data)  # pylint: disable=protected-access
+        return registry
+
+    def _set_filename_data(self, filename_data):
+        self.filename_data = bytes(filename_data)
+        separators = np.flatnonzero(np.frombuffer(self.filename_data, dtype=np.uint8) == 0)
+        # filename k is filename_data[filename_offsets[k] + 1:filename_offsets[k + 1]]
+        self.filename_offsets = np.concatenate(([-1], separators, [len(self.filename_data)]))
+
+    def __len__(self):
+        return len(self.tiles)
+
+    @property
+    def filenames(self):
+        if len(self.tiles) == 0:
+            return []
+        return self.filename_data.decode().split('\0')
+
+    @property
+    def bounds(self):
+        """Returns the bounds of the tiles as a (number of tiles, 4) array"""
+        return np.stack([self.tiles[name] for name in ('min_x', 'min_y', 'max_x', 'max_y')], axis=1)
+
+    def get_filename(self, tile_id):
+        k = int(self.tiles['filename'][tile_id])
+        start = int(self.filename_offsets[k]) + 1
+        return self.filename_data[start:int(self.filename_offsets[k + 1])].decode()
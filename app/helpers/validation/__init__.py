@@ -1,8 +1,9 @@
-from shapely.geometry import Polygon
+import numpy as np
 
 from flask import abort
 
 from app.helpers.helpers import float_raise_nan
+from app.helpers.wgs84 import WGS84_SRID
 from app.settings import VALID_SRID
 
 bboxes = {
@@ -19,6 +20,13 @@ bboxes = {
             float_raise_nan(-26000),  # ymin: expanded to cover old and new
             float_raise_nan(940000),  # xmax: expanded to cover old and new
             float_raise_nan(456000)  # ymax: expanded to cover old and new
+        ),
+    4326:
+        (
+            float_raise_nan(4.5),  # xmin: expanded to cover the LV95 bbox
+            float_raise_nan(44.8),  # ymin: expanded to cover the LV95 bbox
+            float_raise_nan(12.0),  # xmax: expanded to cover the LV95 bbox
+            float_raise_nan(48.8)  # ymax: expanded to cover the LV95 bbox
         )
 }
 
@@ -31,16 +39,40 @@ def srs_guesser(geom):
         return sr
 
     if geom_type in ('Point', 'LineString'):
-        for epsg, bbox in bboxes.items():
-            dtm_poly = Polygon(
-                [(bbox[0], bbox[1]), (bbox[2], bbox[1]), (bbox[2], bbox[3]), (bbox[0], bbox[3])]
-            )
-            if dtm_poly.contains(geom):
-                sr = epsg
-                break
+        sr = srs_guesser_from_coordinates(np.asarray(geom.coords, dtype=np.float64))
     return sr
 
 
+def srs_guesser_from_coordinates(coordinates):
+    """Returns the spatial reference whose bbox contains the Point or the LineString of coordinates
+    (a (number of points, 2) array), None if there is none
+
+    Same as shapely contains: the points are in the bbox, and the geometry does not only
+    run along its border.
+    """
+    if len(coordinates) == 0:
+        return None
+    xs = coordinates[:, 0]
+    ys = coordinates[:, 1]
+    # a Point is a segment from the point to itself
+    first = slice(None, -1) if len(coordinates) > 1 else slice(None)
+    last = slice(1, None) if len(coordinates) > 1 else slice(None)
+    for epsg, (xmin, ymin, xmax, ymax) in bboxes.items():
+        if epsg == WGS84_SRID:
+            # WGS84 coordinates are never guessed, they must be given with sr=4326
+            continue
+        inside = (xs >= xmin) & (xs <= xmax) & (ys >= ymin) & (ys <= ymax)
+        if not inside.all():
+            continue
+        # the segments lying on a side of the bbox, on its border
+        on_border = np.zeros(xs[first].shape, dtype=bool)
+        for values, side in ((xs, xmin), (xs, xmax), (ys, ymin), (ys, ymax)):
+            on_border |= (values[first] == side) & (values[last] == side)
+        if not on_border.all():
+            return epsg
+    return None
+
+
 def validate_sr(sr):
     if sr not in VALID_SRID:
         abort(
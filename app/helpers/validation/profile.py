@@ -1,14 +1,20 @@
+import json
 import logging
 
-import geojson
-from shapely.errors import GEOSException
-from shapely.geometry import shape
+import numpy as np
 
 from flask import abort
 from flask import request
 
+from app.helpers.geometry_encodings import POLYLINE_DEFAULT_PRECISION
+from app.helpers.geometry_encodings import POLYLINE_MAX_PRECISION
+from app.helpers.geometry_encodings import decode_float64_pairs
+from app.helpers.geometry_encodings import decode_polyline
+from app.helpers.geometry_encodings import decode_wkb
 from app.helpers.profile_helpers import PROFILE_MAX_AMOUNT_POINTS
-from app.helpers.validation import srs_guesser
+from app.helpers.profile_helpers import SMOOTHING_DEFAULT_KERNEL
+from app.helpers.profile_helpers import SMOOTHING_KERNELS
+from app.helpers.validation import srs_guesser_from_coordinates
 from app.helpers.validation import validate_sr
 from app.settings import strtobool
 
@@ -16,12 +22,20 @@ logger = logging.getLogger(__name__)
 max_content_length = 32 * 1024 * 1024  # 32MB
 
 PROFILE_VALID_GEOMETRY_TYPES = ['LineString', 'Point']
+# the coordinates are rounded as geojson did it when parsing the geometries
+GEOJSON_PRECISION = 6
+PROFILE_GEOMETRY_FORMATS = ['geojson', 'polyline']
+WKB_CONTENT_TYPE = 'application/wkb'
+# little-endian float64 (x, y) pairs
+FLOAT64_CONTENT_TYPE = 'application/octet-stream'
+PROFILE_BINARY_CONTENT_TYPES = [WKB_CONTENT_TYPE, FLOAT64_CONTENT_TYPE]
 
 
 def get_args():
     args = dict(request.args)
     if request.method == 'POST':
-        if request.content_type != "application/x-www-form-urlencoded" and not request.is_json:
+        if request.content_type != "application/x-www-form-urlencoded" and not request.is_json \
+                and request.mimetype not in PROFILE_BINARY_CONTENT_TYPES:
             abort(415, f'{request.content_type} non allowed')
         if request.content_type == "application/x-www-form-urlencoded":
             args.update(request.form)
@@ -29,44 +43,157 @@ def get_args():
 
 
 def read_linestring(args):
-    # param geom, list of coordinates defining the line on which we want a profile
+    # param geom, list of coordinates defining the line on which we want a profile, as GEOJSON or
+    # as encoded polyline (geom_format=polyline), or a WKB or float64 array body
+    # returns the coordinates as a (number of points, 2) float64 array
+    geom_type, coordinates = _read_geometry(args)
+
+    if not _is_valid(geom_type, coordinates):
+        abort(400, f"Invalid {geom_type}")
+
+    if len(coordinates) > PROFILE_MAX_AMOUNT_POINTS:
+        abort(
+            413,
+            "Request Geometry contains too many points. Maximum number of points allowed: "
+            f"{PROFILE_MAX_AMOUNT_POINTS}, found {len(coordinates)}"
+        )
+    return coordinates
+
+
+def _read_geometry(args):
     linestring = None
-    geom = None
-    geom_to_shape = None
     if 'geom' in args:
         linestring = args.get('geom')
-    elif request.method == 'POST' and request.is_json:
+    elif request.method == 'POST' and (
+        request.is_json or request.mimetype in PROFILE_BINARY_CONTENT_TYPES
+    ):
         if request.content_length and 0 < request.content_length < max_content_length:
-            linestring = request.get_data(as_text=True)  # read as text
+            if request.is_json:
+                linestring = request.get_data(as_text=True)  # read as text
+            else:
+                return _read_binary_geometry(request.mimetype, request.get_data())
 
     if not linestring:
         abort(400, "No 'geom' given, cannot create a profile without coordinates")
 
+    if read_geom_format(args) == 'polyline':
+        return _read_polyline(linestring, read_polyline_precision(args))
+    return _read_geojson(linestring)
+
+
+def _read_geojson(linestring):
+    geom = None
     try:
-        geom = geojson.loads(linestring, object_hook=geojson.GeoJSON.to_instance)
+        geom = json.loads(linestring, parse_constant=_reject_constant)
     except ValueError as e:
         logger.error('Invalid "geom" parameter, it is not geojson: %s', e)
         abort(400, "Invalid geom parameter, must be a GEOJSON")
 
-    if geom.get('type') not in PROFILE_VALID_GEOMETRY_TYPES:
+    geom_type = geom.get('type') if isinstance(geom, dict) else None
+    if geom_type not in PROFILE_VALID_GEOMETRY_TYPES:
         abort(400, f"geom parameter must be a {'/'.join(PROFILE_VALID_GEOMETRY_TYPES)} GEOJSON")
 
-    try:
-        geom_to_shape = shape(geom)
-    except GEOSException as e:
-        logger.error("Failed to transformed GEOJSON to shape: %s", e)
+    coordinates = _read_coordinates(geom_type, geom.get('coordinates'))
+    if coordinates is None:
+        logger.error("Failed to read the coordinates of the %s: %s", geom_type, linestring)
         abort(400, "Error converting GEOJSON to Shape")
+    return geom_type, coordinates
+
+
+def _read_polyline(linestring, precision):
+    coordinates = None
+    try:
+        coordinates = decode_polyline(linestring, precision)
+    except ValueError as e:
+        logger.error('Invalid "geom" parameter, it is not an encoded polyline: %s', e)
+        abort(400, "Invalid geom parameter, must be an encoded polyline")
+    return _geometry_type(coordinates), coordinates
+
+
+def _read_binary_geometry(content_type, data):
+    geom_type = None
+    coordinates = None
+    try:
+        if content_type == WKB_CONTENT_TYPE:
+            geom_type, coordinates = decode_wkb(data)
+        else:
+            coordinates = decode_float64_pairs(data)
+            geom_type = _geometry_type(coordinates)
+    except ValueError as e:
+        logger.error('Invalid %s body: %s', content_type, e)
+        abort(400, f"Invalid {content_type} body: {e}")
+    return geom_type, coordinates
+
+
+def _geometry_type(coordinates):
+    # the encodings without geometry type give a Point for a single point
+    return 'Point' if len(coordinates) == 1 else 'LineString'
 
-    if not geom_to_shape.is_valid:
-        abort(400, f"Invalid {geom['type']}")
 
-    if len(geom_to_shape.coords) > PROFILE_MAX_AMOUNT_POINTS:
+def _reject_constant(constant):
+    raise ValueError(f"Number '{constant}' is not JSON compliant")
+
+
+def _read_coordinates(geom_type, coordinates):
+    """Returns the coordinates of a Point or a LineString as a (number of points, 2) float64 array,
+    or None if they are not a list of 2D or 3D points (a single point for a Point)
+    """
+    if coordinates is None or (isinstance(coordinates, list) and len(coordinates) == 0):
+        # an empty geometry, invalid
+        return np.empty((0, 2), dtype=np.float64)
+    try:
+        array = np.asarray(coordinates)
+    except (ValueError, OverflowError):
+        # nested lists of different lengths
+        return None
+    # only numbers (and booleans, as geojson did), no strings or null
+    if array.dtype.kind not in 'biuf':
+        return None
+    if geom_type == 'Point':
+        array = array[np.newaxis]
+    if array.ndim != 2 or array.shape[1] not in (2, 3):
+        return None
+    if geom_type == 'LineString' and len(array) < 2:
+        # shapely refused to build a LineString of a single point
+        return None
+    return np.round(array[:, :2].astype(np.float64), GEOJSON_PRECISION)
+
+
+def _is_valid(geom_type, coordinates):
+    # same as shapely: finite coordinates and at least 2 distinct points for a LineString
+    if len(coordinates) == 0 or not np.isfinite(coordinates).all():
+        return False
+    if geom_type == 'Point':
+        return len(coordinates) == 1
+    return bool((coordinates[1:] != coordinates[0]).any())
+
+
+def read_geom_format(args):
+    # param geom_format, how the geom param is encoded
+    geom_format = args.get('geom_format', 'geojson')
+    if geom_format not in PROFILE_GEOMETRY_FORMATS:
         abort(
-            413,
-            "Request Geometry contains too many points. Maximum number of points allowed: "
-            f"{PROFILE_MAX_AMOUNT_POINTS}, found {len(geom_to_shape.coords)}"
+            400,
+            "Please provide a valid geom_format, one of: "
+            f"{', '.join(PROFILE_GEOMETRY_FORMATS)}"
+        )
+    return geom_format
+
+
+def read_polyline_precision(args):
+    # param polyline_precision, number of decimals of the encoded polyline coordinates
+    precision = args.get('polyline_precision', POLYLINE_DEFAULT_PRECISION)
+    try:
+        precision = int(precision)
+    except ValueError:
+        precision = -1
+    if not 0 <= precision <= POLYLINE_MAX_PRECISION:
+        abort(
+            400,
+            "Please provide an integer between 0 and "
+            f"{POLYLINE_MAX_PRECISION} for the parameter 'polyline_precision'"
         )
-    return geom_to_shape
+    return precision
 
 
 def read_number_points(args):
@@ -99,7 +226,7 @@ def read_number_points(args):
     return nb_points
 
 
-def read_spatial_reference(linestring, args):
+def read_spatial_reference(coordinates, args):
     # param sr (or projection, sr meaning spatial reference), which Swiss projection to use.
     # Possible values are expressed in int, so value for EPSG:2056 (LV95) is 2056
     # and value for EPSG:21781 (LV03) is 21781. If this param is not present, it will be guessed
@@ -109,7 +236,7 @@ def read_spatial_reference(linestring, args):
     elif 'projection' in args:
         spatial_reference = int(args.get('projection'))
     else:
-        sr = srs_guesser(linestring)
+        sr = srs_guesser_from_coordinates(coordinates)
         if sr is None:
             abort(400, "No 'sr' given and cannot be guessed from 'geom'")
         spatial_reference = sr
@@ -131,6 +258,18 @@ def read_offset(args):
     return offset
 
 
+def read_smoothing_kernel(args):
+    # param smoothing_kernel, weights of the neighbours in the smoothing (see offset)
+    smoothing_kernel = args.get('smoothing_kernel', SMOOTHING_DEFAULT_KERNEL)
+    if smoothing_kernel not in SMOOTHING_KERNELS:
+        abort(
+            400,
+            "Please provide a valid smoothing_kernel, one of: "
+            f"{', '.join(SMOOTHING_KERNELS)}"
+        )
+    return smoothing_kernel
+
+
 def read_only_requested_points(args):
     if 'only_requested_points' in args:
         try:
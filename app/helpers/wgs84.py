@@ -0,0 +1,33 @@
+"""Conversions between WGS84 (EPSG:4326) and LV95 (EPSG:2056) coordinates
+
+The approximate formulas of swisstopo are used, accurate to about a meter in Switzerland, which is
+half a cell of the DTM. They are polynomials, so whole arrays of coordinates are converted at once.
+"""
+import numpy as np
+
+WGS84_SRID = 4326
+
+
+def wgs84_to_lv95(lons, lats):
+    """Returns the LV95 coordinates (easting, northing) of the WGS84 points (lons, lats)"""
+    # auxiliary values, from degrees to 10000 arc seconds relative to Bern
+    lons = (np.asarray(lons, dtype=np.float64) * 3600 - 26782.5) / 10000
+    lats = (np.asarray(lats, dtype=np.float64) * 3600 - 169028.66) / 10000
+    eastings = 2600072.37 + 211455.93 * lons - 10938.51 * lons * lats - \
+        0.36 * lons * lats**2 - 44.54 * lons**3
+    northings = 1200147.07 + 308807.95 * lats + 3745.25 * lons**2 + 76.63 * lats**2 - \
+        194.56 * lons**2 * lats + 119.79 * lats**3
+    return eastings, northings
+
+
+def lv95_to_wgs84(eastings, northings):
+    """Returns the WGS84 coordinates (lons, lats) of the LV95 points (eastings, northings)"""
+    # auxiliary values, in 1000km relative to Bern
+    eastings = (np.asarray(eastings, dtype=np.float64) - 2600000) / 1000000
+    northings = (np.asarray(northings, dtype=np.float64) - 1200000) / 1000000
+    # in 10000 arc seconds
+    lons = 2.6779094 + 4.728982 * eastings + 0.791484 * eastings * northings + \
+        0.1306 * eastings * northings**2 - 0.0436 * eastings**3
+    lats = 16.9023892 + 3.238272 * northings - 0.270978 * eastings**2 - \
+        0.002528 * northings**2 - 0.0447 * eastings**2 * northings - 0.0140 * northings**3
+    return lons * 100 / 36, lats * 100 / 36
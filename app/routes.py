@@ -18,6 +18,7 @@ from app.app import georaster_utils
 from app.helpers import make_error_msg
 from app.helpers.height_helpers import get_height
 from app.helpers.profile_helpers import PROFILE_DEFAULT_AMOUNT_POINTS
+from app.helpers.profile_helpers import Profile
 from app.helpers.profile_helpers import get_profile
 from app.helpers.validation import bboxes
 from app.helpers.validation import srs_guesser
@@ -31,6 +32,10 @@ ROUTE_PREFIX = '/rest/services/'
 
 logger = logging.getLogger(__name__)
 
+csv.register_dialect(
+    'semi-colon', delimiter=';', quoting=csv.QUOTE_ALL, quotechar='"', lineterminator='\r\n'
+)
+
 
 @app.errorhandler(Exception)
 def handle_exception(e):
@@ -92,12 +97,14 @@ def height_route():
 
 @app.route(f'{ROUTE_PREFIX}/profile.json', methods=['GET', 'POST'])
 def profile_json_route():
-    profile, status_code = _get_profile(True)
+    profile, status_code = _get_profile()
+    # the JSON points are created only now
+    points = profile.to_json()
     if "callback" in request.args:
-        data = f'{request.args.get("callback")}({json.dumps(profile, separators=(",", ":"))})'
+        data = f'{request.args.get("callback")}({json.dumps(points, separators=(",", ":"))})'
         response = make_response(data, {'Content-Type': 'application/javascript'})
     else:
-        response = make_response(jsonify(profile))
+        response = make_response(jsonify(points))
     return response, status_code
 
 
@@ -105,30 +112,40 @@ def profile_json_route():
 def profile_csv_route():
     if "callback" in request.args:
         abort(400, 'callback parameter not supported')
-    profile, status_code = _get_profile(False)
-    csv.register_dialect(
-        'semi-colon', delimiter=';', quoting=csv.QUOTE_ALL, quotechar='"', lineterminator='\r\n'
-    )
+    profile, status_code = _get_profile()
+    # the CSV is streamed, written chunk by chunk while it is sent
+    return _stream_csv(profile), status_code, {'Content-Type': 'text/csv'}
+
+
+def _stream_csv(profile):
     buffer = StringIO()
     writer = csv.writer(buffer, dialect='semi-colon')
     # write header
-    writer.writerow(profile['headers'])
-    writer.writerows(profile['rows'])
-    buffer.seek(0)
+    writer.writerow(Profile.CSV_HEADERS)
+    yield _flush(buffer)
+    for rows in profile.csv_chunks():
+        writer.writerows(rows)
+        yield _flush(buffer)
+
 
-    return buffer.read(), status_code, {'Content-Type': 'text/csv'}
+def _flush(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
 
 
-def _get_profile(output_to_json):
+def _get_profile():
     args = profile_arg_validation.get_args()
-    linestring = profile_arg_validation.read_linestring(args)
+    coordinates = profile_arg_validation.read_linestring(args)
     nb_points = profile_arg_validation.read_number_points(args)
     is_custom_nb_points = True
     if nb_points is None:
         nb_points = PROFILE_DEFAULT_AMOUNT_POINTS
         is_custom_nb_points = False
-    spatial_reference = profile_arg_validation.read_spatial_reference(linestring, args)
+    spatial_reference = profile_arg_validation.read_spatial_reference(coordinates, args)
     offset = profile_arg_validation.read_offset(args)
+    smoothing_kernel = profile_arg_validation.read_smoothing_kernel(args)
 
     # param only_requested_points, which is flag that when set to True will make
     # the profile with only the given points in geom (no filling points)
@@ -142,24 +159,22 @@ def _get_profile(output_to_json):
     keep_points = profile_arg_validation.read_distinct_points(args)
 
     result = get_profile(
-        geom=linestring,
+        coordinates=coordinates,
         spatial_reference=spatial_reference,
         nb_points=nb_points,
         offset=offset,
         only_requested_points=only_requested_points,
         smart_filling=smart_filling,
         keep_points=keep_points,
-        output_to_json=output_to_json,
-        georaster_utils=georaster_utils
+        georaster_utils=georaster_utils,
+        smoothing_kernel=smoothing_kernel
     )
 
     # If profile calculation resulted in a lower number of point than requested (because there's no
     # need to add points closer to each other than the min resolution of 2m), we return HTTP 203 to
     # notify that nb_points couldn't be match. Smartfilling can result in more points as expected.
     status_code = 200
-    if output_to_json and is_custom_nb_points and len(result) != nb_points:
-        status_code = 203
-    elif not output_to_json and is_custom_nb_points and len(result['rows']) != nb_points:
+    if is_custom_nb_points and len(result) != nb_points:
         status_code = 203
 
     return result, status_code
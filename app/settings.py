@@ -25,10 +25,22 @@ LOGGING_CFG = os.getenv('LOGGING_CFG', 'logging-cfg-local.yml')
 
 DTM_BASE_PATH = Path(os.getenv('DTM_BASE_PATH', '/var/local/profile/'))
 PRELOAD_RASTER_FILES = strtobool(os.getenv('PRELOAD_RASTER_FILES', 'False'))
+RASTER_INDEX_CACHE = strtobool(os.getenv('RASTER_INDEX_CACHE', 'True'))
+RASTER_INDEX_CACHE_DIR = os.getenv('RASTER_INDEX_CACHE_DIR', None)
+RASTER_MAX_OPEN_FILES = int(os.getenv('RASTER_MAX_OPEN_FILES', '128'))
+RASTER_READ_MAX_GAP = int(os.getenv('RASTER_READ_MAX_GAP', '4096'))
+RASTER_BLOCK_CACHE_SIZE = int(os.getenv('RASTER_BLOCK_CACHE_SIZE', '0'))
+RASTER_BLOCK_SIZE = int(os.getenv('RASTER_BLOCK_SIZE', '256'))
+RASTER_READ_THREADS = int(os.getenv('RASTER_READ_THREADS', '4'))
+RASTER_PARALLEL_MIN_TILES = int(os.getenv('RASTER_PARALLEL_MIN_TILES', '4'))
+RASTER_MMAP = strtobool(os.getenv('RASTER_MMAP', 'False'))
+RASTER_MMAP_MAX_TILES = int(os.getenv('RASTER_MMAP_MAX_TILES', '64'))
+RASTER_LV03_FROM_LV95 = strtobool(os.getenv('RASTER_LV03_FROM_LV95', 'False'))
+RASTER_LV03_SHIFT_GRID = os.getenv('RASTER_LV03_SHIFT_GRID', None)
 DFT_CACHE_HEADER = os.getenv('DFT_CACHE_HEADER', 'public, max-age=86400')
 
 TRAP_HTTP_EXCEPTIONS = True
 
-VALID_SRID = [21781, 2056]
+VALID_SRID = [21781, 2056, 4326]
 GUNICORN_WORKER_TMP_DIR = os.getenv("GUNICORN_WORKER_TMP_DIR", None)
 GUNICORN_KEEPALIVE = int(os.getenv("GUNICORN_KEEPALIVE", '2'))
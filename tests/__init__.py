@@ -1,10 +1,29 @@
 import json
 import random
+import zlib
+from struct import pack
 
+import numpy as np
 from shapely.geometry import LineString
 from shapely.geometry import Point
 from shapely.geometry import mapping
 
+from app.helpers.raster.geotiff import MODEL_PIXEL_SCALE
+from app.helpers.raster.geotiff import MODEL_TIEPOINT
+from app.helpers.raster.geotiff import PREDICTOR_FLOATING_POINT
+from app.helpers.raster.geotiff import ROWS_PER_STRIP
+from app.helpers.raster.geotiff import STRIP_BYTE_COUNTS
+from app.helpers.raster.geotiff import STRIP_OFFSETS
+from app.helpers.raster.geotiff import TILE_BYTE_COUNTS
+from app.helpers.raster.geotiff import TILE_LENGTH
+from app.helpers.raster.geotiff import TILE_OFFSETS
+from app.helpers.raster.geotiff import TILE_WIDTH
+from app.helpers.raster.geotiff import cut_blocks
+from app.helpers.raster.geotiff import encode_predictor
+from app.helpers.raster.geotiff import get_block_offsets
+from app.helpers.raster.geotiff import get_image_tags
+from app.helpers.raster.geotiff import write_tiff_file
+
 
 def generate_random_coord(srid):
     if srid == 2056:
@@ -28,3 +47,158 @@ def create_json(nb_pts, srid=2056):
     random_points = [p for p in generate_random_point(nb_pts, srid)]
     line = LineString(random_points)
     return json.dumps(mapping(line))
+
+
+def create_polyline(coordinates, precision=5):
+    """Encodes the (x, y) coordinates as a polyline of (y, x) pairs (Google encoded polyline)"""
+    chunks = []
+    previous = (0, 0)
+    for x, y in coordinates:
+        point = (round(y * 10**precision), round(x * 10**precision))
+        for value, previous_value in zip(point, previous):
+            value = value - previous_value
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous = point
+    return ''.join(chunks)
+
+
+def create_bt_file(filename, min_x, min_y, max_x, max_y, heights, floating_point=True):
+    """Writes a .bt tile, heights is a list of columns (west to east) of cells (south to north)"""
+    cols = len(heights)
+    rows = len(heights[0])
+    data_size = 4 if floating_point else 2
+    header = pack(
+        '<10sLLhhhhh4dhf',
+        b'binterr1.3',
+        cols,
+        rows,
+        data_size,
+        1 if floating_point else 0,
+        1,
+        0,
+        0,
+        min_x,
+        max_x,
+        min_y,
+        max_y,
+        0,
+        1.0
+    )
+    cell_format = '<f' if floating_point else '<h'
+    with open(filename, 'wb') as file:
+        file.write(header.ljust(256, b'\0'))
+        for column in heights:
+            for height in column:
+                file.write(pack(cell_format, height))
+
+
+def create_index_file(filename, tiles):
+    """Writes an index shapefile (.shp and .dbf), tiles is a list of (bounds, location)"""
+    shp_records = []
+    for i, ((min_x, min_y, max_x, max_y), _) in enumerate(tiles):
+        ring = [(min_x, min_y), (min_x, max_y), (max_x, max_y), (max_x, min_y), (min_x, min_y)]
+        content = pack('<i4dii', 5, min_x, min_y, max_x, max_y, 1, len(ring)) + pack('<i', 0)
+        content += b''.join(pack('<2d', x, y) for x, y in ring)
+        shp_records.append(pack('>ii', i + 1, len(content) // 2) + content)
+    header = pack('>i20xi', 9994, (100 + sum(len(record) for record in shp_records)) // 2)
+    header += pack('<ii4d32x', 1000, 5, 0, 0, 0, 0)
+    with open(filename, 'wb') as file:
+        file.write(header)
+        file.write(b''.join(shp_records))
+
+    size = max((len(location) for _, location in tiles), default=1)
+    with open(filename[0:-4] + '.dbf', 'wb') as file:
+        file.write(pack('<B3xLHH20x', 3, len(tiles), 32 + 32 + 1, 1 + size))
+        file.write(pack('<11sc4xBB14x', b'location', b'C', size, 0))
+        file.write(b'\r')
+        for _, location in tiles:
+            file.write(b' ' + location.encode().ljust(size))
+        file.write(b'\x1a')
+
+
+def to_shape_files(index):
+    """Returns the shapes of a shapefile.ShapeIndex in the format of SHPUtils.load_shape_file"""
+    names = list(index.columns)
+    shapes = []
+    for record_number, (xmin, ymin, xmax,
+                        ymax) in zip(index.record_numbers.tolist(), index.bounds.tolist()):
+        shapes.append(
+            {
+                'shp_data': {
+                    'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax
+                },
+                'dbf_data': {
+                    name: index.columns[name][record_number - 1] for name in names
+                }
+            }
+        )
+    return shapes
+
+
+def create_tiff_file(
+    filename,
+    min_x,
+    min_y,
+    max_x,
+    max_y,
+    heights,
+    floating_point=True,
+    block_size=(16, 16),
+    predictor=1,
+    compress=True,
+    byte_order='<'
+):
+    """Writes a single band GeoTIFF tile, heights is a list of columns (west to east) of cells
+    (south to north) like for create_bt_file
+
+    block_size is the (width, length) of the internal tiles, when None the image is written in
+    strips of 3 rows. Unlike geotiff.write_tiff, the tile can be big-endian, of floats and use any
+    predictor.
+    """
+    # TIFF rows go from north to south
+    image = np.asarray(heights, dtype=np.float32 if floating_point else np.int16).T[::-1]
+    image = np.ascontiguousarray(image, dtype=image.dtype.newbyteorder(byte_order))
+    blocks, tags = encode_tiff_blocks(image, block_size, predictor, compress)
+    resolution_x = (max_x - min_x) / image.shape[1]
+    tags += get_image_tags(image, compress, predictor) + [
+        (MODEL_PIXEL_SCALE, 12, [resolution_x, (max_y - min_y) / image.shape[0], 0.0]),
+        (MODEL_TIEPOINT, 12, [0.0, 0.0, 0.0, min_x, max_y, 0.0]),
+    ]
+    write_tiff_file(filename, blocks, tags, byte_order)
+
+
+def encode_tiff_blocks(image, block_size, predictor, compress):
+    # returns the encoded tiles (or strips of 3 rows) and the tags of their layout
+    if block_size is None:
+        blocks = [image[y:y + 3] for y in range(0, image.shape[0], 3)]
+    else:
+        blocks = cut_blocks(image, *block_size)
+    if predictor == PREDICTOR_FLOATING_POINT:
+        # most significant bytes first, then each byte as the difference with the previous one
+        blocks = [block.astype('>f4').view(np.uint8).reshape(len(block), -1, 4) for block in blocks]
+        blocks = [block.transpose(0, 2, 1).reshape(len(block), -1) for block in blocks]
+        for block in blocks:
+            block[:, 1:] = block[:, 1:] - block[:, :-1]
+        blocks = [np.ascontiguousarray(block).tobytes() for block in blocks]
+    else:
+        blocks = [encode_predictor(block, predictor) for block in blocks]
+    if compress:
+        blocks = [zlib.compress(block) for block in blocks]
+    offsets = get_block_offsets(blocks)
+    byte_counts = [len(block) for block in blocks]
+    if block_size is None:
+        return blocks, [
+            (STRIP_OFFSETS, 4, offsets),
+            (ROWS_PER_STRIP, 4, [3]),
+            (STRIP_BYTE_COUNTS, 4, byte_counts),
+        ]
+    return blocks, [
+        (TILE_WIDTH, 4, [block_size[0]]),
+        (TILE_LENGTH, 4, [block_size[1]]),
+        (TILE_OFFSETS, 4, offsets),
+        (TILE_BYTE_COUNTS, 4, byte_counts),
+    ]
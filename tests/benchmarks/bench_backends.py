@@ -0,0 +1,132 @@
+"""Size on disk, bytes read and time of the .bt and GeoTIFF tiles on the same synthetic mosaic
+
+The mosaic is a row of 1km tiles of 2m float cells, with a smooth terrain rounded to the centimeter
+like the swissALTI3D heights, stored once in .bt and once in GeoTIFF (256x256 blocks, deflate with
+floating point predictor). Profiles and single points are sampled with the block cache disabled,
+so that every request reads (and decodes) the tiles, then with the block cache. Run with
+`make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_backends
+"""
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from mock import patch
+
+from app.helpers.raster.georaster import BlockCache
+from app.helpers.raster.georaster import GeoRaster
+from app.helpers.raster.georaster import get_tiff_directory
+from app.helpers.raster.tile_registry import TileRegistry
+from tests import create_bt_file
+from tests import create_tiff_file
+from tests.benchmarks.bench_io_planner import CountingPool
+
+TILE_SIZE = 1000.0
+NB_CELLS = 500
+NB_TILES = 8
+ORIGIN_X, ORIGIN_Y = 2600000.0, 1200000.0
+NB_PROFILES = 50
+NB_POINTS = 500
+
+
+def create_heights(i):
+    x = (np.arange(NB_CELLS) + i * NB_CELLS)[:, np.newaxis] * 2.0
+    y = np.arange(NB_CELLS)[np.newaxis, :] * 2.0
+    heights = 1500 + 400 * np.sin(x / 700) * np.cos(y / 900) + 20 * np.sin(x / 40 + y / 55)
+    heights += np.random.default_rng(i).normal(0, 0.3, heights.shape)
+    return np.round(heights, 2).tolist()
+
+
+def create_rasters(tmp_dir):
+    bounds = []
+    filenames = {'.bt': [], '.tif': []}
+    for i in range(NB_TILES):
+        tile_bounds = (
+            ORIGIN_X + i * TILE_SIZE,
+            ORIGIN_Y,
+            ORIGIN_X + (i + 1) * TILE_SIZE,
+            ORIGIN_Y + TILE_SIZE
+        )
+        heights = create_heights(i)
+        bounds.append(tile_bounds)
+        for extension, names in filenames.items():
+            filename = str(Path(tmp_dir) / f'tile_{i}{extension}')
+            if extension == '.bt':
+                create_bt_file(filename, *tile_bounds, heights)
+            else:
+                create_tiff_file(
+                    filename, *tile_bounds, heights, block_size=(256, 256), predictor=3
+                )
+            names.append(filename)
+    rasters = {}
+    for extension, names in filenames.items():
+        rasters[extension] = GeoRaster(
+            str(Path(tmp_dir) / 'index.shp'), registry=TileRegistry(bounds, names)
+        )
+    return rasters, filenames
+
+
+def create_requests():
+    random.seed(0)
+    profiles = []
+    for _ in range(NB_PROFILES):
+        x, y = random.uniform(0, NB_TILES * TILE_SIZE - 1), random.uniform(0, TILE_SIZE - 1)
+        end_x = min(max(x + random.uniform(-1500, 1500), 0), NB_TILES * TILE_SIZE - 1)
+        end_y = random.uniform(0, TILE_SIZE - 1)
+        profiles.append(
+            (
+                ORIGIN_X + np.linspace(x, end_x, NB_POINTS),
+                ORIGIN_Y + np.linspace(y, end_y, NB_POINTS)
+            )
+        )
+    points = [
+        (
+            ORIGIN_X + random.uniform(0, NB_TILES * TILE_SIZE - 1),
+            ORIGIN_Y + random.uniform(0, TILE_SIZE - 1)
+        ) for _ in range(NB_PROFILES * 10)
+    ]
+    return profiles, points
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rasters, filenames = create_rasters(tmp_dir)
+        profiles, points = create_requests()
+        print(f'{NB_TILES} tiles, {NB_PROFILES} profiles and {len(points)} points')
+        print(
+            f'{"format":>7} {"size [MB]":>10} {"request":>8} {"cache":>6} {"reads":>7} '
+            f'{"read [MB]":>10} {"time [ms]":>10}'
+        )
+        expected = {}
+        for extension, raster in rasters.items():
+            size = sum(os.path.getsize(filename) for filename in filenames[extension]) / 1e6
+            for name, cache in (('profile', None), ('point', None), ('profile', True),
+                                ('point', True)):
+                pool = CountingPool(max_files=NB_TILES)
+                get_tiff_directory.cache_clear()
+                if cache:
+                    cache = BlockCache(64 * 1024 * 1024, 256)
+                with patch('app.helpers.raster.georaster.open_tiles', pool), \
+                        patch('app.helpers.raster.georaster.block_cache', cache), \
+                        patch('app.helpers.raster.georaster.read_threads', None):
+                    start = time.perf_counter()
+                    if name == 'profile':
+                        result = [raster.get_heights(xs, ys).tolist() for xs, ys in profiles]
+                    else:
+                        result = [raster.get_height_for_coordinate(x, y) for x, y in points]
+                    duration = time.perf_counter() - start
+                expected.setdefault(name, result)
+                assert np.allclose(result, expected[name])
+                print(
+                    f'{extension:>7} {size:>10.2f} {name:>8} {"yes" if cache else "no":>6} '
+                    f'{pool.reads:>7} {pool.bytes / 1e6:>10.2f} {duration * 1e3:>10.2f}'
+                )
+                pool.clear()
+
+
+if __name__ == '__main__':
+    main()
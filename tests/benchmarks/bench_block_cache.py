@@ -0,0 +1,77 @@
+"""Reads and time to serve repeated requests on a hot area, with and without the block cache
+
+Samples many short profiles around the same spot of a synthetic 1km tile of 2m float cells, like
+the requests on a popular hiking trail. Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_block_cache
+"""
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from mock import patch
+
+from app.helpers.raster.georaster import BinaryTerrainTile
+from app.helpers.raster.georaster import BlockCache
+from app.helpers.raster.tile_registry import TileRegistry
+from tests import create_bt_file
+from tests.benchmarks.bench_io_planner import CountingPool
+
+TILE_SIZE = 1000.0
+NB_CELLS = 500
+ORIGIN_X, ORIGIN_Y = 2600000.0, 1200000.0
+NB_REQUESTS = 500
+NB_POINTS = 200
+
+
+def create_requests():
+    random.seed(0)
+    requests = []
+    for _ in range(NB_REQUESTS):
+        x, y = random.uniform(200, 400), random.uniform(200, 400)
+        xs = ORIGIN_X + np.linspace(x, x + random.uniform(-150, 150), NB_POINTS)
+        ys = ORIGIN_Y + np.linspace(y, y + random.uniform(-150, 150), NB_POINTS)
+        requests.append((xs, ys))
+    return requests
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = str(Path(tmp_dir) / 'tile.bt')
+        heights = (np.arange(NB_CELLS * NB_CELLS) % 4000).reshape(NB_CELLS, NB_CELLS).tolist()
+        create_bt_file(
+            filename, ORIGIN_X, ORIGIN_Y, ORIGIN_X + TILE_SIZE, ORIGIN_Y + TILE_SIZE, heights
+        )
+        tile = BinaryTerrainTile(
+            TileRegistry(
+                [(ORIGIN_X, ORIGIN_Y, ORIGIN_X + TILE_SIZE, ORIGIN_Y + TILE_SIZE)], [filename]
+            ),
+            0
+        )
+        requests = create_requests()
+        print(f'{"block cache":>12} {"reads":>8} {"bytes":>10} {"hit rate":>9} {"time [ms]":>10}')
+        expected = None
+        for block_size in (None, 64, 256):
+            pool = CountingPool(max_files=1)
+            cache = BlockCache(16 * 1024 * 1024, block_size) if block_size else None
+            with patch('app.helpers.raster.georaster.open_tiles', pool), \
+                    patch('app.helpers.raster.georaster.block_cache', cache):
+                start = time.perf_counter()
+                result = [tile.get_heights(xs, ys).tolist() for xs, ys in requests]
+                duration = time.perf_counter() - start
+            if expected is None:
+                expected = result
+            assert result == expected
+            label = f'{block_size}x{block_size}' if block_size else 'none'
+            hit_rate = f'{cache.hit_rate:.2f}' if cache else '-'
+            print(
+                f'{label:>12} {pool.reads:>8} {pool.bytes:>10} {hit_rate:>9} '
+                f'{duration * 1e3:>10.2f}'
+            )
+            pool.clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Time to first byte and peak memory of the CSV profiles
+
+Compares the former writing of the whole CSV into a buffer, sent at once, with the CSV streamed by
+chunks, for profiles from the 5000 points maximum of the service up to 500000 points (to show how
+both grow with the size of the profile). The peak memory is the one allocated while writing the
+CSV, the profile columns excluded. Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_csv_streaming
+"""
+import csv
+import time
+import tracemalloc
+from io import StringIO
+
+import numpy as np
+
+from app.helpers.profile_helpers import PROFILE_MAX_AMOUNT_POINTS
+from app.helpers.profile_helpers import Profile
+from app.routes import _stream_csv
+
+
+def write_buffered(profile):
+    buffer = StringIO()
+    writer = csv.writer(buffer, dialect='semi-colon')
+    writer.writerow(Profile.CSV_HEADERS)
+    writer.writerows(profile.csv_rows())
+    buffer.seek(0)
+    yield buffer.read()
+
+
+def create_profile(nb_points, seed=42):
+    rng = np.random.default_rng(seed)
+    return Profile(
+        np.round(np.cumsum(rng.uniform(0, 4, nb_points)), 1),
+        np.round(rng.uniform(400, 4000, nb_points), 1),
+        np.round(rng.uniform(2600000, 2700000, nb_points), 3),
+        np.round(rng.uniform(1150000, 1250000, nb_points), 3)
+    )
+
+
+def measure(write, profile):
+    """Returns the time to the first chunk, the total time and the peak memory of the writing"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = write(profile)
+    next(chunks)
+    first_byte = time.perf_counter() - start
+    for _ in chunks:
+        pass
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte, total, peak
+
+
+def main():
+    print('times in ms (measured with tracemalloc on), peak memory in MB')
+    print(f'{"points":>8} {"writing":>9} {"first byte":>11} {"total":>9} {"peak memory":>12}')
+    for nb_points in (PROFILE_MAX_AMOUNT_POINTS, 50000, 500000):
+        profile = create_profile(nb_points)
+        for name, write in (('buffered', write_buffered), ('streamed', _stream_csv)):
+            first_byte, total, peak = measure(write, profile)
+            print(
+                f'{nb_points:>8} {name:>9} {first_byte * 1e3:>11.2f} {total * 1e3:>9.2f} '
+                f'{peak / 2**20:>12.2f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Cost of reading the geom parameter of a profile
+
+Compares the former parsing (geojson, then shapely for the validity and the coordinates) with the
+parsing straight into a coordinates array, for lines up to the 5000 points maximum of a profile,
+then the size and the decoding time of the other encodings of a 5000 points line. Run with
+`make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_geometry_parser
+"""
+import json
+import timeit
+
+import geojson
+import numpy as np
+from shapely.geometry import LineString
+from shapely.geometry import shape
+
+from app.helpers.geometry_encodings import decode_float64_pairs
+from app.helpers.geometry_encodings import decode_polyline
+from app.helpers.geometry_encodings import decode_wkb
+from app.helpers.profile_helpers import PROFILE_MAX_AMOUNT_POINTS
+from app.helpers.validation import srs_guesser
+from app.helpers.validation.profile import read_linestring
+from app.helpers.validation.profile import read_spatial_reference
+from tests import create_polyline
+
+NB_RUNS = 20
+
+
+def read_with_shapely(linestring):
+    geom = shape(geojson.loads(linestring, object_hook=geojson.GeoJSON.to_instance))
+    if not geom.is_valid:
+        raise ValueError('Invalid geometry')
+    return srs_guesser(geom), list(geom.coords)
+
+
+def read_with_arrays(linestring):
+    coordinates = read_linestring({'geom': linestring})
+    return read_spatial_reference(coordinates, {}), coordinates
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f'mean of {NB_RUNS} runs')
+    print(f'{"points":>8} {"shapely [ms]":>14} {"arrays [ms]":>14}')
+    for nb_points in (2, 100, 1000, PROFILE_MAX_AMOUNT_POINTS):
+        points = np.column_stack(
+            (
+                rng.uniform(2600000, 2700000, nb_points).round(2),
+                rng.uniform(1150000, 1250000, nb_points).round(2)
+            )
+        )
+        linestring = json.dumps({'type': 'LineString', 'coordinates': points.tolist()})
+        durations = [
+            timeit.timeit(
+                lambda function=function, linestring=linestring: function(linestring),
+                number=NB_RUNS
+            ) / NB_RUNS for function in (read_with_shapely, read_with_arrays)
+        ]
+        print(f'{nb_points:>8} {durations[0] * 1e3:>14.3f} {durations[1] * 1e3:>14.3f}')
+
+    print(f'{"encoding":>10} {"size [kB]":>10} {"decoding [ms]":>14}')
+    for name, data, decode in (
+        ('geojson', linestring, lambda data: read_linestring({'geom': data})),
+        ('polyline', create_polyline(points.tolist(), 2), lambda data: decode_polyline(data, 2)),
+        ('wkb', LineString(points).wkb, decode_wkb),
+        ('float64', points.astype('<f8').tobytes(), decode_float64_pairs),
+    ):
+        duration = timeit.timeit(lambda data=data, decode=decode: decode(data), number=NB_RUNS)
+        print(f'{name:>10} {len(data) / 1024:>10.1f} {duration / NB_RUNS * 1e3:>14.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Number of reads and bytes fetched to sample a dense profile inside one tile
+
+Compares one read per cell with the coalesced reads of the I/O planner, on a synthetic 1km tile of
+2m float cells. Note that the bytes column counts the requested bytes, the kernel always fetches
+whole pages from the mount: a read per cell of an east-west profile touches as many pages as one
+read over the whole tile. Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_io_planner
+"""
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from mock import patch
+
+from app.helpers.raster.georaster import BinaryTerrainTile
+from app.helpers.raster.georaster import TileFilePool
+from app.helpers.raster.tile_registry import TileRegistry
+from tests import create_bt_file
+
+TILE_SIZE = 1000.0
+NB_CELLS = 500
+ORIGIN_X, ORIGIN_Y = 2600000.0, 1200000.0
+NB_POINTS = 5000
+
+PROFILES = {
+    'north-south': ([500.0, 500.0], [0.0, 999.0]),
+    'east-west': ([0.0, 999.0], [500.0, 500.0]),
+    'diagonal': ([0.0, 999.0], [0.0, 999.0]),
+}
+
+
+class CountingPool(TileFilePool):
+
+    def __init__(self, max_files):
+        super().__init__(max_files)
+        self.reads = 0
+        self.bytes = 0
+
+    def pread(self, filename, size, offset):
+        self.reads += 1
+        self.bytes += size
+        return super().pread(filename, size, offset)
+
+
+def create_tile(tmp_dir):
+    filename = str(Path(tmp_dir) / 'tile.bt')
+    heights = (np.arange(NB_CELLS * NB_CELLS) % 4000).reshape(NB_CELLS, NB_CELLS).tolist()
+    create_bt_file(
+        filename, ORIGIN_X, ORIGIN_Y, ORIGIN_X + TILE_SIZE, ORIGIN_Y + TILE_SIZE, heights
+    )
+    return BinaryTerrainTile(
+        TileRegistry(
+            [(ORIGIN_X, ORIGIN_Y, ORIGIN_X + TILE_SIZE, ORIGIN_Y + TILE_SIZE)], [filename]
+        ),
+        0
+    )
+
+
+def sample(tile, xs, ys, max_gap):
+    """Returns the heights, the pool that counted the reads and the duration of the sampling"""
+    pool = CountingPool(max_files=1)
+    # without the block cache, which would serve the cells without going through the I/O planner
+    with patch('app.helpers.raster.georaster.open_tiles', pool), \
+            patch('app.helpers.raster.georaster.block_cache', None), \
+            patch('app.helpers.raster.georaster.RASTER_READ_MAX_GAP', max_gap):
+        start = time.perf_counter()
+        if max_gap is None:
+            # one read per sample, like before the I/O planner
+            result = [tile.get_height_for_coordinate(x, y) for x, y in zip(xs, ys)]
+        else:
+            result = tile.get_heights(xs, ys).tolist()
+        duration = time.perf_counter() - start
+    pool.clear()
+    return result, pool, duration
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tile = create_tile(tmp_dir)
+        print(f'{"profile":>12} {"max gap":>8} {"reads":>8} {"bytes":>10} {"time [ms]":>10}')
+        for name, ((start_x, end_x), (start_y, end_y)) in PROFILES.items():
+            xs = ORIGIN_X + np.linspace(start_x, end_x, NB_POINTS)
+            ys = ORIGIN_Y + np.linspace(start_y, end_y, NB_POINTS)
+            expected = [tile.get_height_for_coordinate(x, y) for x, y in zip(xs, ys)]
+            for max_gap in (None, 0, 4096):
+                result, pool, duration = sample(tile, xs, ys, max_gap)
+                assert result == expected
+                label = 'per cell' if max_gap is None else str(max_gap)
+                print(
+                    f'{name:>12} {label:>8} {pool.reads:>8} {pool.bytes:>10} '
+                    f'{duration * 1e3:>10.2f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Latency of a long profile spanning many tiles, with the tiles read serially or in parallel
+
+Samples a 5000 points profile over a row of synthetic 1km tiles. Local files are served from the
+page cache, so the reads are also timed with a simulated storage latency per read (like the network
+mount of the production data), which is where reading the tiles in parallel pays off. The block
+cache is disabled, so that every request reads its tiles. Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_parallel_reads
+"""
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from mock import patch
+
+from app.helpers.raster.georaster import GeoRaster
+from app.helpers.raster.georaster import TileFilePool
+from app.helpers.raster.read_threads import ReadThreadPool
+from app.helpers.raster.tile_registry import TileRegistry
+from tests import create_bt_file
+
+TILE_SIZE = 1000.0
+NB_CELLS = 250
+NB_TILES = 40
+ORIGIN_X, ORIGIN_Y = 2500000.0, 1200000.0
+NB_POINTS = 5000
+NB_REQUESTS = 10
+
+
+class SlowPool(TileFilePool):
+
+    def __init__(self, max_files, latency):
+        super().__init__(max_files)
+        self.latency = latency
+
+    def pread(self, filename, size, offset):
+        # sleeping releases the GIL, like waiting for the storage
+        time.sleep(self.latency)
+        return super().pread(filename, size, offset)
+
+
+def create_raster(tmp_dir):
+    bounds = []
+    filenames = []
+    heights = (np.arange(NB_CELLS * NB_CELLS) % 4000).reshape(NB_CELLS, NB_CELLS).tolist()
+    for i in range(NB_TILES):
+        tile_bounds = (
+            ORIGIN_X + i * TILE_SIZE,
+            ORIGIN_Y,
+            ORIGIN_X + (i + 1) * TILE_SIZE,
+            ORIGIN_Y + TILE_SIZE
+        )
+        filename = str(Path(tmp_dir) / f'tile_{i}.bt')
+        create_bt_file(filename, *tile_bounds, heights)
+        bounds.append(tile_bounds)
+        filenames.append(filename)
+    return GeoRaster(str(Path(tmp_dir) / 'index.shp'), registry=TileRegistry(bounds, filenames))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raster = create_raster(tmp_dir)
+        xs = np.linspace(ORIGIN_X, ORIGIN_X + NB_TILES * TILE_SIZE - 1, NB_POINTS)
+        ys = np.linspace(ORIGIN_Y, ORIGIN_Y + TILE_SIZE - 1, NB_POINTS)
+        print(f'{NB_POINTS} points over {NB_TILES} tiles, mean of {NB_REQUESTS} requests')
+        print(f'{"latency [ms]":>12} {"threads":>8} {"time [ms]":>10}')
+        expected = None
+        for latency in (0, 0.002):
+            for nb_threads in (0, 2, 4, 8):
+                pool = SlowPool(NB_TILES, latency)
+                threads = ReadThreadPool(nb_threads) if nb_threads else None
+                with patch('app.helpers.raster.georaster.open_tiles', pool), \
+                        patch('app.helpers.raster.georaster.block_cache', None), \
+                        patch('app.helpers.raster.georaster.read_threads', threads):
+                    # open the files first
+                    result = raster.get_heights(xs, ys).tolist()
+                    start = time.perf_counter()
+                    for _ in range(NB_REQUESTS):
+                        raster.get_heights(xs, ys)
+                    duration = (time.perf_counter() - start) / NB_REQUESTS
+                if expected is None:
+                    expected = result
+                assert result == expected
+                print(f'{latency * 1e3:>12} {nb_threads:>8} {duration * 1e3:>10.2f}')
+                pool.clear()
+                if threads:
+                    threads.shutdown()
+
+
+if __name__ == '__main__':
+    main()
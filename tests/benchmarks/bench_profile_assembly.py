@@ -0,0 +1,92 @@
+"""Cost of assembling a profile from its sampled altitudes
+
+Compares the former assembly point by point (distance, rounding and filtering of every point,
+straight into the JSON points or the CSV rows) with the assembly in columns, serialized afterwards,
+for profiles up to the 5000 points maximum. Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_profile_assembly
+"""
+import math
+import timeit
+
+import numpy as np
+
+from app.helpers.helpers import filter_altitude
+from app.helpers.helpers import filter_coordinate
+from app.helpers.helpers import filter_distance
+from app.helpers.profile_helpers import PROFILE_MAX_AMOUNT_POINTS
+from app.helpers.profile_helpers import _create_profile
+
+NB_RUNS = 20
+
+
+def assemble_point_by_point(coordinates, z_values, output_to_json):
+    coordinates = coordinates.tolist()
+    z_values = z_values.tolist()
+    total_distance = 0
+    previous = None
+    profile = []
+    for coord, z_value in zip(coordinates, z_values):
+        if previous is not None:
+            total_distance += math.sqrt(
+                math.pow(coord[0] - previous[0], 2.0) + math.pow(coord[1] - previous[1], 2.0)
+            )
+        alt = filter_altitude(z_value)
+        if alt is not None:
+            point = [
+                filter_distance(total_distance),
+                alt,
+                filter_coordinate(coord[0]),
+                filter_coordinate(coord[1])
+            ]
+            if output_to_json:
+                profile.append(
+                    {
+                        'alts': {
+                            'COMB': alt, 'DTM2': alt, 'DTM25': alt
+                        },
+                        'dist': point[0],
+                        'easting': point[2],
+                        'northing': point[3]
+                    }
+                )
+            else:
+                profile.append(point)
+        previous = coord
+    return profile
+
+
+def assemble_in_columns(coordinates, z_values, output_to_json):
+    profile = _create_profile(coordinates, z_values)
+    return profile.to_json() if output_to_json else profile.csv_rows()
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f'mean of {NB_RUNS} runs, times in ms')
+    print(
+        f'{"points":>8} {"json by point":>14} {"json columns":>14} {"csv by point":>14} '
+        f'{"csv columns":>14}'
+    )
+    for nb_points in (100, 1000, PROFILE_MAX_AMOUNT_POINTS):
+        coordinates = np.column_stack(
+            (
+                np.linspace(2600000, 2610000, nb_points) + rng.uniform(0, 1, nb_points),
+                np.linspace(1200000, 1205000, nb_points) + rng.uniform(0, 1, nb_points)
+            )
+        )
+        z_values = rng.uniform(-100, 4000, nb_points)
+        durations = [
+            timeit.timeit(
+                lambda assemble=assemble, output_to_json=output_to_json, coordinates=coordinates,
+                z_values=z_values: assemble(coordinates, z_values, output_to_json),
+                number=NB_RUNS
+            ) / NB_RUNS
+            for output_to_json in (True, False)
+            for assemble in (assemble_point_by_point, assemble_in_columns)
+        ]
+        print(f'{nb_points:>8}' + ''.join(f' {duration * 1e3:>14.2f}' for duration in durations))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Cost of filling the profile lines with points
+
+Times the filling of a 5000 points profile on lines of 2 to 5000 vertices (a random walk of about
+5km), in the four modes (regular or smart filling, with or without the given points kept). The
+regular filling point by point, as it was done before, is timed for comparison, as well as the
+share of the points between the segments alone (keep_points). Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_profile_filling
+"""
+import math
+import timeit
+
+import numpy as np
+
+from app.helpers.profile_helpers import PROFILE_MAX_AMOUNT_POINTS
+from app.helpers.profile_helpers import _create_points
+from app.helpers.profile_helpers import \
+    _prepare_number_of_points_max_per_segment
+
+NB_RUNS = 5
+LINE_LENGTH = 5000.0
+
+
+def create_line(nb_vertices, seed=42):
+    rng = np.random.default_rng(seed)
+    angles = rng.uniform(0, 2 * np.pi, nb_vertices - 1)
+    steps = LINE_LENGTH / (nb_vertices - 1)
+    points = np.zeros((nb_vertices, 2))
+    points[1:, 0] = np.cumsum(np.cos(angles) * steps)
+    points[1:, 1] = np.cumsum(np.sin(angles) * steps)
+    return points + (2600000.0, 1200000.0)
+
+
+def fill_point_by_point(line, nb_points=PROFILE_MAX_AMOUNT_POINTS):
+    coordinates = line.tolist()
+    distances = [
+        math.sqrt(math.pow(x1 - x0, 2.0) + math.pow(y1 - y0, 2.0))
+        for (x0, y0), (x1, y1) in zip(coordinates[:-1], coordinates[1:])
+    ]
+    total_distance = sum(distances)
+    prev_coord = coordinates[0]
+    result = [prev_coord]
+    for coord, distance in zip(coordinates[1:], distances):
+        cur_nb_points = max(int((nb_points - 1) * (distance / total_distance) + 0.5), 1)
+        dx = (coord[0] - prev_coord[0]) / float(cur_nb_points)
+        dy = (coord[1] - prev_coord[1]) / float(cur_nb_points)
+        for j in range(1, cur_nb_points + 1):
+            result.append([prev_coord[0] + dx * j, prev_coord[1] + dy * j])
+        prev_coord = coord
+    return result
+
+
+def fill(smart_filling, keep_points):
+
+    def fill_line(line):
+        return _create_points(
+            line, PROFILE_MAX_AMOUNT_POINTS, smart_filling=smart_filling, keep_points=keep_points
+        )
+
+    return fill_line
+
+
+def share_points(line):
+    return _prepare_number_of_points_max_per_segment(line, PROFILE_MAX_AMOUNT_POINTS - 1)
+
+
+def main():
+    print(f'{PROFILE_MAX_AMOUNT_POINTS} points, mean of {NB_RUNS} runs, times in ms')
+    modes = (
+        ('point by point', fill_point_by_point),
+        ('regular', fill(False, False)),
+        ('smart', fill(True, False)),
+        ('keep', fill(False, True)),
+        ('smart keep', fill(True, True)),
+        ('keep share', share_points),
+    )
+    print(f'{"vertices":>8}' + ''.join(f'{name:>16}' for name, _ in modes))
+    for nb_vertices in (2, 100, 1000, PROFILE_MAX_AMOUNT_POINTS):
+        line = create_line(nb_vertices)
+        durations = [
+            timeit.timeit(lambda function=function, line=line: function(line), number=NB_RUNS) /
+            NB_RUNS for _, function in modes
+        ]
+        print(f'{nb_vertices:>8}' + ''.join(f'{duration * 1e3:>16.2f}' for duration in durations))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Size on disk and bytes read of a float .bt mosaic and of the same mosaic quantized to int16
+
+The synthetic mosaic of bench_backends is converted by app.helpers.raster.quantize (uncompressed
+and deflate compressed GeoTIFF), then the same profiles and points are sampled from every mosaic
+with the block cache disabled and checked to give the same altitudes once rounded to the decimeter.
+Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_quantize
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from mock import patch
+
+from app.helpers.helpers import filter_altitude
+from app.helpers.raster.georaster import GeoRaster
+from app.helpers.raster.georaster import get_tiff_directory
+from app.helpers.raster.quantize import convert_mosaic
+from app.helpers.raster.shapefile import get_column
+from app.helpers.raster.shapefile import read_index
+from tests import create_index_file
+from tests.benchmarks.bench_backends import NB_TILES
+from tests.benchmarks.bench_backends import create_rasters
+from tests.benchmarks.bench_backends import create_requests
+from tests.benchmarks.bench_io_planner import CountingPool
+
+
+def create_raster(index_file):
+    index = read_index(index_file)
+    return GeoRaster(
+        index_file,
+        registry=GeoRaster.create_registry_from_columns(
+            index_file, index.bounds, get_column(index, 'location')
+        )
+    )
+
+
+def create_mosaics(tmp_dir):
+    """Returns the index files of the float .bt mosaic and of its int16 conversions"""
+    rasters, filenames = create_rasters(tmp_dir)
+    index_file = str(Path(tmp_dir) / 'index.shp')
+    create_index_file(
+        index_file,
+        [
+            (bounds, Path(filename).name)
+            for bounds, filename in zip(rasters['.bt'].registry.bounds, filenames['.bt'])
+        ]
+    )
+    mosaics = {'float .bt': index_file}
+    for compress in (False, True):
+        output_dir = Path(tmp_dir) / ('deflate' if compress else 'raw')
+        convert_mosaic(index_file, output_dir, compress=compress)
+        mosaics[f'int16 {output_dir.name}'] = str(output_dir / 'index.shp')
+    return mosaics
+
+
+def run_request(raster, request, profiles, points):
+    """Returns the altitudes, the counting pool of the reads and the duration of the request"""
+    pool = CountingPool(max_files=NB_TILES)
+    get_tiff_directory.cache_clear()
+    with patch('app.helpers.raster.georaster.open_tiles', pool), \
+            patch('app.helpers.raster.georaster.block_cache', None), \
+            patch('app.helpers.raster.georaster.read_threads', None):
+        start = time.perf_counter()
+        if request == 'profile':
+            result = [
+                filter_altitude(height)
+                for xs, ys in profiles
+                for height in raster.get_heights(xs, ys).tolist()
+            ]
+        else:
+            result = [filter_altitude(raster.get_height_for_coordinate(x, y)) for x, y in points]
+        duration = time.perf_counter() - start
+    return result, pool, duration
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mosaics = create_mosaics(tmp_dir)
+        profiles, points = create_requests()
+        print(f'{NB_TILES} tiles, {len(profiles)} profiles and {len(points)} points')
+        print(
+            f'{"mosaic":>13} {"size [MB]":>10} {"request":>8} {"reads":>7} {"read [MB]":>10} '
+            f'{"time [ms]":>10}'
+        )
+        expected = {}
+        for name, mosaic in mosaics.items():
+            raster = create_raster(mosaic)
+            size = sum(os.path.getsize(filename) for filename in raster.registry.filenames) / 1e6
+            for request in ('profile', 'point'):
+                result, pool, duration = run_request(raster, request, profiles, points)
+                expected.setdefault(request, result)
+                assert result == expected[request]
+                print(
+                    f'{name:>13} {size:>10.2f} {request:>8} {pool.reads:>7} '
+                    f'{pool.bytes / 1e6:>10.2f} {duration * 1e3:>10.2f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Time needed to load the raster index of a national mosaic
+
+Compares the field by field shapefile reader (SHPUtils) with the bulk reader, on a synthetic index
+of 1km tiles covering the extent of Switzerland (~80'000 tiles). Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_shapefile
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from app.helpers.raster.shapefile import get_column
+from app.helpers.raster.shapefile import read_index
+from app.helpers.raster.shputils import SHPUtils
+from tests import create_index_file
+
+TILE_SIZE = 1000.0
+ORIGIN_X, ORIGIN_Y = 2485000.0, 1075000.0
+NB_TILES_X, NB_TILES_Y = 350, 225
+
+
+def measure(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    tiles = [
+        (
+            (
+                ORIGIN_X + i * TILE_SIZE,
+                ORIGIN_Y + j * TILE_SIZE,
+                ORIGIN_X + (i + 1) * TILE_SIZE,
+                ORIGIN_Y + (j + 1) * TILE_SIZE
+            ),
+            f'tiles/swissalti3d_2m_{i:04d}_{j:04d}.bt'
+        ) for i in range(NB_TILES_X) for j in range(NB_TILES_Y)
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_file = str(Path(tmp_dir) / 'index.shp')
+        create_index_file(index_file, tiles)
+        shapes, shputils_time = measure(lambda: SHPUtils().load_shape_file(index_file))
+        index, bulk_time = measure(lambda: read_index(index_file))
+        assert len(shapes) == len(index.record_numbers) == len(tiles)
+        assert get_column(index, 'location')[-1] == shapes[-1]['dbf_data']['location']
+    print(f'{len(tiles)} tiles')
+    print(f'{"SHPUtils":>10}: {shputils_time * 1e3:10.1f} ms')
+    print(f'{"bulk":>10}: {bulk_time * 1e3:10.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
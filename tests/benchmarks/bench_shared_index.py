@@ -0,0 +1,125 @@
+"""Memory of the workers with and without a raster index shared by the master
+
+Builds a synthetic mosaic of 1km tiles of the size of the national one (for both spatial
+references) and forks a few workers, like gunicorn does. The index is either loaded by the master
+before forking (PRELOAD_RASTER_FILES, with gc.freeze) or loaded by each worker. Each worker then
+serves lookups and runs a full garbage collection before reporting its memory from
+/proc/self/smaps_rollup: RSS counts the shared pages in every worker, the private memory is what
+a worker really adds. Linux only. Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_shared_index
+"""
+import gc
+import logging
+import os
+import random
+import sys
+
+import numpy as np
+
+from app.helpers.raster.tile_index import TileGridIndex
+from app.helpers.raster.tile_registry import BT_HEADER_DTYPE
+from app.helpers.raster.tile_registry import TileRegistry
+
+TILE_SIZE = 1000.0
+ORIGIN_X, ORIGIN_Y = 2485000.0, 1075000.0
+NB_TILES_X, NB_TILES_Y = 350, 230
+NB_WORKERS = 4
+NB_LOOKUPS = 10000
+
+
+def create_index(origin_x, origin_y):
+    bounds = [
+        (
+            origin_x + i * TILE_SIZE,
+            origin_y + j * TILE_SIZE,
+            origin_x + (i + 1) * TILE_SIZE,
+            origin_y + (j + 1) * TILE_SIZE
+        ) for i in range(NB_TILES_X) for j in range(NB_TILES_Y)
+    ]
+    filenames = [
+        f'/var/local/profile/swissalti3d/kombo_2m_regio_lv95/tile_{i:06d}.bt'
+        for i in range(len(bounds))
+    ]
+    # no file to read the headers from, all the tiles are 500x500 float cells
+    headers = np.zeros(len(bounds), dtype=BT_HEADER_DTYPE)
+    headers['cols'] = headers['rows'] = 500
+    headers['data_size'] = 4
+    headers['floating_point'] = 1
+    registry = TileRegistry(bounds, filenames, headers)
+    return registry, TileGridIndex(registry.bounds)
+
+
+def create_indexes():
+    # LV95 and LV03 mosaics
+    return [create_index(ORIGIN_X, ORIGIN_Y), create_index(ORIGIN_X - 2e6, ORIGIN_Y - 1e6)]
+
+
+def read_memory():
+    memory = {}
+    with open('/proc/self/smaps_rollup', encoding='utf-8') as file:
+        for line in file:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                memory[name] = int(value.split()[0])
+    return memory['Rss'], memory['Private_Clean'] + memory['Private_Dirty']
+
+
+def serve(indexes):
+    random.seed(0)
+    for registry, tile_index in indexes:
+        for _ in range(NB_LOOKUPS):
+            tile_id = tile_index.find(
+                tile_index.origin_x + random.random() * NB_TILES_X * TILE_SIZE,
+                tile_index.origin_y + random.random() * NB_TILES_Y * TILE_SIZE
+            )
+            registry.get_filename(tile_id)
+    gc.collect()
+
+
+def run_workers(preload):
+    indexes = None
+    if preload:
+        indexes = create_indexes()
+        gc.freeze()
+    reports = []
+    for _ in range(NB_WORKERS):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            serve(indexes if preload else create_indexes())
+            rss, private = read_memory()
+            os.write(write_fd, f'{rss} {private}'.encode())
+            os._exit(0)  # pylint: disable=protected-access
+        os.close(write_fd)
+        reports.append((pid, read_fd))
+    memories = []
+    for pid, read_fd in reports:
+        with os.fdopen(read_fd) as file:
+            memories.append([int(value) for value in file.read().split()])
+        os.waitpid(pid, 0)
+    if preload:
+        gc.unfreeze()
+    return np.array(memories)
+
+
+def main():
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print('/proc/self/smaps_rollup not available, skipping')
+        return
+    # the debug logs of the registries and indexes would be interleaved with the report
+    logging.getLogger('app').setLevel(logging.INFO)
+    print(f'{NB_TILES_X * NB_TILES_Y} tiles per spatial reference, {NB_WORKERS} workers')
+    print(f'{"index":>18} {"RSS [MB]":>10} {"private [MB]":>13} {"total private [MB]":>19}')
+    # the workers loading the index themselves first, so that their memory isn't inflated by the
+    # index of the master
+    for label, preload in (('loaded per worker', False), ('shared (preload)', True)):
+        memories = run_workers(preload) / 1024
+        rss, private = memories.mean(axis=0)
+        print(f'{label:>18} {rss:>10.1f} {private:>13.1f} {memories[:, 1].sum():>19.1f}')
+    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Cost of the smoothing of the altitudes (offset parameter)
+
+Times the smoothing of the altitudes of a 5000 points profile, with 1% of them missing, for growing
+offsets, point by point as it was done before and on arrays. Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_smoothing
+"""
+import math
+import timeit
+
+import numpy as np
+
+from app.helpers.profile_helpers import PROFILE_MAX_AMOUNT_POINTS
+from app.helpers.profile_helpers import _smooth
+
+NB_RUNS = 3
+
+
+def smooth_point_by_point(offset, z_values):
+    z_values_with_smoothing = []
+    for j, z_value in enumerate(z_values):
+        s = 0
+        d = 0
+        if math.isnan(z_value):
+            z_values_with_smoothing.append(z_value)
+            continue
+        for k in range(-offset, offset + 1):
+            p = j + k
+            if p < 0 or p >= len(z_values):
+                continue
+            if math.isnan(z_values[p]):
+                continue
+            s += z_values[p] * (1.0 / (abs(k) + 1))
+            d += 1.0 / (abs(k) + 1)
+        z_values_with_smoothing.append(s / d)
+    return z_values_with_smoothing
+
+
+def main():
+    rng = np.random.default_rng(42)
+    z_values = rng.uniform(400, 4000, PROFILE_MAX_AMOUNT_POINTS)
+    z_values[rng.choice(PROFILE_MAX_AMOUNT_POINTS, PROFILE_MAX_AMOUNT_POINTS // 100)] = np.nan
+    z_values = z_values.tolist()
+    print(f'{PROFILE_MAX_AMOUNT_POINTS} points, mean of {NB_RUNS} runs, times in ms')
+    print(f'{"offset":>8} {"point by point":>16} {"linear":>10} {"gaussian":>10}')
+    for offset in (1, 10, 100, 1000):
+        durations = [
+            timeit.timeit(
+                lambda offset=offset: smooth_point_by_point(offset, z_values), number=NB_RUNS
+            ),
+            timeit.timeit(lambda offset=offset: _smooth(offset, z_values), number=NB_RUNS),
+            timeit.timeit(
+                lambda offset=offset: _smooth(offset, z_values, kernel='gaussian'), number=NB_RUNS
+            ),
+        ]
+        print(
+            f'{offset:>8}' + ''.join(
+                f'{duration / NB_RUNS * 1e3:>{width}.2f}'
+                for duration, width in zip(durations, (17, 11, 11))
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Tile lookup cost as the number of tiles grows
+
+Compares the linear scan over all the tiles with the grid index and the virtual mosaic, on a
+regular synthetic mosaic of 1km tiles (the size of the swissALTI3D tiles), one point at a time and
+for a batch of points. Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_tile_index
+"""
+import random
+import timeit
+
+import numpy as np
+
+from app.helpers.raster.tile_index import TileGridIndex
+from app.helpers.raster.tile_index import TileMosaicIndex
+
+TILE_SIZE = 1000.0
+ORIGIN_X, ORIGIN_Y = 2485000.0, 1075000.0
+NB_LOOKUPS = 2000
+
+
+def create_mosaic(nb_tiles_per_side):
+    return [
+        (
+            ORIGIN_X + i * TILE_SIZE,
+            ORIGIN_Y + j * TILE_SIZE,
+            ORIGIN_X + (i + 1) * TILE_SIZE,
+            ORIGIN_Y + (j + 1) * TILE_SIZE
+        ) for i in range(nb_tiles_per_side) for j in range(nb_tiles_per_side)
+    ]
+
+
+def linear_scan(bounds, x, y):
+    for tile_id, (min_x, min_y, max_x, max_y) in enumerate(bounds):
+        if min_x <= x < max_x and min_y <= y < max_y:
+            return tile_id
+    return None
+
+
+def time_lookups(tile_index, points):
+    return timeit.timeit(lambda: [tile_index.find(x, y) for x, y in points], number=1) / len(points)
+
+
+def main():
+    print(
+        f'{"tiles":>8} {"linear [us]":>12} {"grid [us]":>12} {"mosaic [us]":>12} '
+        f'{"grid batch [us]":>16} {"mosaic batch [us]":>18}'
+    )
+    for nb_tiles_per_side in (4, 16, 64, 256):
+        bounds = create_mosaic(nb_tiles_per_side)
+        index = TileGridIndex(bounds)
+        mosaic = TileMosaicIndex.from_bounds(bounds)
+        extent = nb_tiles_per_side * TILE_SIZE
+        points = [
+            (ORIGIN_X + random.random() * extent, ORIGIN_Y + random.random() * extent)
+            for _ in range(NB_LOOKUPS)
+        ]
+        xs, ys = np.asarray(points).T
+        for x, y in points:
+            assert index.find(x, y) == mosaic.find(x, y) == linear_scan(bounds, x, y)
+        assert index.find_all(xs, ys).tolist() == mosaic.find_all(xs, ys).tolist()
+        # the linear scan is too slow to run on all the points for the biggest mosaics
+        linear_points = points[:max(NB_LOOKUPS * 64 // len(bounds), 10)]
+        linear = timeit.timeit(
+            lambda bounds=bounds, linear_points=linear_points:
+            [linear_scan(bounds, x, y) for x, y in linear_points],
+            number=1
+        ) / len(linear_points)
+        times = [time_lookups(tile_index, points) for tile_index in (index, mosaic)]
+        times += [
+            timeit.timeit(
+                lambda tile_index=tile_index, xs=xs, ys=ys: tile_index.find_all(xs, ys), number=10
+            ) / 10 / len(points) for tile_index in (index, mosaic)
+        ]
+        print(
+            f'{len(bounds):>8} {linear * 1e6:>12.2f} {times[0] * 1e6:>12.2f} '
+            f'{times[1] * 1e6:>12.2f} {times[2] * 1e6:>16.3f} {times[3] * 1e6:>18.3f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
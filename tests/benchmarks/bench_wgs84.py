@@ -0,0 +1,74 @@
+"""Cost of the WGS84 conversions at the 5000 points maximum of a profile
+
+Times the conversions of 5000 points, converted point by point and all at once, then a 5000 points
+profile requested in LV95 and in WGS84 (converted to LV95 and back), sampled on a fake raster so
+that only the conversions differ. Run with `make benchmark` or
+
+    DTM_BASE_PATH=. python -m tests.benchmarks.bench_wgs84
+"""
+import timeit
+
+import numpy as np
+from shapely.geometry import LineString
+
+from app.helpers.profile_helpers import PROFILE_MAX_AMOUNT_POINTS
+from app.helpers.profile_helpers import get_profile
+from app.helpers.wgs84 import lv95_to_wgs84
+from app.helpers.wgs84 import wgs84_to_lv95
+
+NB_RUNS = 20
+
+
+class FakeRaster:
+
+    @staticmethod
+    def get_heights(xs, ys):
+        return np.full(len(xs), 1000.0)
+
+
+class FakeGeoRasterUtils:
+
+    @staticmethod
+    def get_raster(_):
+        return FakeRaster()
+
+
+def time_profile(spatial_reference, coordinates):
+    geom = LineString(coordinates)
+    return timeit.timeit(
+        lambda: get_profile(
+            geom=geom, spatial_reference=spatial_reference, nb_points=PROFILE_MAX_AMOUNT_POINTS,
+            georaster_utils=FakeGeoRasterUtils()
+        ),
+        number=NB_RUNS
+    ) / NB_RUNS
+
+
+def main():
+    eastings = np.linspace(2550000, 2650000, PROFILE_MAX_AMOUNT_POINTS)
+    northings = np.linspace(1150000, 1250000, PROFILE_MAX_AMOUNT_POINTS)
+    lons, lats = lv95_to_wgs84(eastings, northings)
+    print(f'{PROFILE_MAX_AMOUNT_POINTS} points, mean of {NB_RUNS} runs')
+    print(f'{"conversion":>30} {"time [ms]":>10}')
+    for name, function in (
+        (
+            'point by point to LV95',
+            lambda: [wgs84_to_lv95(lon, lat) for lon, lat in zip(lons.tolist(), lats.tolist())]
+        ),
+        ('batch to LV95', lambda: wgs84_to_lv95(lons, lats)),
+        ('batch to WGS84', lambda: lv95_to_wgs84(eastings, northings)),
+    ):
+        duration = timeit.timeit(function, number=NB_RUNS) / NB_RUNS
+        print(f'{name:>30} {duration * 1e3:>10.2f}')
+
+    print(f'{"profile":>30} {"time [ms]":>10}')
+    for spatial_reference, coordinates in (
+        (2056, [(eastings[0], northings[0]), (eastings[-1], northings[-1])]),
+        (4326, [(lons[0], lats[0]), (lons[-1], lats[-1])]),
+    ):
+        duration = time_profile(spatial_reference, coordinates)
+        print(f'{spatial_reference:>30} {duration * 1e3:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
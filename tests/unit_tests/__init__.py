@@ -1,3 +1,4 @@
+import numpy as np
 from mock import Mock
 from shapely.geometry import LineString
 
@@ -28,6 +29,9 @@ LINESTRING_VALID_LV03 = f'{{"type":"LineString","coordinates":[{POINT_1_LV03},{P
 
 LINESTRING_VALID_LV95 = '{"type":"LineString","coordinates":[[2629499.8,1170351.9],' \
                         '[2635488.4,1173402.0]]}'
+# LINESTRING_VALID_LV95 in WGS84 (6 decimals, the precision of geojson), to a few decimeters
+LINESTRING_VALID_WGS84 = '{"type":"LineString","coordinates":[[7.824232,46.683734],' \
+                         '[7.902743,46.710879]]}'
 LINESTRING_SMALL_LINE_LV03 = '{"type":"LineString","coordinates":[[632092.11, 171171.07],' \
                              '[632084.41, 171237.67]]}'
 LINESTRING_SMALL_LINE_LV95 = '{"type":"LineString","coordinates":[[2632092.1,1171169.9],' \
@@ -42,6 +46,10 @@ def fake_get_height_for_coordinate(_, y):
     return VALUES_FOR_EACH_2M_STEP[int(int(y - 1199980) / 2) % 11]
 
 
+def fake_get_heights(xs, ys):
+    return np.array([fake_get_height_for_coordinate(x, y) for x, y in zip(xs, ys)])
+
+
 def prepare_mock(mock_georaster_utils):
     # creating a fake tile that responds with pre defined values
     tile_mock = Mock()
@@ -49,3 +57,4 @@ def prepare_mock(mock_georaster_utils):
     tile_mock.resolution_x.return_value = FAKE_RESOLUTION
     # link this to the get_raster function
     mock_georaster_utils.get_raster.return_value.get_tile.return_value = tile_mock
+    mock_georaster_utils.get_raster.return_value.get_heights = Mock(side_effect=fake_get_heights)
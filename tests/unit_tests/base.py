@@ -1,4 +1,7 @@
+import shutil
+import tempfile
 import unittest
+from pathlib import Path
 
 from mock import patch
 
@@ -9,6 +12,14 @@ with patch('os.path.exists') as mock_exists:
 from tests.unit_tests import DEFAULT_HEADERS
 
 
+class TempDirTestCase(unittest.TestCase):
+    """Test case writing its files in self.path, a temporary directory removed after each test"""
+
+    def setUp(self):
+        self.path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.path)
+
+
 class BaseRouteTestCase(unittest.TestCase):
 
     def setUp(self) -> None:
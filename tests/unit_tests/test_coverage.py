@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from app.helpers.raster.coverage import CoverageBitmap
+from tests.unit_tests.test_tile_index import BOUNDS
+from tests.unit_tests.test_tile_index import linear_scan
+
+
+class TestCoverageBitmap(unittest.TestCase):
+
+    def setUp(self):
+        self.coverage = CoverageBitmap(BOUNDS)
+
+    def test_covers(self):
+        # a quarter of a tile would make too many cells for that sparse mosaic
+        self.assertEqual(self.coverage.cell_size, 500.0)
+        self.assertTrue(self.coverage.covers(2600001, 1200001))
+        self.assertTrue(self.coverage.covers(2612499, 1200999))
+        # the gap between the 2x2 tiles and the lonely tile, below and above the tiles
+        self.assertFalse(self.coverage.covers(2605000, 1200500))
+        self.assertFalse(self.coverage.covers(2611000, 1201500))
+        self.assertFalse(self.coverage.covers(2600500, 1199999))
+        self.assertFalse(self.coverage.covers(0, 0))
+        self.assertFalse(self.coverage.covers(float('nan'), 1200500))
+        self.assertFalse(self.coverage.covers(float('inf'), 1200500))
+
+    def test_never_misses_a_tile(self):
+        xs, ys = np.meshgrid(np.arange(2599500, 2613000, 50), np.arange(1199500, 1202500, 50))
+        xs = xs.ravel()
+        ys = ys.ravel()
+        # the points just before the east and north edges of the tiles
+        edges_x = np.asarray([max_x for _, _, max_x, _ in BOUNDS])
+        edges_y = np.asarray([max_y for _, _, _, max_y in BOUNDS])
+        xs = np.concatenate([xs, np.nextafter(edges_x, 0), edges_x - 1])
+        ys = np.concatenate([ys, np.nextafter(edges_y, 0), edges_y - 1])
+        covered = self.coverage.covers_all(xs, ys)
+        for x, y, point_covered in zip(xs.tolist(), ys.tolist(), covered.tolist()):
+            self.assertEqual(self.coverage.covers(x, y), point_covered)
+            if linear_scan(x, y) is not None:
+                self.assertTrue(point_covered, msg=f'({x}, {y})')
+        # most of the points outside the tiles are known without a lookup
+        outside = np.asarray([linear_scan(x, y) is None for x, y in zip(xs, ys)])
+        self.assertGreater(np.count_nonzero(~covered & outside), np.count_nonzero(outside) * 0.8)
+
+    def test_covers_all_invalid_points(self):
+        self.assertEqual(
+            self.coverage.covers_all(
+                [np.nan, np.inf, 2600001, -1e300], [1200001, 1200001, np.nan, 1200001]
+            ).tolist(), [False] * 4
+        )
+
+    def test_size_is_bounded(self):
+        # two tiles far away from each other must not create a huge bitmap
+        coverage = CoverageBitmap([(0.0, 0.0, 1.0, 1.0), (1e6, 1e6, 1e6 + 1.0, 1e6 + 1.0)])
+        self.assertLessEqual(coverage.nb_cells_x * coverage.nb_cells_y, 128)
+        self.assertTrue(coverage.covers(0.5, 0.5))
+        self.assertTrue(coverage.covers(1e6 + 0.5, 1e6 + 0.5))
+
+    def test_empty_coverage(self):
+        coverage = CoverageBitmap([])
+        self.assertFalse(coverage.covers(2600000, 1200000))
+        self.assertEqual(coverage.covers_all([2600000], [1200000]).tolist(), [False])
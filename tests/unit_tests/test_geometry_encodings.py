@@ -0,0 +1,74 @@
+import struct
+import unittest
+
+import numpy as np
+import shapely
+from shapely.geometry import LineString
+from shapely.geometry import Point
+
+from app.helpers.geometry_encodings import decode_float64_pairs
+from app.helpers.geometry_encodings import decode_polyline
+from app.helpers.geometry_encodings import decode_wkb
+from tests import create_polyline
+
+COORDINATES = [[2631599.9, 1173200.1], [2631699.85, 1173150.2], [2631500.0, 1173300.75]]
+
+
+class TestGeometryEncodings(unittest.TestCase):
+
+    def test_decode_polyline(self):
+        # the example of the Google documentation, (latitude, longitude) pairs
+        np.testing.assert_allclose(
+            decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@'),
+            [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+        )
+        for precision in (0, 2, 5, 7):
+            np.testing.assert_allclose(
+                decode_polyline(create_polyline(COORDINATES, precision), precision),
+                np.round(COORDINATES, precision)
+            )
+        coordinates = decode_polyline(create_polyline(COORDINATES))
+        self.assertEqual(coordinates.dtype, np.float64)
+        self.assertTrue(coordinates.flags['C_CONTIGUOUS'])
+
+    def test_decode_invalid_polyline(self):
+        for encoded in ('', '_p~iF~ps|U_', '_p~iF', 'a b', 'é', '_' * 12 + '?' + '?'):
+            with self.assertRaises(ValueError, msg=encoded):
+                decode_polyline(encoded)
+
+    def test_decode_wkb(self):
+        for geom in (LineString(COORDINATES), Point(COORDINATES[0])):
+            geom_type, coordinates = decode_wkb(geom.wkb)
+            self.assertEqual(geom_type, geom.geom_type)
+            np.testing.assert_array_equal(coordinates, np.asarray(geom.coords))
+        # 3D, big endian and ISO WKB
+        line_3d = LineString([coordinate + [500.0] for coordinate in COORDINATES])
+        for wkb in (
+            line_3d.wkb,
+            shapely.to_wkb(line_3d, byte_order=0),
+            shapely.to_wkb(line_3d, flavor='iso'),
+        ):
+            geom_type, coordinates = decode_wkb(wkb)
+            self.assertEqual(geom_type, 'LineString')
+            np.testing.assert_array_equal(coordinates, COORDINATES)
+
+    def test_decode_invalid_wkb(self):
+        wkb = LineString(COORDINATES).wkb
+        for data in (
+            b'',
+            b'\x02' + wkb[1:],
+            wkb[:-1],
+            wkb + b'\x00',
+            wkb[:7],
+            struct.pack('<BII', 1, 3, 0),
+            # with an SRID
+            struct.pack('<BII', 1, 0x20000001, 2056) + struct.pack('<2d', *COORDINATES[0]),
+        ):
+            with self.assertRaises(ValueError):
+                decode_wkb(data)
+
+    def test_decode_float64_pairs(self):
+        data = np.asarray(COORDINATES, dtype='<f8').tobytes()
+        np.testing.assert_array_equal(decode_float64_pairs(data), COORDINATES)
+        with self.assertRaises(ValueError):
+            decode_float64_pairs(data[:-8])
@@ -0,0 +1,265 @@
+import os
+
+import numpy as np
+from mock import patch
+
+from app.helpers.raster.georaster import BinaryTerrainTile
+from app.helpers.raster.georaster import BlockCache
+from app.helpers.raster.georaster import GeoRaster
+from app.helpers.raster.georaster import MappedTileCache
+from app.helpers.raster.georaster import TileFilePool
+from app.helpers.raster.read_threads import ReadThreadPool
+from app.helpers.raster.tile_registry import TileRegistry
+from tests import create_bt_file
+from tests.unit_tests.base import TempDirTestCase
+
+# 3 columns by 2 rows of 2m cells, starting at (2600000, 1200000)
+TILE_MIN_X, TILE_MIN_Y = 2600000.0, 1200000.0
+TILE_HEIGHTS = [[500.5, 501.5], [502.5, 503.5], [504.5, 505.5]]
+
+
+class TestBinaryTerrainTile(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.filenames = []
+        for i in range(3):
+            filename = str(self.path / f'tile_{i}.bt')
+            heights = [[height + i for height in column] for column in TILE_HEIGHTS]
+            create_bt_file(
+                filename, TILE_MIN_X, TILE_MIN_Y, TILE_MIN_X + 6, TILE_MIN_Y + 4, heights
+            )
+            self.filenames.append(filename)
+
+    def create_tile(self, index=0):
+        registry = TileRegistry(
+            [(TILE_MIN_X, TILE_MIN_Y, TILE_MIN_X + 6, TILE_MIN_Y + 4)], [self.filenames[index]]
+        )
+        return BinaryTerrainTile(registry, 0)
+
+    def assert_tile_heights(self, tile, offset=0):
+        for column, heights in enumerate(TILE_HEIGHTS):
+            for row, height in enumerate(heights):
+                self.assertEqual(
+                    tile.get_height_for_coordinate(
+                        TILE_MIN_X + column * 2 + 1, TILE_MIN_Y + row * 2 + 1
+                    ),
+                    height + offset
+                )
+
+    def test_get_height_for_coordinate(self):
+        tile = self.create_tile()
+        self.assert_tile_heights(tile)
+        self.assertEqual(tile.cols, 3)
+        self.assertEqual(tile.rows, 2)
+        self.assertEqual(tile.resolution_x, 2)
+
+    def test_registry(self):
+        bounds = [(TILE_MIN_X, TILE_MIN_Y, TILE_MIN_X + 6, TILE_MIN_Y + 4)] * 3
+        registry = TileRegistry(bounds, self.filenames)
+        self.assertEqual(len(registry), 3)
+        # headers are read when the registry is created
+        self.assertEqual(registry.tiles['cols'].tolist(), [3, 3, 3])
+        self.assertEqual(registry.tiles['rows'].tolist(), [2, 2, 2])
+        self.assertEqual(registry.tiles['data_size'].tolist(), [4, 4, 4])
+        self.assertEqual(registry.tiles['floating_point'].tolist(), [1, 1, 1])
+        self.assertEqual(registry.tiles['resolution_y'].tolist(), [2.0, 2.0, 2.0])
+        self.assertEqual(registry.get_filename(2), self.filenames[2])
+        self.assertEqual(registry.bounds.tolist(), [list(b) for b in bounds])
+        tile = BinaryTerrainTile(registry, 1)
+        self.assertEqual(tile.data_format, '<f')
+        self.assertEqual(tile.max_x, TILE_MIN_X + 6)
+
+    def test_registry_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            TileRegistry([(TILE_MIN_X, TILE_MIN_Y, TILE_MIN_X + 6, TILE_MIN_Y + 4)], ['missing.bt'])
+
+    def test_get_heights(self):
+        tile = self.create_tile()
+        xs = np.array([TILE_MIN_X + 1, TILE_MIN_X + 5, TILE_MIN_X + 3, TILE_MIN_X + 1])
+        ys = np.array([TILE_MIN_Y + 1, TILE_MIN_Y + 3, TILE_MIN_Y + 1, TILE_MIN_Y + 1])
+        expected = [500.5, 505.5, 502.5, 500.5]
+        self.assertEqual(tile.get_heights(xs, ys).tolist(), expected)
+        with patch('app.helpers.raster.georaster.mapped_tiles', MappedTileCache(max_tiles=1)) as c:
+            self.assertEqual(self.create_tile().get_heights(xs, ys).tolist(), expected)
+            c.clear()
+
+    def test_get_height_for_coordinate_file_pool(self):
+        pool = TileFilePool(max_files=2)
+        with patch('app.helpers.raster.georaster.open_tiles', pool), \
+                patch('app.helpers.raster.georaster.block_cache', None):
+            tiles = [self.create_tile(i) for i in range(3)]
+            for i, tile in enumerate(tiles):
+                self.assert_tile_heights(tile, offset=i)
+                self.assertLessEqual(len(pool), 2)
+            self.assert_tile_heights(tiles[2], offset=2)
+        # one miss per tile, the first tile has been evicted by the third one
+        self.assertEqual(pool.misses, 3)
+        self.assertEqual(pool.hits, 6 * 4 - 3)
+        self.assertEqual(pool.evictions, 1)
+        self.assertEqual(pool.stats()['hit_rate'], pool.hits / (6 * 4))
+        pool.clear()
+        self.assertEqual(len(pool), 0)
+
+    def test_file_pool_eviction_while_reading(self):
+        pool = TileFilePool(max_files=1)
+        # a read is still using the first file when it gets evicted
+        entry = pool._acquire(self.filenames[0])  # pylint: disable=protected-access
+        self.assertEqual(len(pool.pread(self.filenames[1], 4, 256)), 4)
+        self.assertEqual(pool.evictions, 1)
+        self.assertEqual(len(os.pread(entry[0], 4, 256)), 4)
+        pool._release(entry)  # pylint: disable=protected-access
+        with self.assertRaises(OSError):
+            os.pread(entry[0], 4, 256)
+        pool.clear()
+
+    def test_get_height_for_coordinate_block_cache(self):
+        # 2x2 blocks: the 3x2 tile has a full block and a 1x2 block on its right edge
+        cache = BlockCache(max_bytes=1024, block_size=2)
+        with patch('app.helpers.raster.georaster.block_cache', cache):
+            tile = self.create_tile()
+            self.assert_tile_heights(tile)
+            self.assert_tile_heights(tile)
+            xs = np.array([TILE_MIN_X + 5, TILE_MIN_X + 1, TILE_MIN_X + 3])
+            ys = np.array([TILE_MIN_Y + 3, TILE_MIN_Y + 1, TILE_MIN_Y + 3])
+            self.assertEqual(tile.get_heights(xs, ys).tolist(), [505.5, 500.5, 503.5])
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.nbytes, (4 + 2) * 4)
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 2 * 6 - 2 + 2)
+        self.assertEqual(cache.evictions, 0)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.nbytes, 0)
+
+    def test_far_edges(self):
+        # (1 - 1e-16) / (1 / 3) is rounded up to 3, past the last column and row
+        filename = str(self.path / 'thirds.bt')
+        create_bt_file(filename, 0.0, 0.0, 1.0, 1.0, [[1.0, 2.0, 3.0]] * 3)
+        edge = float(np.nextafter(1.0, 0.0))
+        for cache in (None, BlockCache(max_bytes=1024, block_size=2)):
+            with patch('app.helpers.raster.georaster.block_cache', cache):
+                tile = BinaryTerrainTile(TileRegistry([(0.0, 0.0, 1.0, 1.0)], [filename]), 0)
+                self.assertEqual(tile.get_cell_position(edge, edge), (2, 2))
+                self.assertEqual(tile.get_height_for_coordinate(edge, edge), 3.0)
+                self.assertEqual(
+                    tile.get_heights(np.array([edge]), np.array([edge])).tolist(), [3.0]
+                )
+
+    def test_block_cache_eviction(self):
+        # room for one full block only
+        cache = BlockCache(max_bytes=16, block_size=2)
+        with patch('app.helpers.raster.georaster.block_cache', cache):
+            tiles = [self.create_tile(i) for i in range(3)]
+            for i, tile in enumerate(tiles):
+                self.assert_tile_heights(tile, offset=i)
+                self.assertLessEqual(cache.nbytes, 16)
+            # dropped blocks are read again transparently
+            self.assert_tile_heights(tiles[0])
+        self.assertGreater(cache.evictions, 0)
+        self.assertEqual(cache.stats()['hit_rate'], cache.hits / (cache.hits + cache.misses))
+
+    def test_get_height_for_coordinate_mmap(self):
+        cache = MappedTileCache(max_tiles=2)
+        with patch('app.helpers.raster.georaster.mapped_tiles', cache):
+            tile = self.create_tile()
+            self.assert_tile_heights(tile)
+            self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_mmap_eviction(self):
+        cache = MappedTileCache(max_tiles=2)
+        with patch('app.helpers.raster.georaster.mapped_tiles', cache):
+            tiles = [self.create_tile(i) for i in range(3)]
+            for i, tile in enumerate(tiles):
+                self.assert_tile_heights(tile, offset=i)
+                self.assertLessEqual(len(cache), 2)
+            # evicted tiles are mapped again transparently
+            self.assert_tile_heights(tiles[0])
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(cache.evictions, 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class TestGeoRaster(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        shapes = []
+        # two tiles side by side, the second one 10m higher
+        for i in range(2):
+            min_x = TILE_MIN_X + i * 6
+            heights = [[height + i * 10 for height in column] for column in TILE_HEIGHTS]
+            create_bt_file(
+                str(self.path / f'tile_{i}.bt'),
+                min_x,
+                TILE_MIN_Y,
+                min_x + 6,
+                TILE_MIN_Y + 4,
+                heights
+            )
+            shapes.append(
+                {
+                    'shp_data':
+                        {
+                            'xmin': min_x,
+                            'ymin': TILE_MIN_Y,
+                            'xmax': min_x + 6,
+                            'ymax': TILE_MIN_Y + 4
+                        },
+                    'dbf_data': {
+                        'location': f'tile_{i}.bt'.encode()
+                    }
+                }
+            )
+        self.raster = GeoRaster(str(self.path / 'index.shp'), shapes)
+
+    def test_get_heights(self):
+        xs = [TILE_MIN_X + 7, TILE_MIN_X + 1, TILE_MIN_X - 1, TILE_MIN_X + 11, TILE_MIN_X + 5]
+        ys = [TILE_MIN_Y + 1, TILE_MIN_Y + 3, TILE_MIN_Y + 1, TILE_MIN_Y + 3, TILE_MIN_Y + 5]
+        heights = self.raster.get_heights(xs, ys)
+        self.assertEqual(heights[[0, 1, 3]].tolist(), [510.5, 501.5, 515.5])
+        # outside of the tiles
+        self.assertTrue(np.isnan(heights[2]))
+        self.assertTrue(np.isnan(heights[4]))
+
+    def test_get_heights_same_as_get_height_for_coordinate(self):
+        xs = np.linspace(TILE_MIN_X - 1, TILE_MIN_X + 13, 57)
+        ys = np.linspace(TILE_MIN_Y - 1, TILE_MIN_Y + 5, 57)
+        for x, y, height in zip(xs, ys, self.raster.get_heights(xs, ys)):
+            expected = self.raster.get_height_for_coordinate(x, y)
+            if expected is None:
+                self.assertTrue(np.isnan(height))
+            else:
+                self.assertEqual(height, expected)
+
+    def test_outside_coverage(self):
+        tile_index = self.raster.tile_index
+        with patch.object(tile_index, 'find') as find, \
+                patch.object(tile_index, 'find_all', wraps=tile_index.find_all) as find_all:
+            self.assertIsNone(self.raster.get_height_for_coordinate(TILE_MIN_X + 1, 0))
+            find.assert_not_called()
+            heights = self.raster.get_heights([TILE_MIN_X + 1] * 2, [TILE_MIN_Y + 1, 0])
+            # only the point in the coverage is looked up
+            self.assertEqual(len(find_all.call_args[0][0]), 1)
+        self.assertEqual(heights[0], 500.5)
+        self.assertTrue(np.isnan(heights[1]))
+
+    def test_get_heights_parallel(self):
+        xs = [TILE_MIN_X + 7, TILE_MIN_X + 1, TILE_MIN_X - 1, TILE_MIN_X + 11, TILE_MIN_X + 3]
+        ys = [TILE_MIN_Y + 1, TILE_MIN_Y + 3, TILE_MIN_Y + 1, TILE_MIN_Y + 3, TILE_MIN_Y + 1]
+        expected = self.raster.get_heights(xs, ys)
+        pool = ReadThreadPool(max_threads=2)
+        with patch('app.helpers.raster.georaster.read_threads', pool), \
+                patch('app.helpers.raster.georaster.RASTER_PARALLEL_MIN_TILES', 2), \
+                patch.object(pool, 'map', wraps=pool.map) as parallel_map:
+            heights = self.raster.get_heights(xs, ys)
+            parallel_map.assert_called_once()
+            # below the threshold, the tiles are read one after the other
+            self.raster.get_heights(xs[1:3], ys[1:3])
+            self.raster.get_heights(xs[2:4], ys[2:4])
+            parallel_map.assert_called_once()
+        pool.shutdown()
+        np.testing.assert_array_equal(heights, expected)
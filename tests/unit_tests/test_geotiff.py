@@ -0,0 +1,127 @@
+from pathlib import Path
+
+import numpy as np
+from mock import patch
+
+from app.helpers.raster.georaster import GeoRaster
+from app.helpers.raster.georaster import GeoTiffTile
+from app.helpers.raster.georaster import get_tiff_directory
+from app.helpers.raster.geotiff import read_tiff_file_directory
+from app.helpers.raster.geotiff import read_tiff_headers
+from app.helpers.raster.tile_registry import TILE_FORMAT_BT
+from app.helpers.raster.tile_registry import TILE_FORMAT_GEOTIFF
+from app.helpers.raster.tile_registry import TileRegistry
+from tests import create_bt_file
+from tests import create_tiff_file
+from tests.unit_tests.base import TempDirTestCase
+
+# 20 columns by 7 rows of 2m cells, starting at (2600000, 1200000)
+TILE_MIN_X, TILE_MIN_Y = 2600000.0, 1200000.0
+NB_COLS, NB_ROWS = 20, 7
+TILE_BOUNDS = (TILE_MIN_X, TILE_MIN_Y, TILE_MIN_X + NB_COLS * 2, TILE_MIN_Y + NB_ROWS * 2)
+TILE_HEIGHTS = (500 + np.arange(NB_COLS * NB_ROWS).reshape(NB_COLS, NB_ROWS) * 1.25).tolist()
+
+
+class TestGeoTiff(TempDirTestCase):
+
+    def tearDown(self):
+        get_tiff_directory.cache_clear()
+
+    def create_tile(self, name, heights=None, **kwargs):
+        filename = str(self.path / name)
+        create_tiff_file(filename, *TILE_BOUNDS, heights or TILE_HEIGHTS, **kwargs)
+        return filename
+
+    def assert_tile_heights(self, filename, heights=None):
+        heights = np.asarray(heights or TILE_HEIGHTS)
+        tile = GeoTiffTile(TileRegistry([TILE_BOUNDS], [filename]), 0)
+        positions_x, positions_y = np.meshgrid(np.arange(NB_COLS), np.arange(NB_ROWS))
+        positions_x = positions_x.ravel()
+        positions_y = positions_y.ravel()
+        xs = TILE_MIN_X + positions_x * 2 + 1
+        ys = TILE_MIN_Y + positions_y * 2 + 1
+        with patch('app.helpers.raster.georaster.block_cache', None):
+            self.assertEqual(
+                tile.get_heights(xs, ys).tolist(), heights[positions_x, positions_y].tolist()
+            )
+            self.assertEqual(tile.get_height_for_coordinate(xs[-1], ys[-1]), heights[-1, -1])
+            self.assertEqual(
+                tile.read_window(3, 2, 4, 5).tolist(),
+                heights[3:7, 2:7].astype(np.float32).tolist()
+            )
+
+    def test_read_directory(self):
+        directory = read_tiff_file_directory(self.create_tile('tile.tif', predictor=3))
+        self.assertEqual((directory.cols, directory.rows), (NB_COLS, NB_ROWS))
+        self.assertEqual((directory.block_width, directory.block_length), (16, 16))
+        # 2 blocks on the width, 1 on the length
+        self.assertEqual(len(directory.offsets), 2)
+        self.assertEqual(directory.compression, 8)
+        self.assertEqual(directory.predictor, 3)
+        self.assertEqual(directory.dtype, np.dtype('<f4'))
+
+    def test_read_headers(self):
+        filenames = [
+            self.create_tile('float.tif'), self.create_tile('int.tif', floating_point=False)
+        ]
+        headers = read_tiff_headers(filenames)
+        self.assertEqual(headers['cols'].tolist(), [NB_COLS, NB_COLS])
+        self.assertEqual(headers['rows'].tolist(), [NB_ROWS, NB_ROWS])
+        self.assertEqual(headers['data_size'].tolist(), [4, 2])
+        self.assertEqual(headers['floating_point'].tolist(), [1, 0])
+
+    def test_read_tiled(self):
+        self.assert_tile_heights(self.create_tile('deflate.tif'))
+        self.assert_tile_heights(self.create_tile('raw.tif', compress=False))
+        self.assert_tile_heights(self.create_tile('predictor.tif', predictor=3))
+        self.assert_tile_heights(self.create_tile('small_blocks.tif', block_size=(16, 4)))
+        self.assert_tile_heights(self.create_tile('big_endian.tif', predictor=3, byte_order='>'))
+
+    def test_read_stripped(self):
+        # 3 strips, the last one has a single row
+        self.assert_tile_heights(self.create_tile('strips.tif', block_size=None, predictor=3))
+
+    def test_read_integers(self):
+        heights = (np.asarray(TILE_HEIGHTS) * 4 - 2000).astype(np.int16).tolist()
+        for byte_order in ('<', '>'):
+            filename = self.create_tile(
+                f'int_{byte_order}.tif',
+                heights,
+                floating_point=False,
+                predictor=2,
+                byte_order=byte_order
+            )
+            self.assert_tile_heights(filename, heights)
+
+    def test_unsupported_file(self):
+        filename = str(self.path / 'tile.tif')
+        Path(filename).write_bytes(b'II+\0' + bytes(12))
+        with self.assertRaises(ValueError):
+            read_tiff_headers([filename])
+        Path(filename).write_bytes(bytes(16))
+        with self.assertRaises(ValueError):
+            read_tiff_headers([filename])
+
+    def test_mixed_formats(self):
+        # the same mosaic, in .bt on the west and in GeoTIFF on the east
+        create_bt_file(str(self.path / 'west.bt'), *TILE_BOUNDS, TILE_HEIGHTS)
+        east_bounds = (TILE_BOUNDS[2], TILE_MIN_Y, TILE_BOUNDS[2] + NB_COLS * 2, TILE_BOUNDS[3])
+        create_tiff_file(str(self.path / 'east.tif'), *east_bounds, TILE_HEIGHTS, predictor=3)
+        raster = GeoRaster(
+            str(self.path / 'index.shp'),
+            registry=GeoRaster.create_registry_from_columns(
+                str(self.path / 'index.shp'), [TILE_BOUNDS, east_bounds], [b'west.bt', b'east.tif']
+            )
+        )
+        self.assertEqual(
+            raster.registry.tiles['format'].tolist(), [TILE_FORMAT_BT, TILE_FORMAT_GEOTIFF]
+        )
+        xs = TILE_MIN_X + np.arange(NB_COLS * 2) * 2 + 1
+        ys = np.full(xs.shape, TILE_MIN_Y + 5)
+        expected = np.asarray(TILE_HEIGHTS)[:, 2].tolist() * 2
+        self.assertEqual(raster.get_heights(xs, ys).tolist(), expected)
+        self.assertEqual(raster.get_height_for_coordinate(xs[-1], ys[-1]), expected[-1])
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            GeoRaster.create_registry_from_columns('index.shp', [TILE_BOUNDS], [b'tile.png'])
@@ -6,6 +6,8 @@ from tests.unit_tests.base import BaseRouteTestCase
 EAST_LV03, NORTH_LV03 = 632510.0, 170755.0
 # LV95
 EAST_LV95, NORTH_LV95 = 2632510.0, 1170755.0
+# WGS84, the same point to a few decimeters
+LON_WGS84, LAT_WGS84 = 7.8636062, 46.6872197
 # Expected results
 HEIGHT_DTM2, HEIGHT_DTM25 = 568.2, 567.6
 
@@ -24,7 +26,7 @@ class TestHeight(BaseRouteTestCase):
         if not mock_georaster_utils:
             mock_georaster_utils = Mock()
         raster_mock = Mock()
-        raster_mock.get_height_for_coordinate.return_value = return_value
+        raster_mock.get_heights.return_value = [return_value]
         mock_georaster_utils.get_raster.return_value = raster_mock
         response = self.__test_get(params)
         self.check_response(response, expected_status)
@@ -93,6 +95,35 @@ class TestHeight(BaseRouteTestCase):
             expected_status=400
         )
 
+    @patch('app.routes.georaster_utils')
+    def test_height_wgs84_valid(self, mock_georaster_utils):
+        self.__assert_height(
+            response=self.__prepare_mock_and_test_get(
+                mock_georaster_utils=mock_georaster_utils,
+                params={
+                    'lon': LON_WGS84, 'lat': LAT_WGS84, 'sr': 4326
+                }
+            ),
+            expected_height=HEIGHT_DTM2
+        )
+        # sampled on the LV95 model
+        mock_georaster_utils.get_raster.assert_called_once_with(2056)
+        get_heights = mock_georaster_utils.get_raster.return_value.get_heights
+        (eastings, northings), _ = get_heights.call_args
+        self.assertAlmostEqual(eastings[0], EAST_LV95, delta=1)
+        self.assertAlmostEqual(northings[0], NORTH_LV95, delta=1)
+
+    @patch('app.routes.georaster_utils')
+    def test_height_wgs84_out_of_bounds(self, mock_georaster_utils):
+        resp = self.__prepare_mock_and_test_get(
+            mock_georaster_utils=mock_georaster_utils,
+            params={
+                'lon': EAST_LV95, 'lat': NORTH_LV95, 'sr': 4326
+            },
+            expected_status=400
+        )
+        self.assertIn('Query is out of bounds', resp.get_data(as_text=True))
+
     @patch('app.routes.georaster_utils')
     def test_height_using_unknown_sr(self, mock_georaster_utils):
         self.__prepare_mock_and_test_get(
@@ -10,7 +10,7 @@ FAKE_VALUE = 1234.5
 
 def prepare_mock(mock_get_raster, return_value):
     fake_tile = Mock()
-    fake_tile.get_height_for_coordinate.return_value = return_value
+    fake_tile.get_heights.return_value = [return_value]
     mock_get_raster.get_raster.return_value = fake_tile
 
 
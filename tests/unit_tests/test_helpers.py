@@ -1,7 +1,19 @@
 import unittest
 
+import numpy as np
+from shapely.geometry import LineString
+from shapely.geometry import Point
+from shapely.geometry import box
+
 from app.helpers.helpers import filter_altitude
+from app.helpers.helpers import filter_altitudes
+from app.helpers.helpers import filter_coordinate
+from app.helpers.helpers import filter_distance
+from app.helpers.helpers import filter_wgs84_coordinate
 from app.helpers.helpers import float_raise_nan
+from app.helpers.validation import bboxes
+from app.helpers.validation import srs_guesser
+from app.helpers.validation import srs_guesser_from_coordinates
 
 
 class TestHelpers(unittest.TestCase):
@@ -22,3 +34,44 @@ class TestHelpers(unittest.TestCase):
         self.assertEqual(alt, filter_altitude(alt))
         alt = 100.111
         self.assertEqual(100.1, filter_altitude(alt))
+
+    def test_filters_round_like_builtin(self):
+        # np.round gives 2730234.446 and 4839.0 for these decimal ties
+        self.assertEqual(filter_coordinate(2730234.4465), 2730234.447)
+        self.assertEqual(filter_distance(4839.05), 4839.1)
+        self.assertEqual(filter_altitudes([4839.05]).tolist(), [4839.1])
+        rng = np.random.default_rng(42)
+        for round_values, ndigits, low, high in (
+            (filter_distance, 1, 0, 100000),
+            (filter_altitudes, 1, 1, 4700),
+            (filter_coordinate, 3, 1070000, 2840000),
+            (filter_wgs84_coordinate, 7, 5, 48),
+        ):
+            # half of the values are decimal ties
+            values = np.concatenate(
+                (np.round(rng.uniform(low, high, 1000), ndigits + 1), rng.uniform(low, high, 1000))
+            )
+            self.assertEqual(
+                round_values(values).tolist(), [round(value, ndigits) for value in values.tolist()]
+            )
+
+
+class TestSrsGuesser(unittest.TestCase):
+
+    def test_same_as_shapely(self):
+        # the points inside, outside and on the border of the LV95 bbox
+        xs = [2300000, 2385000, 2600000, 2935000]
+        ys = [974000, 1200000, 1404000, 1500000]
+        points = [(x, y) for x in xs for y in ys]
+        geometries = [Point(point) for point in points]
+        geometries += [LineString([start, end]) for start in points for end in points]
+        geometries.append(LineString([(2385000, 974000), (2385000, 1404000), (2935000, 1404000)]))
+        for geom in geometries:
+            coordinates = np.asarray(geom.coords)
+            expected = 2056 if box(*bboxes[2056]).contains(geom) else None
+            self.assertEqual(srs_guesser_from_coordinates(coordinates), expected, msg=geom.wkt)
+            self.assertEqual(srs_guesser(geom), expected, msg=geom.wkt)
+
+    def test_lv03(self):
+        self.assertEqual(srs_guesser_from_coordinates(np.asarray([[600000.0, 200000.0]])), 21781)
+        self.assertIsNone(srs_guesser_from_coordinates(np.empty((0, 2))))
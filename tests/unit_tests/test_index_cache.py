@@ -0,0 +1,90 @@
+import os
+
+from mock import patch
+
+from app.helpers.raster.index_cache import get_index_cache_file
+from app.helpers.raster.index_cache import load_index_cache
+from app.helpers.raster.index_cache import write_index_cache
+from app.helpers.raster.tile_registry import TileRegistry
+from tests import create_bt_file
+from tests.unit_tests.base import TempDirTestCase
+
+
+class TestIndexCache(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.index_file = str(self.path / 'index.shp')
+        # only the content, size and modification time of the index files are used by the cache
+        for suffix in ('.shp', '.dbf'):
+            (self.path / f'index{suffix}').write_bytes(b'index')
+        bounds = []
+        filenames = []
+        for i in range(3):
+            filename = str(self.path / f'tile_{i}.bt')
+            create_bt_file(filename, 2600000 + i * 6, 1200000, 2600006 + i * 6, 1200004, [[1, 2]])
+            bounds.append((2600000 + i * 6, 1200000, 2600006 + i * 6, 1200004))
+            filenames.append(filename)
+        self.registry = TileRegistry(bounds, filenames)
+
+    def test_write_and_load(self):
+        self.assertIsNone(load_index_cache(self.index_file))
+        self.assertTrue(write_index_cache(self.index_file, self.registry))
+        self.assertTrue((self.path / 'index.tileindex').exists())
+        registry = load_index_cache(self.index_file)
+        self.assertIsNotNone(registry)
+        self.assertEqual(registry.tiles.tobytes(), self.registry.tiles.tobytes())
+        self.assertEqual(registry.filenames, self.registry.filenames)
+        self.assertEqual((self.path / 'index.tileindex').stat().st_mode & 0o777, 0o644)
+
+    def test_write_and_load_in_cache_dir(self):
+        cache_dir = self.path / 'cache'
+        self.assertTrue(write_index_cache(self.index_file, self.registry, cache_dir))
+        self.assertEqual(get_index_cache_file(self.index_file, cache_dir).parent, cache_dir)
+        self.assertIsNone(load_index_cache(self.index_file))
+        self.assertEqual(len(load_index_cache(self.index_file, cache_dir)), 3)
+
+    def test_empty_registry(self):
+        self.assertTrue(write_index_cache(self.index_file, TileRegistry([], [])))
+        self.assertEqual(len(load_index_cache(self.index_file)), 0)
+
+    def test_outdated(self):
+        write_index_cache(self.index_file, self.registry)
+        (self.path / 'index.dbf').write_bytes(b'new index')
+        self.assertIsNone(load_index_cache(self.index_file))
+        write_index_cache(self.index_file, self.registry)
+        stat = os.stat(self.index_file)
+        os.utime(self.index_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        self.assertIsNone(load_index_cache(self.index_file))
+        # same size and modification time, another content
+        write_index_cache(self.index_file, self.registry)
+        stat = os.stat(self.index_file)
+        (self.path / 'index.shp').write_bytes(b'INDEX')
+        os.utime(self.index_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNone(load_index_cache(self.index_file))
+
+    def test_invalid(self):
+        write_index_cache(self.index_file, self.registry)
+        cache_file = get_index_cache_file(self.index_file)
+        cache_file.write_bytes(cache_file.read_bytes()[:-10])
+        self.assertIsNone(load_index_cache(self.index_file))
+        cache_file.write_bytes(b'garbage')
+        self.assertIsNone(load_index_cache(self.index_file))
+
+    def test_not_writable(self):
+        cache_dir = self.path / 'not_a_directory'
+        cache_dir.write_bytes(b'')
+        self.assertFalse(write_index_cache(self.index_file, self.registry, cache_dir))
+
+    def test_no_temporary_file_left(self):
+        for error in (OSError('replace failed'), ValueError('serialization failed')):
+            with patch('app.helpers.raster.index_cache.os.replace', side_effect=error):
+                if isinstance(error, OSError):
+                    self.assertFalse(write_index_cache(self.index_file, self.registry))
+                else:
+                    with self.assertRaises(ValueError):
+                        write_index_cache(self.index_file, self.registry)
+            self.assertEqual(
+                sorted(path.name for path in self.path.iterdir()),
+                ['index.dbf', 'index.shp', 'tile_0.bt', 'tile_1.bt', 'tile_2.bt']
+            )
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from app.helpers.raster.io_planner import plan_reads
+from app.helpers.raster.io_planner import read_cells
+
+CELLS = np.arange(1000, dtype='<f4') / 4
+
+
+class TestIoPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.reads = []
+
+    def read(self, first_cell, nb_cells):
+        self.reads.append((first_cell, nb_cells))
+        return CELLS[first_cell:first_cell + nb_cells].tobytes()
+
+    def test_plan_reads(self):
+        unique_cells, inverse, ranges = plan_reads(np.array([7, 3, 4, 20, 3, 10]), max_gap=2)
+        self.assertEqual(unique_cells.tolist(), [3, 4, 7, 10, 20])
+        self.assertEqual(unique_cells[inverse].tolist(), [7, 3, 4, 20, 3, 10])
+        self.assertEqual(ranges, [(0, 4), (4, 5)])
+
+    def test_plan_reads_empty(self):
+        unique_cells, inverse, ranges = plan_reads(np.array([], dtype=np.int64), max_gap=2)
+        self.assertEqual(len(unique_cells), 0)
+        self.assertEqual(len(inverse), 0)
+        self.assertEqual(ranges, [])
+
+    def test_read_cells(self):
+        cells = np.array([500, 2, 3, 2, 999, 0, 501])
+        values = read_cells(self.read, cells, '<f4', max_gap=0)
+        self.assertEqual(values.tolist(), CELLS[cells].tolist())
+        self.assertEqual(self.reads, [(0, 1), (2, 2), (500, 2), (999, 1)])
+
+    def test_read_cells_merges_nearby_cells(self):
+        cells = np.arange(0, 1000, 10)[::-1]
+        values = read_cells(self.read, cells, '<f4', max_gap=9)
+        self.assertEqual(values.tolist(), CELLS[cells].tolist())
+        self.assertEqual(self.reads, [(0, 991)])
+        self.reads = []
+        read_cells(self.read, cells, '<f4', max_gap=8)
+        self.assertEqual(len(self.reads), 100)
@@ -0,0 +1,101 @@
+import numpy as np
+from mock import patch
+
+from app.helpers.raster.georaster import GeoRaster
+from app.helpers.raster.georaster import GeoRasterUtils
+from app.helpers.raster.lv03 import LV03Raster
+from app.helpers.raster.lv03 import ShiftGrid
+from app.helpers.raster.lv03 import lv03_to_lv95
+from app.helpers.raster.tile_registry import TileRegistry
+from tests import create_bt_file
+from tests import create_index_file
+from tests.unit_tests.base import TempDirTestCase
+
+# 10 columns by 5 rows of 2m cells in LV95, the height is 100 times the column plus the row
+TILE_BOUNDS = (2600000.0, 1200000.0, 2600020.0, 1200010.0)
+TILE_HEIGHTS = [[500.0 + 100 * col + row for row in range(5)] for col in range(10)]
+
+
+def create_shift_grid(shift_x, shift_y):
+    # a grid of constant shifts around the tile
+    shifts = np.ones((3, 3))
+    return ShiftGrid(599990.0, 199990.0, 20.0, shifts * shift_x, shifts * shift_y)
+
+
+class TestLV03(TempDirTestCase):
+
+    def create_raster(self):
+        filename = str(self.path / 'tile.bt')
+        create_bt_file(filename, *TILE_BOUNDS, TILE_HEIGHTS)
+        return GeoRaster(
+            str(self.path / 'index.shp'), registry=TileRegistry([TILE_BOUNDS], [filename])
+        )
+
+    def test_translation(self):
+        xs, ys = lv03_to_lv95([600000.5, 700000], [200000.5, 100000])
+        self.assertEqual(xs.tolist(), [2600000.5, 2700000])
+        self.assertEqual(ys.tolist(), [1200000.5, 1100000])
+
+    def test_shift_grid_interpolation(self):
+        # a linear field is interpolated exactly inside the grid, and clamped outside of it
+        cols, rows = np.meshgrid(np.arange(4), np.arange(3), indexing='ij')
+        grid = ShiftGrid(600000.0, 200000.0, 1000.0, 0.5 + 0.1 * cols, -0.2 * rows)
+        shifts_x, shifts_y = grid.interpolate(
+            [600000.0, 601500.0, 603000.0, 610000.0, 590000.0, np.nan],
+            [200000.0, 201250.0, 202000.0, 201000.0, 190000.0, 200000.0]
+        )
+        np.testing.assert_allclose(shifts_x, [0.5, 0.65, 0.8, 0.8, 0.5, 0.5])
+        np.testing.assert_allclose(shifts_y, [0.0, -0.25, -0.4, -0.2, 0.0, 0.0])
+        xs, ys = grid.lv03_to_lv95([601500.0, np.nan], [201250.0, 200000.0])
+        np.testing.assert_allclose(xs, [2601500.65, np.nan])
+        np.testing.assert_allclose(ys, [1201249.75, 1200000.0])
+
+    def test_shift_grid_file(self):
+        filename = str(self.path / 'shifts.npz')
+        np.savez(
+            filename,
+            origin_x=600000.0,
+            origin_y=200000.0,
+            spacing=1000.0,
+            shift_x=np.full((2, 2), 0.5),
+            shift_y=np.full((2, 2), -0.5)
+        )
+        grid = ShiftGrid.from_file(filename)
+        self.assertEqual((grid.origin_x, grid.origin_y, grid.spacing), (600000, 200000, 1000))
+        with self.assertRaises(ValueError):
+            ShiftGrid(600000.0, 200000.0, 1000.0, np.zeros((1, 2)), np.zeros((1, 2)))
+
+    def test_lv03_raster(self):
+        raster = self.create_raster()
+        lv03_raster = LV03Raster(raster)
+        self.assertIs(lv03_raster.registry, raster.registry)
+        xs = 600000 + np.arange(10) * 2 + 1
+        ys = np.full(xs.shape, 200003.0)
+        self.assertEqual(
+            lv03_raster.get_heights(xs, ys).tolist(),
+            raster.get_heights(xs + 2e6, ys + 1e6).tolist()
+        )
+        self.assertEqual(lv03_raster.get_height_for_coordinate(600001, 200003), 501.0)
+        self.assertIsNone(lv03_raster.get_height_for_coordinate(599999, 200003))
+        # with the shifts, the points move one cell east and one cell south
+        shifted_raster = LV03Raster(raster, create_shift_grid(2.0, -2.0))
+        self.assertEqual(shifted_raster.get_heights([600001], [200003]).tolist(), [600.0])
+        self.assertEqual(shifted_raster.get_height_for_coordinate(600001, 200003), 600.0)
+
+    def test_raster_utils(self):
+        self.create_raster()
+        lv95_dir = self.path / 'swissalti3d/kombo_2m_regio_lv95'
+        lv95_dir.mkdir(parents=True)
+        (self.path / 'tile.bt').rename(lv95_dir / 'tile.bt')
+        create_index_file(str(lv95_dir / 'index.shp'), [(TILE_BOUNDS, 'tile.bt')])
+        with patch('app.helpers.raster.georaster.DTM_BASE_PATH', self.path), \
+                patch('app.helpers.raster.georaster.RASTER_INDEX_CACHE', False), \
+                patch('app.helpers.raster.georaster.RASTER_LV03_FROM_LV95', True):
+            georaster_utils = GeoRasterUtils()
+            # the LV03 mosaic is not needed
+            self.assertTrue(georaster_utils.raster_files_exists())
+            lv03_raster = georaster_utils.get_raster(21781)
+            self.assertIsInstance(lv03_raster, LV03Raster)
+            self.assertIs(lv03_raster.raster, georaster_utils.get_raster(2056))
+            self.assertIs(georaster_utils.get_raster(21781), lv03_raster)
+            self.assertEqual(lv03_raster.get_height_for_coordinate(600019, 200009), 1404.0)
@@ -1,10 +1,12 @@
 import csv
 import json
 import logging
+import math
 from io import StringIO
 
 from mock import patch
 
+from app.helpers.profile_helpers import PROFILE_CSV_CHUNK_SIZE
 from app.helpers.profile_helpers import PROFILE_DEFAULT_AMOUNT_POINTS
 from app.helpers.profile_helpers import PROFILE_MAX_AMOUNT_POINTS
 from tests import create_json
@@ -15,6 +17,7 @@ from tests.unit_tests import LINESTRING_SMALL_LINE_LV03
 from tests.unit_tests import LINESTRING_SMALL_LINE_LV95
 from tests.unit_tests import LINESTRING_VALID_LV03
 from tests.unit_tests import LINESTRING_VALID_LV95
+from tests.unit_tests import LINESTRING_VALID_WGS84
 from tests.unit_tests import LINESTRING_WRONG_SHAPE
 from tests.unit_tests import POINT_1_LV03
 from tests.unit_tests import POINT_2_LV03
@@ -124,7 +127,7 @@ class TestProfileJson(TestProfileBase):
         self.assert_response_contains(
             resp,
             "Please provide a valid number for the spatial reference "
-            "system model: 21781, 2056"
+            "system model: 21781, 2056, 4326"
         )
 
     @patch('app.routes.georaster_utils')
@@ -137,6 +140,42 @@ class TestProfileJson(TestProfileBase):
             expected_status=200
         )
 
+    @patch('app.routes.georaster_utils')
+    def test_profile_wgs84_json_valid(self, mock_georaster_utils):
+        resp = self.prepare_mock_and_test_get(
+            mock_georaster_utils=mock_georaster_utils,
+            params={
+                'sr': 4326, 'geom': LINESTRING_VALID_WGS84, 'nb_points': 50
+            },
+            expected_status=200
+        )
+        mock_georaster_utils.get_raster.assert_called_once_with(2056)
+        self.assertEqual(len(resp.json), 50)
+        first_point = resp.json[0]
+        last_point = resp.json[-1]
+        self.assertEqual(first_point['dist'], 0)
+        # converted to LV95 and back, within a meter
+        self.assertAlmostEqual(first_point['easting'], 7.824232, delta=1e-5)
+        self.assertAlmostEqual(first_point['northing'], 46.683734, delta=1e-5)
+        self.assertAlmostEqual(last_point['easting'], 7.902743, delta=1e-5)
+        self.assertAlmostEqual(last_point['northing'], 46.710879, delta=1e-5)
+        # the distances are in meters
+        self.assertAlmostEqual(last_point['dist'], 6720.6, delta=5)
+
+    @patch('app.routes.georaster_utils')
+    def test_profile_wgs84_only_requested_points(self, mock_georaster_utils):
+        resp = self.prepare_mock_and_test_get(
+            mock_georaster_utils=mock_georaster_utils,
+            params={
+                'sr': 4326, 'geom': LINESTRING_VALID_WGS84, 'only_requested_points': True
+            },
+            expected_status=200
+        )
+        self.assertEqual(
+            [[point['easting'], point['northing']] for point in resp.json],
+            json.loads(LINESTRING_VALID_WGS84)['coordinates']
+        )
+
     @patch('app.routes.georaster_utils')
     def test_profile_lv03_json_valid(self, mock_georaster_utils):
         resp = self.prepare_mock_and_test_get(
@@ -626,3 +665,22 @@ class TestProfileCsv(TestProfileBase):
         self.assertEqual(response.content_type, 'text/csv')
         data = self.parse_csv(response.get_data(as_text=True))
         self.assertAlmostEqual(len(data), nb_points, delta=1)
+
+    @patch('app.routes.georaster_utils')
+    def test_profile_csv_streamed(self, mock_georaster_utils):
+        nb_points = 1200
+        response = self.mock_get_csv_profile(
+            mock_georaster_utils,
+            params={
+                'geom': LINESTRING_VALID_LV95, 'nb_points': nb_points
+            },
+            expected_status=200
+        )
+        # the headers, then the rows by chunks of PROFILE_CSV_CHUNK_SIZE
+        chunks = list(response.response)
+        self.assertEqual(chunks[0], b'"Distance";"Altitude";"Easting";"Northing"\r\n')
+        self.assertEqual(len(chunks), 1 + math.ceil(nb_points / PROFILE_CSV_CHUNK_SIZE))
+        rows = list(csv.reader(StringIO(response.get_data(as_text=True)), delimiter=';'))
+        self.assertEqual(rows[0], ['Distance', 'Altitude', 'Easting', 'Northing'])
+        self.assertEqual(len(rows), nb_points + 1)
+        self.assertEqual(rows[1][0], '0.0')
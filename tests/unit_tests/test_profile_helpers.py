@@ -1,11 +1,23 @@
 import logging
+import math
 import unittest
 
+import numpy as np
 from mock import Mock
 from mock import patch
+from shapely.geometry import LineString
 
 from app.helpers.profile_helpers import PROFILE_DEFAULT_AMOUNT_POINTS
+from app.helpers.profile_helpers import SMOOTHING_KERNELS
+from app.helpers.profile_helpers import Profile
+from app.helpers.profile_helpers import _create_points
+from app.helpers.profile_helpers import _create_profile
+from app.helpers.profile_helpers import _obtain_nb_points_per_segment_no_loss
+from app.helpers.profile_helpers import _place_points
+from app.helpers.profile_helpers import _smart_filling
+from app.helpers.profile_helpers import _smooth
 from app.helpers.profile_helpers import get_profile
+from app.helpers.raster.georaster import RESOLUTION
 from tests.unit_tests import FAKE_GEOM_2_POINTS
 from tests.unit_tests import FAKE_GEOM_3_POINTS
 from tests.unit_tests import FAKE_RESOLUTION
@@ -19,6 +31,90 @@ def fake_get_height_for_coordinate(_, y):
     return VALUES_FOR_EACH_2M_STEP[int((y - 1199980) / 2) % 11]
 
 
+def former_nb_points_per_segment(distances, nb_points_total, total_distance):
+    # the allocation replaced by the largest remainder one, kept to show the points it lost
+    nb_points_segments = []
+    for d in distances:
+        nb_points_segments.append(math.modf(max(nb_points_total * d / total_distance, 0.0)))
+    sum_int = sum(int(nbp[1]) for nbp in nb_points_segments)
+    while sum_int < nb_points_total:
+        min_val, max_val, min_index, max_index = 1.0, 0.0, 0, 0
+        for i, item in enumerate(nb_points_segments):
+            if item[0] > 0.0:
+                if item[0] < min_val:
+                    min_index = i
+                if item[0] > max_val:
+                    max_index = i
+
+        nb_points_segments[min_index] = (-0.5, nb_points_segments[min_index][1])
+        nb_points_segments[max_index] = (-0.5, nb_points_segments[max_index][1] + 1.0)
+        sum_int = sum(int(nbp[0]) for nbp in nb_points_segments)
+
+        if min_val >= 1.0 and max_val <= 0.0:
+            break
+    return [int(nbp[1]) for nbp in nb_points_segments]
+
+
+def former_place_smart(start, end, nb_points, distance):
+    # the former smart filling of a segment: one point every resolution after its start, until
+    # nb_points are placed or its end is passed
+    segment = LineString([start, end])
+    resolution = max(distance / nb_points, RESOLUTION)
+    points = []
+    covered = 0
+    while len(points) != nb_points and covered < distance:
+        covered += resolution
+        point = segment.interpolate((len(points) + 1) * resolution)
+        points.append([point.x, point.y])
+    return points
+
+
+def former_place_regular(start, end, nb_points):
+    # the former regular filling of a segment: nb_points at equal distance after its start
+    dx = (end[0] - start[0]) / float(nb_points)
+    dy = (end[1] - start[1]) / float(nb_points)
+    return [[start[0] + dx * j, start[1] + dy * j] for j in range(1, nb_points + 1)]
+
+
+def former_create_points(coordinates, nb_points, smart_filling=False, keep_points=False):
+    # the filling point by point replaced by the array one, with the current allocation of the
+    # keep_points filling (see former_nb_points_per_segment for the former one)
+    distances = [
+        math.sqrt(math.pow(end[0] - start[0], 2.0) + math.pow(end[1] - start[1], 2.0))
+        for start, end in zip(coordinates[:-1], coordinates[1:])
+    ]
+    total_distance = sum(distances)
+    segments = zip(coordinates[:-1], coordinates[1:], distances)
+    if keep_points:
+        if total_distance < 0.001:
+            return coordinates
+        counts = _obtain_nb_points_per_segment_no_loss(distances, nb_points - 1, total_distance)
+        result = []
+        for (start, end, distance), count in zip(segments, counts.tolist()):
+            if not smart_filling:
+                result += [start] + former_place_regular(start, end, max(count, 1))[:-1]
+            elif distance > RESOLUTION and count > 0:
+                result += [start] + former_place_smart(start, end, count, distance)[:-1]
+            else:
+                result.append(start)
+        return result + [coordinates[-1]]
+    if total_distance == 0:
+        return coordinates
+    result = [coordinates[0]]
+    for start, end, distance in segments:
+        if not smart_filling:
+            count = max(int((nb_points - 1) * (distance / total_distance) + 0.5), 1)
+            result += former_place_regular(start, end, count)
+        elif distance > RESOLUTION and int(nb_points * (distance / total_distance)) > 0:
+            count = int(nb_points * (distance / total_distance))
+            result += former_place_smart(start, end, count, distance)
+    return result
+
+
+def fake_get_heights(xs, ys):
+    return np.array([fake_get_height_for_coordinate(x, y) for x, y in zip(xs, ys)])
+
+
 def prepare_mock(mock_georaster_utils):
     # creating a fake tile that responds with pre defined values
     tile_mock = Mock()
@@ -27,6 +123,7 @@ def prepare_mock(mock_georaster_utils):
 
     raster_mock = Mock()
     raster_mock.get_height_for_coordinate = Mock(side_effect=fake_get_height_for_coordinate)
+    raster_mock.get_heights = Mock(side_effect=fake_get_heights)
     raster_mock.get_tile.return_value = tile_mock
     # link this to the get_raster function
     mock_georaster_utils.get_raster.return_value = raster_mock
@@ -45,7 +142,6 @@ class TestProfileHelpers(unittest.TestCase):
             only_requested_points=False,
             smart_filling=smart_filling,
             keep_points=keep_points,
-            output_to_json=True,
             georaster_utils=mock
         )
         self.assertIsNotNone(response)
@@ -117,9 +213,11 @@ class TestProfileHelpers(unittest.TestCase):
     @patch('app.routes.georaster_utils')
     def test_coordinates_out_of_bound(self, mock_georaster_utils):
         # pylint: disable=broad-except
-        # when there's no tile for coordinates (because out of bounds) None is returned for the tile
-        # the service should return an empty profile
-        mock_georaster_utils.get_raster.return_value.get_tile.return_value = None
+        # when there's no tile for coordinates (because out of bounds) NaN is returned for the
+        # heights, the service should return an empty profile
+        mock_georaster_utils.get_raster.return_value.get_heights = Mock(
+            side_effect=lambda xs, ys: np.full(len(xs), np.nan)
+        )
         try:
             response = get_profile(
                 geom=FAKE_GEOM_2_POINTS,
@@ -128,7 +226,6 @@ class TestProfileHelpers(unittest.TestCase):
                 only_requested_points=False,
                 smart_filling=True,
                 keep_points=True,
-                output_to_json=True,
                 georaster_utils=mock_georaster_utils
             )
             self.assertIsNotNone(response)
@@ -160,3 +257,240 @@ class TestProfileHelpers(unittest.TestCase):
             msg="The middle point should be included in the resulting profile "
             "as keep_points was set to true"
         )
+
+    def test_create_points(self):
+        coordinates = np.asarray([[0.0, 0.0], [10.0, 0.0], [10.0, 5.0]])
+        expected = [[0.0, 0.0], [5.0, 0.0], [10.0, 0.0], [10.0, 5.0]]
+        for keep_points in (False, True):
+            self.assertEqual(
+                _create_points(coordinates, 4, keep_points=keep_points).tolist(), expected
+            )
+        # the points are spread on the segments on a prorata basis
+        points = _create_points(coordinates, 31).tolist()
+        self.assertEqual(len(points), 31)
+        self.assertEqual(points[20], [10.0, 0.0])
+        self.assertEqual(points[-1], [10.0, 5.0])
+        # a line without length is kept as it is
+        for keep_points in (False, True):
+            self.assertEqual(
+                _create_points([[1.0, 2.0], [1.0, 2.0]], 10, keep_points=keep_points).tolist(),
+                [[1.0, 2.0], [1.0, 2.0]]
+            )
+
+    def test_create_points_smart_filling(self):
+        # one point every 2m, the last one beyond the end of the line is placed on its end
+        expected = [[2600000.0 + x, 1200000.0] for x in list(range(0, 21, 2)) + [21]]
+        coordinates = [[2600000.0, 1200000.0], [2600021.0, 1200000.0]]
+        for keep_points in (False, True):
+            np.testing.assert_array_max_ulp(
+                _create_points(coordinates, 100, smart_filling=True, keep_points=keep_points),
+                expected,
+                maxulp=1
+            )
+        # fewer points than the resolution allows, spread on the line
+        np.testing.assert_array_max_ulp(
+            _create_points(coordinates, 3, smart_filling=True),
+            [
+                [2600000.0, 1200000.0], [2600007.0, 1200000.0], [2600014.0, 1200000.0],
+                [2600021.0, 1200000.0]
+            ],
+            maxulp=1
+        )
+        # the segments shorter than the resolution are not filled
+        np.testing.assert_array_max_ulp(
+            _create_points([[0.0, 0.0], [1.5, 0.0], [1.5, 5.0]], 10, smart_filling=True),
+            [[0.0, 0.0], [1.5, 2.0], [1.5, 4.0], [1.5, 5.0]],
+            maxulp=1
+        )
+
+    def test_create_points_like_former(self):
+        rng = np.random.default_rng(42)
+        for _ in range(40):
+            nb_vertices = int(rng.integers(2, 30))
+            # segments around the 2m resolution and longer ones, some of them without length
+            steps = rng.uniform(-1, 1,
+                                (nb_vertices, 2)) * rng.choice([0.0, 3.0, 200.0], (nb_vertices, 1))
+            coordinates = (np.array([2600000.0, 1200000.0]) + np.cumsum(steps, axis=0)).tolist()
+            nb_points = int(rng.integers(2, 1000))
+            for smart_filling in (False, True):
+                for keep_points in (False, True):
+                    points = _create_points(coordinates, nb_points, smart_filling, keep_points)
+                    former = former_create_points(
+                        coordinates, nb_points, smart_filling, keep_points
+                    )
+                    if smart_filling:
+                        # GEOS can place a point one unit in the last place away, see below
+                        np.testing.assert_array_max_ulp(points, np.asarray(former), maxulp=1)
+                    else:
+                        np.testing.assert_array_equal(points, former)
+
+    def test_place_points_like_shapely(self):
+        # the interpolation can differ from the GEOS one by one unit in the last place of a
+        # coordinate (about 0.2% of the points), never more
+        rng = np.random.default_rng(42)
+        points = np.column_stack(
+            (
+                2600000.0 + np.cumsum(rng.uniform(-3, 3, 200)),
+                1200000.0 + np.cumsum(rng.uniform(-3, 3, 200))
+            )
+        )
+        lengths = np.hypot(*np.diff(points, axis=0).T)
+        counts = rng.integers(0, 4, len(lengths))
+        resolutions, nb_placed = _smart_filling(lengths, counts)
+        placed = _place_points(points, lengths, resolutions, nb_placed, first_step=0)
+        expected = [
+            LineString(points[i:i + 2]).interpolate(step * resolutions[i]).coords[0]
+            for i, nb_points in enumerate(nb_placed.tolist())
+            for step in range(nb_points)
+        ]
+        np.testing.assert_array_max_ulp(placed, np.asarray(expected), maxulp=1)
+
+    def test_nb_points_per_segment(self):
+        # the cases where the former allocation did not lose points give the same result
+        for distances, nb_points, expected in (
+            ([1.0, 1.0, 2.0], 8, [2, 2, 4]),
+            ([1.0, 2.0], 4, [1, 3]),
+            ([1.0, 1.0, 1.0], 10, [3, 3, 4]),
+            ([3.0, 1.0], 4, [3, 1]),
+        ):
+            self.assertEqual(
+                former_nb_points_per_segment(distances, nb_points, sum(distances)), expected
+            )
+            self.assertEqual(
+                _obtain_nb_points_per_segment_no_loss(distances, nb_points,
+                                                      sum(distances)).tolist(),
+                expected
+            )
+        # the former allocation only added one point whatever the number of points missing
+        for distances, nb_points, former, expected in (
+            ([1.0, 2.0, 3.0, 4.0], 19, [1, 3, 5, 8], [2, 4, 6, 7]),
+            ([1.0, 1.0, 1.0], 11, [3, 3, 4], [3, 4, 4]),
+            ([1.0, 1.0, 1.0, 1.0, 1.0, 1.0], 10, [1, 1, 1, 1, 1, 2], [1, 1, 2, 2, 2, 2]),
+        ):
+            self.assertEqual(
+                former_nb_points_per_segment(distances, nb_points, sum(distances)), former
+            )
+            self.assertLess(sum(former), nb_points)
+            nb_points_per_segment = _obtain_nb_points_per_segment_no_loss(
+                distances, nb_points, sum(distances)
+            )
+            self.assertEqual(nb_points_per_segment.tolist(), expected)
+            self.assertEqual(nb_points_per_segment.sum(), nb_points)
+        # every segment gets its share rounded down or up, the largest remainders rounded up
+        rng = np.random.default_rng(42)
+        for nb_segments in (1, 10, 1000):
+            distances = rng.uniform(0, 100, nb_segments)
+            total_distance = float(np.cumsum(distances)[-1])
+            shares = 4999 * distances / total_distance
+            nb_points_per_segment = _obtain_nb_points_per_segment_no_loss(
+                distances, 4999, total_distance
+            )
+            self.assertEqual(nb_points_per_segment.sum(), 4999)
+            rounded_up = nb_points_per_segment > np.floor(shares)
+            np.testing.assert_array_equal(nb_points_per_segment - rounded_up, np.floor(shares))
+            remainders = shares - np.floor(shares)
+            if rounded_up.any() and not rounded_up.all():
+                self.assertGreaterEqual(remainders[rounded_up].min(), remainders[~rounded_up].max())
+        # so that the profiles keeping the given points have the requested number of points
+        coordinates = [[float(x), 0.0] for x in range(7)]
+        self.assertEqual(len(_create_points(coordinates, 11, keep_points=True)), 11)
+
+    def test_smooth(self):
+
+        def smooth_point_by_point(offset, z_values):
+            result = []
+            for j, z_value in enumerate(z_values):
+                if math.isnan(z_value):
+                    result.append(z_value)
+                    continue
+                neighbours = [
+                    (z_values[j + k], 1.0 / (abs(k) + 1))
+                    for k in range(-offset, offset + 1)
+                    if 0 <= j + k < len(z_values) and not math.isnan(z_values[j + k])
+                ]
+                result.append(
+                    sum(z * weight for z, weight in neighbours) /
+                    sum(weight for _, weight in neighbours)
+                )
+            return result
+
+        z_values = np.random.default_rng(42).uniform(400, 4000, 500)
+        z_values[[0, 10, 11, 12, 250, 499]] = np.nan
+        z_values = z_values.tolist()
+        # the large offsets are smoothed with FFTs
+        for offset in (1, 5, 100, 1000):
+            np.testing.assert_allclose(
+                _smooth(offset, z_values), smooth_point_by_point(offset, z_values), rtol=1e-12
+            )
+        self.assertEqual(_smooth(3, [1.0]).tolist(), [1.0])
+        self.assertTrue(all(math.isnan(z) for z in _smooth(3, [np.nan, np.nan])))
+
+    def test_smooth_gaussian(self):
+        # with an offset of 3, the standard deviation is 1
+        smoothed = _smooth(3, [0.0, 0.0, 0.0, 9.0, 0.0, 0.0, 0.0], kernel='gaussian')
+        weights = np.exp(-0.5 * np.arange(-3, 4)**2)
+        self.assertAlmostEqual(smoothed[3], 9.0 / weights.sum())
+        self.assertAlmostEqual(smoothed[2], 9.0 * weights[2] / weights[1:].sum())
+        np.testing.assert_array_equal(smoothed, smoothed[::-1])
+
+    def test_smooth_short_profile(self):
+        # the kernel of a profile shorter than the offset is the one of a long profile, whose
+        # neighbours beyond the short profile are missing
+        z_values = [0.0, 9.0, 0.0]
+        padding = [np.nan] * 40
+        for kernel in SMOOTHING_KERNELS:
+            np.testing.assert_allclose(
+                _smooth(30, z_values, kernel=kernel),
+                _smooth(30, padding + z_values + padding, kernel=kernel)[40:43],
+                rtol=1e-12
+            )
+        # with an offset of 30, the standard deviation is 10
+        weights = np.exp(-0.5 * (np.arange(-1, 2) / 10)**2)
+        self.assertAlmostEqual(_smooth(30, z_values, kernel='gaussian')[1], 9.0 / weights.sum())
+
+    def test_create_profile(self):
+        coordinates = np.asarray(
+            [
+                [2600000.0, 1200000.0], [2600003.0, 1200004.0], [2600003.0, 1200004.04],
+                [2600003.0, 1200010.0]
+            ]
+        )
+        # the points without altitude (under 0m or NaN) are left out, their distance still counts
+        profile = _create_profile(coordinates, np.asarray([500.04, np.nan, -1.0, 512.36]))
+        self.assertIsInstance(profile, Profile)
+        self.assertEqual(len(profile), 2)
+        self.assertEqual(profile.distances.tolist(), [0.0, 11.0])
+        self.assertEqual(
+            profile.to_json(),
+            [
+                {
+                    'alts': {
+                        'COMB': 500.0, 'DTM2': 500.0, 'DTM25': 500.0
+                    },
+                    'dist': 0.0,
+                    'easting': 2600000.0,
+                    'northing': 1200000.0
+                },
+                {
+                    'alts': {
+                        'COMB': 512.4, 'DTM2': 512.4, 'DTM25': 512.4
+                    },
+                    'dist': 11.0,
+                    'easting': 2600003.0,
+                    'northing': 1200010.0
+                },
+            ]
+        )
+        self.assertEqual(profile[1], profile.to_json()[1])
+        self.assertEqual(list(profile), profile.to_json())
+        self.assertEqual(
+            profile.csv_rows(),
+            [[0.0, 500.0, 2600000.0, 1200000.0], [11.0, 512.4, 2600003.0, 1200010.0]]
+        )
+        self.assertEqual(
+            list(profile.csv_chunks(1)),
+            [[(0.0, 500.0, 2600000.0, 1200000.0)], [(11.0, 512.4, 2600003.0, 1200010.0)]]
+        )
+        # the serialized values are python floats
+        self.assertIs(type(profile[0]['dist']), float)
+        self.assertIs(type(profile.csv_rows()[1][1]), float)
@@ -1,10 +1,13 @@
 import logging
 
+import numpy as np
 from mock import patch
+from shapely.geometry import LineString
 
 from app.helpers.profile_helpers import PROFILE_DEFAULT_AMOUNT_POINTS
 from app.helpers.profile_helpers import PROFILE_MAX_AMOUNT_POINTS
 from tests import create_json
+from tests import create_polyline
 from tests.unit_tests import DEFAULT_HEADERS
 from tests.unit_tests import prepare_mock
 from tests.unit_tests.test_profile import TestProfileBase
@@ -17,6 +20,7 @@ INVALID_SPATIAL_REFERENCE = 66600
 VALID_OFFSET = 5
 VALID_NB_POINTS = 100
 INVALID_OFFSET = "hello world"
+COORDINATES = [[2631599.9, 1173200.1], [2631699.85, 1173150.2], [2631500.0, 1173300.75]]
 
 
 class TestProfileValidation(TestProfileBase):
@@ -205,3 +209,124 @@ class TestProfileValidation(TestProfileBase):
             mock_georaster_utils=mock_georaster_utils
         )
         self.check_response(response, expected_status=400)
+
+    @patch('app.routes.georaster_utils')
+    def test_profile_validation_invalid_coordinates(self, mock_georaster_utils):
+        for linestring, message in (
+            ('{"type":"LineString","coordinates":[[0,NaN],[1,1]]}', 'must be a GEOJSON'),
+            ('[[2600000,1200000],[2600010,1200010]]', 'must be a LineString/Point GEOJSON'),
+            ('{"type":"LineString","coordinates":[[0,"a"],[1,1]]}', 'Error converting GEOJSON'),
+            ('{"type":"LineString","coordinates":[[0,1],[1,1,3]]}', 'Error converting GEOJSON'),
+            ('{"type":"LineString","coordinates":[[0],[1]]}', 'Error converting GEOJSON'),
+            ('{"type":"LineString","coordinates":[0,1]}', 'Error converting GEOJSON'),
+            ('{"type":"Point","coordinates":[[0,1]]}', 'Error converting GEOJSON'),
+            ('{"type":"LineString","coordinates":[[0,1e400],[1,1]]}', 'Invalid LineString'),
+            ('{"type":"LineString","coordinates":[]}', 'Invalid LineString'),
+            ('{"type":"Point"}', 'Invalid Point'),
+        ):
+            response = self.prepare_mock_and_test(
+                linestring=linestring,
+                spatial_reference=VALID_SPATIAL_REFERENCES[0],
+                nb_points=VALID_NB_POINTS,
+                offset=VALID_OFFSET,
+                mock_georaster_utils=mock_georaster_utils
+            )
+            self.check_response(response, expected_status=400)
+            self.assertIn(message, response.json['error']['message'], msg=linestring)
+
+    @patch('app.routes.georaster_utils')
+    def test_profile_validation_3d_coordinates(self, mock_georaster_utils):
+        # the heights are ignored, the coordinates are rounded to the micrometer like geojson did
+        response = self.prepare_mock_and_test(
+            linestring='{"type":"LineString","coordinates":'
+            '[[2631599.9,1173200.12345678,500],[2631699.9,1173200.1,510]]}',
+            spatial_reference=None,
+            nb_points=2,
+            offset=0,
+            mock_georaster_utils=mock_georaster_utils
+        )
+        self.check_response(response)
+        profile = response.get_json()
+        self.assertEqual(
+            [(point['easting'], point['northing']) for point in profile],
+            [(2631599.9, 1173200.123), (2631699.9, 1173200.1)]
+        )
+
+    @patch('app.routes.georaster_utils')
+    def test_profile_validation_polyline(self, mock_georaster_utils):
+        prepare_mock(mock_georaster_utils)
+        for precision, query in ((5, {}), (2, {'polyline_precision': 2})):
+            response = self.test_instance.get(
+                '/rest/services/profile.json',
+                query_string={
+                    'geom': create_polyline(COORDINATES, precision),
+                    'geom_format': 'polyline',
+                    'only_requested_points': True,
+                    **query
+                },
+                headers=DEFAULT_HEADERS
+            )
+            self.check_response(response)
+            self.assertEqual(
+                [[point['easting'], point['northing']] for point in response.get_json()],
+                COORDINATES
+            )
+        for query, message in (
+            ({'geom_format': 'wkt'}, 'valid geom_format'),
+            ({'geom_format': 'polyline', 'polyline_precision': 11}, "'polyline_precision'"),
+            ({'geom_format': 'polyline', 'polyline_precision': 'a'}, "'polyline_precision'"),
+            ({'geom_format': 'polyline', 'geom': 'a b'}, 'must be an encoded polyline'),
+            ({'geom_format': 'polyline', 'geom': '????'}, 'Invalid LineString'),
+        ):
+            response = self.test_instance.get(
+                '/rest/services/profile.json',
+                query_string={
+                    'geom': create_polyline(COORDINATES), **query
+                },
+                headers=DEFAULT_HEADERS
+            )
+            self.check_response(response, expected_status=400)
+            self.assertIn(message, response.json['error']['message'])
+
+    @patch('app.routes.georaster_utils')
+    def test_profile_validation_binary_body(self, mock_georaster_utils):
+        prepare_mock(mock_georaster_utils)
+        for content_type, body in (
+            ('application/wkb', LineString(COORDINATES).wkb),
+            ('application/octet-stream', np.asarray(COORDINATES, dtype='<f8').tobytes()),
+        ):
+            response = self.test_instance.post(
+                '/rest/services/profile.csv',
+                query_string={'only_requested_points': True},
+                data=body,
+                headers={
+                    **DEFAULT_HEADERS, 'Content-Type': content_type
+                }
+            )
+            self.check_response(response)
+            self.assertEqual(len(response.get_data(as_text=True).splitlines()), 4)
+
+            response = self.test_instance.post(
+                '/rest/services/profile.json',
+                data=body[:-1],
+                headers={
+                    **DEFAULT_HEADERS, 'Content-Type': content_type
+                }
+            )
+            self.check_response(response, expected_status=400)
+            self.assertIn(f'Invalid {content_type} body', response.json['error']['message'])
+
+    @patch('app.routes.georaster_utils')
+    def test_profile_validation_smoothing_kernel(self, mock_georaster_utils):
+        prepare_mock(mock_georaster_utils)
+        for smoothing_kernel, expected_status in (('gaussian', 200), ('linear', 200), ('box', 400)):
+            response = self.test_instance.get(
+                '/rest/services/profile.json',
+                query_string={
+                    'geom': create_json(2),
+                    'offset': VALID_OFFSET,
+                    'smoothing_kernel': smoothing_kernel
+                },
+                headers=DEFAULT_HEADERS
+            )
+            self.check_response(response, expected_status=expected_status)
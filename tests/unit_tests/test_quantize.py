@@ -0,0 +1,117 @@
+import numpy as np
+from mock import patch
+
+from app.helpers.helpers import filter_altitude
+from app.helpers.raster.georaster import BlockCache
+from app.helpers.raster.georaster import GeoRaster
+from app.helpers.raster.georaster import get_tiff_directory
+from app.helpers.raster.geotiff import read_tiff_headers
+from app.helpers.raster.quantize import QUANTIZED_NODATA
+from app.helpers.raster.quantize import convert_mosaic
+from app.helpers.raster.quantize import quantize_heights
+from app.helpers.raster.quantize import round_decimeters
+from app.helpers.raster.shapefile import get_column
+from app.helpers.raster.shapefile import read_index
+from app.helpers.raster.shapefile import write_index
+from tests import create_bt_file
+from tests import create_index_file
+from tests.unit_tests.base import TempDirTestCase
+
+# 2 tiles of 30 columns by 20 rows of 2m cells, side by side
+NB_COLS, NB_ROWS = 30, 20
+TILES = [
+    ((2600000.0, 1200000.0, 2600060.0, 1200040.0), 'west.bt'),
+    ((2600060.0, 1200000.0, 2600120.0, 1200040.0), 'east.bt'),
+]
+
+
+def create_heights(seed, low, high):
+    heights = np.random.default_rng(seed).uniform(low, high, (NB_COLS, NB_ROWS))
+    # float32 heights to the centimeter, like the swissALTI3D cells
+    return np.round(heights, 2).astype(np.float32)
+
+
+class TestQuantize(TempDirTestCase):
+
+    def tearDown(self):
+        get_tiff_directory.cache_clear()
+
+    def create_mosaic(self, heights):
+        for ((bounds, location), tile_heights) in zip(TILES, heights):
+            create_bt_file(str(self.path / location), *bounds, tile_heights.tolist())
+        create_index_file(str(self.path / 'index.shp'), TILES)
+        return str(self.path / 'index.shp')
+
+    def create_raster(self, index_file):
+        index = read_index(index_file)
+        return GeoRaster(
+            index_file,
+            registry=GeoRaster.create_registry_from_columns(
+                index_file, index.bounds, get_column(index, 'location')
+            )
+        )
+
+    def test_round_decimeters(self):
+        heights = np.round(np.random.default_rng(0).uniform(190, 4700, 100000), 2)
+        heights = np.concatenate([heights, np.arange(190, 4700, 0.05)]).astype(np.float32)
+        self.assertEqual(
+            round_decimeters(heights).tolist(),
+            [round(round(float(height), 1) * 10) for height in heights]
+        )
+
+    def test_quantize_heights(self):
+        cells, offset = quantize_heights([[1000.04, np.nan], [1200.46, 1500.0]])
+        self.assertEqual(offset, 1250.0)
+        self.assertEqual(cells.dtype, np.int16)
+        self.assertEqual(cells.tolist(), [[-2500, QUANTIZED_NODATA], [-495, 2500]])
+        cells, offset = quantize_heights([[np.nan]])
+        self.assertEqual(cells.tolist(), [[QUANTIZED_NODATA]])
+        with self.assertRaises(ValueError):
+            quantize_heights([0, 7000])
+
+    def test_write_index(self):
+        bounds = np.asarray([bounds for bounds, _ in TILES])
+        write_index(self.path / 'quantized.shp', bounds, ['west.tif', 'east.tif'])
+        index = read_index(str(self.path / 'quantized.shp'))
+        self.assertEqual(index.bounds.tolist(), bounds.tolist())
+        self.assertEqual(
+            [location.rstrip().decode() for location in get_column(index, 'location')],
+            ['west.tif', 'east.tif']
+        )
+
+    def test_convert_mosaic(self):
+        heights = [create_heights(0, 400, 600), create_heights(1, 3000, 4634)]
+        heights[1][3, 4] = np.nan
+        index_file = self.create_mosaic(heights)
+        for compress in (False, True):
+            output_dir = self.path / f'quantized_{compress}'
+            convert_mosaic(index_file, output_dir, compress=compress, block_size=16)
+            headers = read_tiff_headers(
+                [str(output_dir / 'west.tif'), str(output_dir / 'east.tif')]
+            )
+            self.assertEqual(headers['data_size'].tolist(), [2, 2])
+            self.assertEqual(headers['scale'].tolist(), [0.1, 0.1])
+            self.assertEqual(headers['offset'].tolist(), [500.0, 3818.0])
+            self.assertEqual(headers['nodata'].tolist(), [QUANTIZED_NODATA] * 2)
+
+            expected = self.create_raster(index_file)
+            quantized = self.create_raster(str(output_dir / 'index.shp'))
+            xs, ys = np.meshgrid(
+                TILES[0][0][0] + np.arange(NB_COLS * 2) * 2 + 1,
+                TILES[0][0][1] + np.arange(NB_ROWS) * 2 + 1
+            )
+            xs, ys = xs.ravel(), ys.ravel()
+            for cache in (None, BlockCache(1024 * 1024, 16)):
+                with patch('app.helpers.raster.georaster.block_cache', cache):
+                    self.assertEqual(
+                        [filter_altitude(h) for h in quantized.get_heights(xs, ys).tolist()],
+                        [filter_altitude(h) for h in expected.get_heights(xs, ys).tolist()]
+                    )
+                    for x, y in zip(xs[::7], ys[::7]):
+                        self.assertEqual(
+                            filter_altitude(quantized.get_height_for_coordinate(x, y)),
+                            filter_altitude(expected.get_height_for_coordinate(x, y))
+                        )
+                    self.assertIsNone(
+                        filter_altitude(quantized.get_height_for_coordinate(2600060 + 7, 1200009))
+                    )
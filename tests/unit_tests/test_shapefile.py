@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from app.helpers.raster.shapefile import get_column
+from app.helpers.raster.shapefile import read_index
+from app.helpers.raster.shputils import SHPUtils
+from tests import create_index_file
+from tests import to_shape_files
+from tests.unit_tests.base import TempDirTestCase
+
+TILES = [
+    ((2600000.0, 1200000.0, 2601000.0, 1201000.0), 'tile_1.bt'),
+    ((2601000.0, 1200000.0, 2602000.0, 1201000.0), 'sub/tile_2.bt'),
+    ((2600000.0, 1201000.0, 2601000.0, 1202000.0), '/absolute/tile_3.bt'),
+]
+
+
+class TestShapefile(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.index_file = str(self.path / 'index.shp')
+        create_index_file(self.index_file, TILES)
+
+    def test_read_index(self):
+        index = read_index(self.index_file)
+        self.assertEqual(index.record_numbers.tolist(), [1, 2, 3])
+        self.assertEqual(index.bounds.tolist(), [list(bounds) for bounds, _ in TILES])
+        self.assertEqual(
+            [location.rstrip().decode() for location in get_column(index, 'location')],
+            [location for _, location in TILES]
+        )
+
+    def test_same_as_shputils(self):
+        expected = SHPUtils().load_shape_file(self.index_file)
+        shapes = to_shape_files(read_index(self.index_file))
+        self.assertEqual(len(shapes), len(expected))
+        for shape, expected_shape in zip(shapes, expected):
+            for key in ('xmin', 'ymin', 'xmax', 'ymax'):
+                self.assertEqual(shape['shp_data'][key], expected_shape['shp_data'][key])
+            self.assertEqual(
+                shape['dbf_data']['location'].rstrip(),
+                expected_shape['dbf_data']['location'].rstrip()
+            )
+
+    def test_records_of_different_lengths(self):
+        # appending a null shape forces walking through the record headers
+        with open(self.index_file, 'ab') as file:
+            file.write(b'\x00\x00\x00\x04\x00\x00\x00\x02' + b'\x00' * 4)
+        index = read_index(self.index_file)
+        self.assertEqual(index.record_numbers.tolist(), [1, 2, 3])
+        self.assertEqual(index.bounds.tolist(), [list(bounds) for bounds, _ in TILES])
+
+    def test_empty_index(self):
+        create_index_file(self.index_file, [])
+        index = read_index(self.index_file)
+        self.assertEqual(len(index.record_numbers), 0)
+        self.assertEqual(len(get_column(index, 'location')), 0)
+
+    def test_not_a_shapefile(self):
+        Path(self.index_file).write_bytes(b'not a shapefile')
+        with self.assertRaises(ValueError):
+            read_index(self.index_file)
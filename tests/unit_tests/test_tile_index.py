@@ -0,0 +1,141 @@
+import unittest
+
+import numpy as np
+
+from app.helpers.raster.tile_index import TileGridIndex
+from app.helpers.raster.tile_index import TileMosaicIndex
+from app.helpers.raster.tile_index import create_tile_index
+
+# 2x2 tiles of 1km, plus a small tile overlapping the first one and a lonely tile further east
+BOUNDS = [
+    (2600000.0, 1200000.0, 2601000.0, 1201000.0),
+    (2600000.0, 1201000.0, 2601000.0, 1202000.0),
+    (2601000.0, 1200000.0, 2602000.0, 1201000.0),
+    (2601000.0, 1201000.0, 2602000.0, 1202000.0),
+    (2600500.0, 1200500.0, 2601500.0, 1200700.0),
+    (2610000.0, 1200000.0, 2612500.0, 1201000.0),
+]
+
+# 3x2 tiles of 1km with a hole in the middle of the top row, not in the order of the grid
+REGULAR_BOUNDS = [
+    (2602000.0, 1201000.0, 2603000.0, 1202000.0),
+    (2600000.0, 1200000.0, 2601000.0, 1201000.0),
+    (2601000.0, 1200000.0, 2602000.0, 1201000.0),
+    (2600000.0, 1201000.0, 2601000.0, 1202000.0),
+    (2602000.0, 1200000.0, 2603000.0, 1201000.0),
+]
+
+
+def linear_scan(x, y, bounds=None):
+    if bounds is None:
+        bounds = BOUNDS
+    for tile_id, (min_x, min_y, max_x, max_y) in enumerate(bounds):
+        if min_x <= x < max_x and min_y <= y < max_y:
+            return tile_id
+    return None
+
+
+class TestTileGridIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TileGridIndex(BOUNDS)
+
+    def test_find(self):
+        self.assertEqual(self.index.find(2600001, 1200001), 0)
+        self.assertEqual(self.index.find(2600001, 1201001), 1)
+        self.assertEqual(self.index.find(2601999, 1200001), 2)
+        self.assertEqual(self.index.find(2601999, 1201999), 3)
+        self.assertEqual(self.index.find(2612000, 1200500), 5)
+
+    def test_find_same_as_linear_scan(self):
+        for x in range(2599500, 2613000, 250):
+            for y in range(1199500, 1202500, 100):
+                self.assertEqual(self.index.find(x, y), linear_scan(x, y), msg=f'({x}, {y})')
+
+    def test_find_all(self):
+        xs, ys = np.meshgrid(np.arange(2599500, 2613000, 250), np.arange(1199500, 1202500, 100))
+        xs = np.append(xs.ravel(), [np.nan, np.inf, 2600001])
+        ys = np.append(ys.ravel(), [1200001, 1200001, np.nan])
+        expected = [self.index.find(x, y) for x, y in zip(xs, ys)]
+        self.assertEqual(
+            self.index.find_all(xs, ys).tolist(), [-1 if e is None else e for e in expected]
+        )
+
+    def test_find_bounds_are_half_open(self):
+        self.assertEqual(self.index.find(2601000, 1201000), 3)
+        self.assertIsNone(self.index.find(2602000, 1201000))
+        self.assertIsNone(self.index.find(2601000, 1202000))
+
+    def test_find_outside(self):
+        self.assertIsNone(self.index.find(2605000, 1200500))
+        self.assertIsNone(self.index.find(0, 0))
+        self.assertIsNone(self.index.find(float('nan'), 1200500))
+        self.assertIsNone(self.index.find(float('inf'), 1200500))
+
+    def test_empty_index(self):
+        index = TileGridIndex([])
+        self.assertEqual(len(index), 0)
+        self.assertIsNone(index.find(2600000, 1200000))
+        self.assertEqual(index.find_all([2600000], [1200000]).tolist(), [-1])
+
+
+class TestTileMosaicIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TileMosaicIndex.from_bounds(REGULAR_BOUNDS)
+
+    def assert_same_as_linear_scan(self, index, bounds, xs, ys):
+        expected = [linear_scan(x, y, bounds) for x, y in zip(xs, ys)]
+        self.assertEqual([index.find(x, y) for x, y in zip(xs, ys)], expected)
+        self.assertEqual(
+            index.find_all(xs, ys).tolist(), [-1 if e is None else e for e in expected]
+        )
+
+    def test_find(self):
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.index.tile_ids.tolist(), [[1, 3], [2, -1], [4, 0]])
+        self.assertEqual(self.index.find(2600001, 1200001), 1)
+        self.assertEqual(self.index.find(2602999, 1201999), 0)
+        self.assertEqual(self.index.find(2601000, 1201000), None)
+        self.assertEqual(self.index.find(2602000, 1201000), 0)
+        self.assertIsNone(self.index.find(2603000, 1201000))
+        self.assertIsNone(self.index.find(float('nan'), 1200500))
+        self.assertIsNone(self.index.find(float('inf'), 1200500))
+
+    def test_find_same_as_linear_scan(self):
+        xs, ys = np.meshgrid(np.arange(2599500, 2604000, 125), np.arange(1199500, 1202500, 100))
+        xs = np.append(xs.ravel(), [np.nan, np.inf, 2600001, -1e300])
+        ys = np.append(ys.ravel(), [1200001, 1200001, np.nan, 1200001])
+        self.assert_same_as_linear_scan(self.index, REGULAR_BOUNDS, xs, ys)
+
+    def test_find_on_rounded_edges(self):
+        # edges which are not exact in floating point, the points on and next to them must get the
+        # same tile as with the bounds
+        size = 0.1
+        bounds = [
+            (i * size, j * size, (i + 1) * size, (j + 1) * size)
+            for i in range(30)
+            for j in range(3)
+        ]
+        index = TileMosaicIndex.from_bounds(bounds)
+        self.assertIsNotNone(index)
+        edges = np.asarray([min_x for min_x, _, _, _ in bounds])
+        xs = np.concatenate([edges, np.nextafter(edges, -1), np.nextafter(edges, 1)])
+        ys = np.full(xs.shape, 0.15)
+        self.assert_same_as_linear_scan(index, bounds, xs, ys)
+
+    def test_irregular_tiling(self):
+        # different sizes, overlapping tiles, tiles off the grid and a too sparse mosaic
+        self.assertIsNone(TileMosaicIndex.from_bounds(BOUNDS))
+        for extra_tile in (
+            REGULAR_BOUNDS[0],
+            (2600000.0, 1202500.0, 2601000.0, 1203500.0),
+            (2700000.0, 1200000.0, 2701000.0, 1201000.0),
+        ):
+            self.assertIsNone(TileMosaicIndex.from_bounds(REGULAR_BOUNDS + [extra_tile]))
+        self.assertIsNone(TileMosaicIndex.from_bounds([]))
+
+    def test_create_tile_index(self):
+        self.assertIsInstance(create_tile_index(REGULAR_BOUNDS), TileMosaicIndex)
+        self.assertIsInstance(create_tile_index(BOUNDS), TileGridIndex)
+        self.assertIsInstance(create_tile_index([]), TileGridIndex)
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+
+from app.helpers.wgs84 import lv95_to_wgs84
+from app.helpers.wgs84 import wgs84_to_lv95
+
+# the example of the approximate formulas of swisstopo: 8° 43' 49.79" E, 46° 02' 38.87" N
+LON, LAT = 8 + 43 / 60 + 49.79 / 3600, 46 + 2 / 60 + 38.87 / 3600
+EASTING, NORTHING = 2700000.0, 1100000.0
+
+
+class TestWGS84(unittest.TestCase):
+
+    def test_wgs84_to_lv95(self):
+        eastings, northings = wgs84_to_lv95([LON], [LAT])
+        self.assertAlmostEqual(eastings[0], EASTING, delta=0.5)
+        self.assertAlmostEqual(northings[0], NORTHING, delta=0.5)
+
+    def test_lv95_to_wgs84(self):
+        lons, lats = lv95_to_wgs84([EASTING], [NORTHING])
+        # 0.02" is about 60cm
+        self.assertAlmostEqual(lons[0], LON, delta=0.02 / 3600)
+        self.assertAlmostEqual(lats[0], LAT, delta=0.02 / 3600)
+
+    def test_round_trip(self):
+        # a grid over the bounding box of Switzerland, converted back and forth within about a
+        # meter around Bern and a few meters in the corners
+        eastings, northings = np.meshgrid(
+            np.arange(2485000, 2835000, 5000.0), np.arange(1075000, 1296000, 5000.0)
+        )
+        lons, lats = lv95_to_wgs84(eastings, northings)
+        self.assertEqual(lons.shape, eastings.shape)
+        round_trip_eastings, round_trip_northings = wgs84_to_lv95(lons, lats)
+        center = (np.abs(eastings - 2600000) < 50000) & (np.abs(northings - 1200000) < 50000)
+        np.testing.assert_allclose(round_trip_eastings[center], eastings[center], rtol=0, atol=1.5)
+        np.testing.assert_allclose(
+            round_trip_northings[center], northings[center], rtol=0, atol=1.5
+        )
+        np.testing.assert_allclose(round_trip_eastings, eastings, rtol=0, atol=4)
+        np.testing.assert_allclose(round_trip_northings, northings, rtol=0, atol=4)
@@ -11,22 +11,34 @@ from app.helpers.otel import setup_trace_provider
 
 initialize()
 
+import gc
 import multiprocessing
 
 from gunicorn.app.base import BaseApplication
 
 from app.app import app as application
+from app.app import georaster_utils
 from app.helpers import get_logging_cfg
 from app.settings import ALTI_WORKERS
 from app.settings import GUNICORN_KEEPALIVE
 from app.settings import GUNICORN_WORKER_TMP_DIR
 from app.settings import HTTP_PORT
+from app.settings import PRELOAD_RASTER_FILES
 
 initialize_flask(application)
 
 
 def post_fork(server, worker):
     server.log.info("Worker spawned (pid: %s)", worker.pid)
+    # the rasters preloaded by the master are inherited by the worker, their index is shared
+    # with the master until a page is written
+    for sr, raster in georaster_utils.raster.items():
+        server.log.info(
+            "Worker %s attached to the raster index of %s (%d tiles)",
+            worker.pid,
+            sr,
+            len(raster.registry)
+        )
 
     # Setup OTEL providers for this worker
     setup_trace_provider()
@@ -69,4 +81,11 @@ if __name__ == '__main__':
         'logconfig_dict': get_logging_cfg(),
         'post_fork': post_fork
     }
+    if PRELOAD_RASTER_FILES:
+        # The raster indexes have been loaded by the master when importing the app. The tile
+        # registries and indexes are made of a handful of numpy arrays instead of one Python object
+        # per tile, so nothing touches their pages in the workers and they stay shared with the
+        # master. Move all the objects allocated so far to the permanent generation, so that the
+        # garbage collector of the workers never writes to (and so never copies) these pages.
+        gc.freeze()
     StandaloneApplication(application, options).run()